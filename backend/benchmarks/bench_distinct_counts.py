@@ -0,0 +1,82 @@
+"""
+Distinct Customer Benchmark
+===========================
+
+Compares the overview's ``COUNT(DISTINCT customer_id)`` over raw orders with
+the estimate from merged ``customer_sketch_*`` HyperLogLog registers, for a
+few date ranges, reporting both latencies and the estimate's relative error
+against the ~95% bound the API reports.
+
+Usage:
+    python benchmarks/bench_distinct_counts.py                  # 5M orders
+    python benchmarks/bench_distinct_counts.py --orders 50000 5000000
+    python benchmarks/bench_distinct_counts.py --db data/ecommerce.duckdb
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+from synthetic import build_synthetic_database
+
+from api.query_builder import Conditions
+from api.rollups import HLL_RELATIVE_ERROR, hll_estimate, plan_distinct_customers
+
+RANGES = {
+    "all time": (None, None),
+    "2024": ("2024-01-01", "2024-12-31"),
+    "one month": ("2024-06-01", "2024-06-30"),
+    "partial edge days": ("2023-03-14T09:30:00", "2024-08-02T17:00:00"),
+}
+
+
+def time_it(fn, repeat: int):
+    """Median milliseconds of ``fn()`` and its last result."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def run(db_path: Path, repeat: int):
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        print(f"\n{orders:,} orders (error bound ±{2 * HLL_RELATIVE_ERROR:.1%})")
+        print(f"{'range':<22}{'exact ms':>12}{'sketch ms':>12}{'speedup':>10}{'error':>10}")
+        print("-" * 66)
+        for label, (date_from, date_to) in RANGES.items():
+            where = Conditions().date_range("order_date", date_from, date_to)
+            exact_query = f"SELECT COUNT(DISTINCT customer_id) FROM orders {where.sql()}"
+            exact_ms, exact = time_it(lambda: conn.execute(exact_query, where.params).fetchone()[0], repeat)
+
+            sketch_query, params = plan_distinct_customers(date_from, date_to)
+            sketch_ms, estimate = time_it(lambda: hll_estimate(*conn.execute(sketch_query, params).fetchone()), repeat)
+
+            error = (estimate - exact) / exact if exact else 0.0
+            print(f"{label:<22}{exact_ms:>12.2f}{sketch_ms:>12.2f}{exact_ms / sketch_ms:>9.1f}x{error:>+10.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, help="Existing database with the sketch tables")
+    parser.add_argument("--orders", type=int, nargs="+", default=[5_000_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.db:
+        run(args.db, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_orders in args.orders:
+            run(build_synthetic_database(Path(tmp) / f"sketch_{num_orders}.duckdb", num_orders=num_orders), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Data Generation Benchmark
+=========================
+
+Measures wall time and peak RSS of generating a dataset in memory
+(``generate_all_data()``) versus streaming it shard by shard into DuckDB
+(``iter_batches()`` + ``DuckDBTableWriter``) at several order volumes. Each
+run happens in a fresh subprocess so peak RSS is not shared between runs.
+
+Usage:
+    python benchmarks/bench_generation.py                        # 1M and 5M orders
+    python benchmarks/bench_generation.py --orders 1000000 20000000 --modes stream
+    python benchmarks/bench_generation.py --orders 100000 --customers 200000 --attributes fast
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR / "src"))
+
+from utils.data_generator import EcommerceDataGenerator
+from utils.storage import DuckDBTableWriter, write_batches
+
+
+def generate(mode: str, num_orders: int, args: argparse.Namespace) -> dict:
+    generator = EcommerceDataGenerator(
+        num_customers=args.customers,
+        num_products=1_000,
+        num_orders=num_orders,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        attributes=args.attributes,
+    )
+    started = time.perf_counter()
+    with duckdb.connect(args.db) as conn:
+        conn.execute(f"SET memory_limit = '{args.memory_limit}'")
+        if mode == "memory":
+            for name, df in generator.generate_all_data().items():
+                conn.register(f"{name}_temp", df)
+                conn.execute(f"CREATE OR REPLACE TABLE {name} AS SELECT * FROM {name}_temp")
+        else:
+            write_batches(generator.iter_batches(), [DuckDBTableWriter(conn)])
+    return {
+        "seconds": time.perf_counter() - started,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--modes", nargs="+", choices=["memory", "stream"], default=["memory", "stream"])
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--attributes", choices=["faker", "fast"], default="faker")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--memory-limit", default="256MB", help="DuckDB memory_limit (its buffer cache counts in RSS)")
+    parser.add_argument("--run", nargs=2, help=argparse.SUPPRESS)  # internal: MODE ORDERS in a subprocess
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        mode, num_orders = args.run[0], int(args.run[1])
+        print(json.dumps(generate(mode, num_orders, args)))
+        return
+
+    print(f"{'orders':>12}{'mode':>9}{'seconds':>10}{'peak RSS MB':>14}")
+    print("-" * 45)
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_orders in args.orders:
+            for mode in args.modes:
+                output = subprocess.run(
+                    [
+                        sys.executable, __file__, "--run", mode, str(num_orders),
+                        "--workers", str(args.workers), "--chunk-size", str(args.chunk_size),
+                        "--memory-limit", args.memory_limit, "--customers", str(args.customers),
+                        "--attributes", args.attributes,
+                        "--db", str(Path(tmp) / f"{mode}_{num_orders}.duckdb"),
+                    ],
+                    capture_output=True,
+                    text=True,
+                )
+                if output.returncode != 0:
+                    print(f"{num_orders:>12,}{mode:>9}{'failed':>10}  (exit {output.returncode})")
+                    continue
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                print(f"{num_orders:>12,}{mode:>9}{result['seconds']:>10.1f}{result['peak_rss_mb']:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
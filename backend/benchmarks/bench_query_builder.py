@@ -0,0 +1,150 @@
+"""
+Query Builder Benchmark
+=======================
+
+Per-request cost of the filtered endpoint queries as requests vary their
+filter values, comparing:
+
+- literal:  values formatted into the SQL text (the previous
+            ``apply_date_filter`` style), so every request is a new query text
+- bound:    ``Conditions`` placeholders, the query text re-parsed per request
+- cached:   ``Conditions`` placeholders executed from the ``ParseCache``
+
+The ``parse ms`` column is the parse cost the cache removes from each
+request; binding and planning still run on every execution, so the saving
+is small next to the query itself. Small databases make the fixed
+per-request overhead visible.
+
+Usage:
+    python benchmarks/bench_query_builder.py                  # 50k orders
+    python benchmarks/bench_query_builder.py --orders 1000000
+    python benchmarks/bench_query_builder.py --db data/ecommerce.duckdb
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import duckdb
+
+from synthetic import build_synthetic_database
+
+from api.query_builder import Conditions, ParseCache
+
+CATEGORIES = ["Electronics", "Books", "Sports", "Beauty", "Toys"]
+
+
+def overview_kpis(date_from: str, date_to: str, literal: bool):
+    if literal:
+        where = f"WHERE order_date >= '{date_from}' AND order_date <= '{date_to}'"
+        return f"SELECT COUNT(*), SUM(total_amount) FROM orders {where}", []
+    where = Conditions().date_range("order_date", date_from, date_to)
+    return f"SELECT COUNT(*), SUM(total_amount) FROM orders {where.sql()}", where.params
+
+
+def revenue_by_segment(date_from: str, date_to: str, literal: bool):
+    query = """
+        SELECT c.customer_segment, SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as revenue,
+               COUNT(DISTINCT c.customer_id) as customers
+        FROM customers c
+        LEFT JOIN orders o ON c.customer_id = o.customer_id {on}
+        GROUP BY c.customer_segment
+    """
+    if literal:
+        return query.format(on=f"AND o.order_date >= '{date_from}' AND o.order_date <= '{date_to}'"), []
+    on = Conditions().date_range("o.order_date", date_from, date_to)
+    return query.format(on=on.sql("AND")), on.params
+
+
+def top_products(category: str, limit: int, literal: bool):
+    query = """
+        SELECT product_name, category, ROUND(total_revenue, 2) as revenue
+        FROM product_performance
+        {where}
+        ORDER BY total_revenue DESC
+        LIMIT {limit}
+    """
+    if literal:
+        return query.format(where=f"WHERE times_ordered > 0 AND category = '{category}'", limit=limit), []
+    where = Conditions("times_ordered > 0").equals("category", category)
+    return query.format(where=where.sql(), limit="?"), where.params + [limit]
+
+
+def requests(count: int):
+    """Distinct filter values per request, as different users would send them."""
+    start = date(2024, 1, 1)
+    for i in range(count):
+        date_from = start + timedelta(days=i % 200)
+        date_to = date_from + timedelta(days=7 + i % 60)
+        yield {
+            "overview": (overview_kpis, (date_from.isoformat(), date_to.isoformat())),
+            "revenue by segment": (revenue_by_segment, (date_from.isoformat(), date_to.isoformat())),
+            "top products": (top_products, (CATEGORIES[i % len(CATEGORIES)], 10 + i % 20)),
+        }
+
+
+def time_requests(conn, builders, mode: str) -> float:
+    """Median milliseconds per request over ``builders`` in one ``mode``."""
+    cache = ParseCache()
+    samples = []
+    for build, args in builders:
+        query, params = build(*args, literal=mode == "literal")
+        started = time.perf_counter()
+        if mode == "cached":
+            cache.execute(conn, query, params).fetchall()
+        else:
+            conn.execute(query, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def parse_ms(conn, builders) -> float:
+    samples = []
+    for build, args in builders:
+        query, _ = build(*args, literal=False)
+        started = time.perf_counter()
+        conn.extract_statements(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(db_path: Path, count: int):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    per_query = {}
+    for request in requests(count):
+        for name, builder in request.items():
+            per_query.setdefault(name, []).append(builder)
+
+    print(f"\n{'query':<22}{'literal ms':>12}{'bound ms':>12}{'cached ms':>12}{'parse ms':>12}")
+    print("-" * 70)
+    for name, builders in per_query.items():
+        time_requests(conn, builders[:5], "bound")  # warm up
+        literal_ms = time_requests(conn, builders, "literal")
+        bound_ms = time_requests(conn, builders, "bound")
+        cached_ms = time_requests(conn, builders, "cached")
+        print(f"{name:<22}{literal_ms:>12.3f}{bound_ms:>12.3f}{cached_ms:>12.3f}{parse_ms(conn, builders):>12.3f}")
+
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, help="Existing database to benchmark against")
+    parser.add_argument("--orders", type=int, default=50_000, help="Orders in the synthetic database")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per query")
+    args = parser.parse_args()
+
+    if args.db:
+        run(args.db, args.requests)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_synthetic_database(Path(tmp) / "bench.duckdb", num_orders=args.orders)
+        run(db_path, args.requests)
+
+
+if __name__ == "__main__":
+    main()
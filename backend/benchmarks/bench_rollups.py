@@ -0,0 +1,72 @@
+"""
+Revenue Rollup Benchmark
+========================
+
+Compares the revenue time series aggregated from raw orders with the same
+series planned over the ``revenue_rollup_*`` tables, for every ``group_by``
+and a few date ranges (unbounded, a year, and a range with partial edge
+days), at several order volumes. Rollup latency should stay flat as the
+order volume grows.
+
+Usage:
+    python benchmarks/bench_rollups.py                  # 50k and 5M orders
+    python benchmarks/bench_rollups.py --orders 50000 500000 5000000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+from synthetic import build_synthetic_database
+
+from api.rollups import GROUP_BY_GRAINS, plan_revenue_series
+
+RANGES = {
+    "all time": (None, None),
+    "2024": ("2024-01-01", "2024-12-31"),
+    "partial edge days": ("2023-03-14T09:30:00", "2024-08-02T17:00:00"),
+}
+
+
+def time_it(conn, query: str, params: list, repeat: int) -> float:
+    """Median query time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(num_orders: int, repeat: int, workdir: Path):
+    db_path = build_synthetic_database(workdir / f"rollups_{num_orders}.duckdb", num_orders=num_orders)
+
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        print(f"\n{num_orders:,} orders")
+        print(f"{'query':<30}{'raw ms':>12}{'rollup ms':>12}{'speedup':>10}")
+        print("-" * 64)
+        for group_by in GROUP_BY_GRAINS:
+            for label, (date_from, date_to) in RANGES.items():
+                raw_ms = time_it(conn, *plan_revenue_series(group_by, date_from, date_to, use_rollups=False), repeat)
+                rollup_ms = time_it(conn, *plan_revenue_series(group_by, date_from, date_to), repeat)
+                name = f"{group_by}: {label}"
+                print(f"{name:<30}{raw_ms:>12.2f}{rollup_ms:>12.2f}{raw_ms / rollup_ms:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[50_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_orders in args.orders:
+            run(num_orders, args.repeat, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
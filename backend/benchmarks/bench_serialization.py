@@ -0,0 +1,129 @@
+"""
+Response Serialization Benchmark
+================================
+
+Compares the previous ``fetchdf()`` + ``iterrows()`` + ``json.dumps`` response
+building with the columnar ``fetch_records`` + orjson path, per endpoint query.
+
+Usage:
+    python benchmarks/bench_serialization.py --orders 1000000
+    python benchmarks/bench_serialization.py --db data/ecommerce.duckdb
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from synthetic import build_synthetic_database
+
+from api.serialization import ORJSONResponse, fetch_records
+
+ENDPOINT_QUERIES = {
+    "recent-orders?limit=1000": (
+        """
+        SELECT order_id, customer_id, order_date, status, payment_method, ROUND(total_amount, 2) as total_amount
+        FROM orders ORDER BY order_date DESC LIMIT 1000
+        """,
+        {
+            "order_id": ("order_id", "str"),
+            "customer_id": ("customer_id", "str"),
+            "order_date": ("order_date", "timestamp"),
+            "status": ("status", "str"),
+            "payment_method": ("payment_method", "str"),
+            "total_amount": ("total_amount", "float"),
+        },
+    ),
+    "revenue?group_by=day": (
+        """
+        SELECT DATE(order_date) as period,
+               SUM(CASE WHEN status = 'Completed' THEN total_amount ELSE 0 END) as revenue,
+               COUNT(CASE WHEN status = 'Completed' THEN order_id END) as orders
+        FROM orders GROUP BY DATE(order_date) ORDER BY period
+        """,
+        {"date": ("period", "timestamp"), "revenue": ("revenue", "float"), "orders": ("orders", "int")},
+    ),
+    "products?limit=1000": (
+        """
+        SELECT product_name, category, times_ordered, total_quantity_sold, ROUND(total_revenue, 2) as revenue,
+               ROUND(avg_selling_price, 2) as avg_price, ROUND(avg_profit_per_unit, 2) as profit_per_unit
+        FROM product_performance WHERE times_ordered > 0 ORDER BY total_revenue DESC LIMIT 1000
+        """,
+        {
+            "product_name": ("product_name", "str"),
+            "category": ("category", "str"),
+            "revenue": ("revenue", "float"),
+            "times_ordered": ("times_ordered", "int"),
+            "units_sold": ("total_quantity_sold", "int"),
+            "avg_price": ("avg_price", "float"),
+            "profit_per_unit": ("profit_per_unit", "float"),
+        },
+    ),
+}
+
+
+def iterrows_records(df: pd.DataFrame, fields):
+    """The previous per-row response building."""
+    casts = {"str": str, "int": int, "float": float, "timestamp": str}
+    return [
+        {key: (casts[kind](row[column]) if pd.notna(row[column]) else 0) for key, (column, kind) in fields.items()}
+        for _, row in df.iterrows()
+    ]
+
+
+def time_it(fn, repeat: int) -> float:
+    """Median wall time of ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(db_path: Path, repeat: int):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    response = ORJSONResponse(None)
+
+    print(f"\n{'endpoint':<28}{'rows':>8}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    print("-" * 70)
+    for name, (query, fields) in ENDPOINT_QUERIES.items():
+        rows = len(conn.execute(query).fetchall())
+
+        def before():
+            records = iterrows_records(conn.execute(query).fetchdf(), fields)
+            return json.dumps(records).encode("utf-8")
+
+        def after():
+            return response.render(fetch_records(conn.execute(query), fields))
+
+        before_ms = time_it(before, repeat)
+        after_ms = time_it(after, repeat)
+        print(f"{name:<28}{rows:>8,}{before_ms:>12.2f}{after_ms:>12.2f}{before_ms / after_ms:>9.1f}x")
+
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, help="Existing database to benchmark against")
+    parser.add_argument("--orders", type=int, default=200_000, help="Orders in the synthetic database")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.db:
+        run(args.db, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_synthetic_database(Path(tmp) / "bench.duckdb", num_orders=args.orders)
+        run(db_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
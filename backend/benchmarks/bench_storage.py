@@ -0,0 +1,129 @@
+"""
+Storage Format Benchmark
+========================
+
+Compares the CSV and Parquet outputs of the data generator: time spent
+writing the streamed batches, size on disk, time to load every table into
+DuckDB, and scan times for a full-table aggregate and a one-month query
+(which Parquet answers from a single monthly partition).
+
+Usage:
+    python benchmarks/bench_storage.py                   # 1M orders
+    python benchmarks/bench_storage.py --orders 5000000
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import duckdb
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR / "src"))
+
+from utils.data_generator import EcommerceDataGenerator
+from utils.storage import CsvTableWriter, ParquetTableWriter, load_parquet_tables, parquet_source
+
+TABLES = ["customers", "products", "orders", "order_items", "web_sessions"]
+
+SCANS = {
+    "monthly revenue (all)": """
+        SELECT DATE_TRUNC('month', order_date) AS month, SUM(total_amount)
+        FROM {orders} WHERE status = 'Completed' GROUP BY 1
+    """,
+    "one month of orders": """
+        SELECT COUNT(*), SUM(total_amount) FROM {orders}
+        WHERE order_date >= TIMESTAMP '2024-12-01' {month_filter}
+    """,
+}
+
+
+def directory_size(path: Path, pattern: str) -> int:
+    return sum(f.stat().st_size for f in path.glob(pattern) if f.is_file())
+
+
+def time_it(func, repeat: int = 1) -> float:
+    """Median wall time of ``func()`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writers = {"csv": CsvTableWriter(tmp / "csv"), "parquet": ParquetTableWriter(tmp / "parquet")}
+        (tmp / "csv").mkdir()
+
+        # Generate once and time each writer on the same batches
+        write_ms = defaultdict(float)
+        generator = EcommerceDataGenerator(
+            num_customers=args.customers, num_orders=args.orders, attributes="fast", seed=1
+        )
+        for table, batch in generator.iter_batches():
+            for name, writer in writers.items():
+                write_ms[name] += time_it(lambda: writer.write(table, batch))
+
+        sizes = {
+            "csv": directory_size(tmp / "csv", "*.csv"),
+            "parquet": directory_size(tmp / "parquet", "**/*.parquet"),
+        }
+
+        sources = {
+            "csv": {table: f"read_csv('{tmp / 'csv' / table}.csv')" for table in TABLES},
+            "parquet": {table: parquet_source(tmp / "parquet", table) for table in TABLES},
+        }
+
+        def load_csv():
+            with duckdb.connect(str(tmp / "from_csv.duckdb")) as conn:
+                for table in TABLES:
+                    conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {sources['csv'][table]}")
+
+        def load_parquet():
+            with duckdb.connect(str(tmp / "from_parquet.duckdb")) as conn:
+                load_parquet_tables(conn, tmp / "parquet", TABLES)
+
+        load_ms = {"csv": time_it(load_csv), "parquet": time_it(load_parquet)}
+
+        print(f"\n{args.orders:,} orders ({writers['csv'].rows['orders']:,} kept), {args.customers:,} customers")
+        print(f"{'':<26}{'CSV':>12}{'Parquet':>12}{'ratio':>9}")
+        print("-" * 59)
+        print(f"{'write ms':<26}{write_ms['csv']:>12,.0f}{write_ms['parquet']:>12,.0f}"
+              f"{write_ms['csv'] / write_ms['parquet']:>8.1f}x")
+        print(f"{'size MB':<26}{sizes['csv'] / 1e6:>12,.1f}{sizes['parquet'] / 1e6:>12,.1f}"
+              f"{sizes['csv'] / sizes['parquet']:>8.1f}x")
+        print(f"{'load into DuckDB ms':<26}{load_ms['csv']:>12,.0f}{load_ms['parquet']:>12,.0f}"
+              f"{load_ms['csv'] / load_ms['parquet']:>8.1f}x")
+
+        # Scan the orders files in place; the hive ``month`` column lets the filter prune partitions
+        orders = {
+            "csv": sources["csv"]["orders"],
+            "parquet": f"read_parquet('{tmp / 'parquet' / 'orders'}/*/*.parquet', hive_partitioning = true)",
+        }
+        month_filters = {"csv": "", "parquet": "AND month = '2024-12'"}
+
+        conn = duckdb.connect()
+        for label, query in SCANS.items():
+            timings = {}
+            for name in ("csv", "parquet"):
+                sql = query.format(orders=orders[name], month_filter=month_filters[name])
+                timings[name] = time_it(lambda: conn.execute(sql).fetchall(), args.repeat)
+            print(f"{'scan: ' + label:<26}{timings['csv']:>12,.1f}{timings['parquet']:>12,.1f}"
+                  f"{timings['csv'] / timings['parquet']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Summary Table Benchmark
+=======================
+
+Compares reading the analytical summaries through their view definitions
+(re-aggregating the fact tables on every query) with reading the
+materialized tables, using the API and dashboard queries, at several order
+volumes. Also reports full and incremental refresh times.
+
+Usage:
+    python benchmarks/bench_summary_tables.py                  # 50k and 5M orders
+    python benchmarks/bench_summary_tables.py --orders 50000 500000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+
+from synthetic import build_synthetic_database
+
+from utils.summary_tables import SUMMARY_TABLES, refresh_summaries, summary_sql
+
+READER_QUERIES = {
+    "customers: acquisition": """
+        SELECT acquisition_channel, COUNT(*) as customers, ROUND(AVG(lifetime_value), 2) as avg_ltv
+        FROM customer_ltv WHERE total_orders > 0 GROUP BY acquisition_channel
+    """,
+    "products: top 20": """
+        SELECT product_name, category, total_revenue FROM product_performance
+        WHERE times_ordered > 0 ORDER BY total_revenue DESC LIMIT 20
+    """,
+    "products: categories": """
+        SELECT category, COUNT(*) as total_products, ROUND(SUM(total_revenue), 2) as category_revenue
+        FROM product_performance GROUP BY category
+    """,
+    "dashboard: monthly revenue": "SELECT * FROM monthly_revenue ORDER BY month",
+}
+
+
+def as_view(query: str) -> str:
+    """Rewrite a reader query to aggregate from the fact tables, as the views did."""
+    ctes = ",\n".join(f"{name} AS ({summary_sql(name)})" for name in SUMMARY_TABLES)
+    return f"WITH {ctes}\n{query}"
+
+
+def time_it(conn, query: str, repeat: int) -> float:
+    """Median query time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(query).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(num_orders: int, repeat: int, workdir: Path):
+    db_path = build_synthetic_database(workdir / f"summary_{num_orders}.duckdb", num_orders=num_orders)
+
+    with duckdb.connect(str(db_path)) as conn:
+        print(f"\n{num_orders:,} orders")
+        print(f"{'query':<30}{'view ms':>12}{'table ms':>12}{'speedup':>10}")
+        print("-" * 64)
+        for name, query in READER_QUERIES.items():
+            view_ms = time_it(conn, as_view(query), repeat)
+            table_ms = time_it(conn, query, repeat)
+            print(f"{name:<30}{view_ms:>12.2f}{table_ms:>12.2f}{view_ms / table_ms:>9.1f}x")
+
+        started = time.perf_counter()
+        refresh_summaries(conn, mode="full")
+        full_ms = (time.perf_counter() - started) * 1000
+
+        # Append one day of orders (0.1%) and refresh only the affected keys
+        new_orders = max(1, num_orders // 1000)
+        conn.execute(
+            f"""
+            INSERT INTO orders
+            SELECT order_id + {num_orders}, customer_id, TIMESTAMP '2025-01-01', status, payment_method,
+                   shipping_cost, discount_amount, tax_amount, total_amount
+            FROM orders WHERE order_id <= {new_orders}
+        """
+        )
+        conn.execute(
+            f"INSERT INTO order_items SELECT order_id + {num_orders}, product_id, quantity, unit_price, total_price "
+            f"FROM order_items WHERE order_id <= {new_orders}"
+        )
+        started = time.perf_counter()
+        refresh_summaries(conn, mode="incremental")
+        incremental_ms = (time.perf_counter() - started) * 1000
+        print(f"{'refresh: full':<30}{full_ms:>12.2f}")
+        print(f"{'refresh: incremental (+0.1%)':<30}{incremental_ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[50_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_orders in args.orders:
+            run(num_orders, args.repeat, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Synthetic Benchmark Database
+============================
+
+Builds a DuckDB database with the same schema as ``01_data_generation.py``
+directly in SQL, so benchmarks can run at volumes (millions of orders) that
+would take too long to produce with the realistic generator.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR / "src"))
+
+from utils.summary_tables import refresh_summaries
+
+
+def build_synthetic_database(
+    db_path: Path,
+    num_orders: int = 50_000,
+    num_customers: int = None,
+    num_products: int = 1_000,
+    start_date: str = "2022-01-01",
+    end_date: str = "2024-12-31",
+    seed: float = 0.42,
+) -> Path:
+    """Create (or replace) a synthetic e-commerce database at ``db_path``."""
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+
+    num_customers = num_customers or max(100, num_orders // 5)
+    started = time.perf_counter()
+
+    with duckdb.connect(str(db_path)) as conn:
+        conn.execute(f"SELECT setseed({seed})")
+        days = conn.execute(f"SELECT DATE_DIFF('day', DATE '{start_date}', DATE '{end_date}')").fetchone()[0]
+
+        conn.execute(
+            f"""
+            CREATE TABLE customers AS
+            SELECT
+                i AS customer_id,
+                'customer' || i || '@example.com' AS email,
+                'First' || (i % 500) AS first_name,
+                'Last' || (i % 700) AS last_name,
+                DATE '1960-01-01' + CAST(random() * 15000 AS INTEGER) AS birth_date,
+                CASE WHEN random() < 0.5 THEN 'M' ELSE 'F' END AS gender,
+                i || ' Main Street' AS address,
+                'City' || (i % 300) AS city,
+                'Country' || (i % 40) AS country,
+                LPAD(CAST(i % 99999 AS VARCHAR), 5, '0') AS postal_code,
+                (['Budget', 'Standard', 'Premium', 'Enterprise'])[1 + CAST(random() * 3.999 AS INTEGER)]
+                    AS customer_segment,
+                (['Organic Search', 'Paid Search', 'Social Media', 'Email Marketing', 'Direct', 'Referral',
+                  'Affiliate'])[1 + CAST(random() * 6.999 AS INTEGER)] AS acquisition_channel,
+                TIMESTAMP '{end_date}' - INTERVAL (CAST(random() * {days} AS INTEGER)) DAY AS registration_date,
+                random() < 0.85 AS is_active
+            FROM range(1, {num_customers} + 1) t(i)
+        """
+        )
+
+        conn.execute(
+            f"""
+            CREATE TABLE products AS
+            SELECT
+                i AS product_id,
+                'Product ' || i AS product_name,
+                (['Electronics', 'Clothing', 'Home & Garden', 'Books', 'Sports', 'Health & Beauty', 'Toys',
+                  'Automotive'])[1 + (i % 8)] AS category,
+                'Sub ' || (i % 20) AS subcategory,
+                'Brand ' || (i % 50) AS brand,
+                ROUND(5 + random() * 500, 2) AS price,
+                ROUND(3 + random() * 250, 2) AS cost,
+                ROUND(random() * 10, 2) AS weight_kg,
+                '10x10x10' AS dimensions_cm,
+                DATE '{start_date}' + CAST(random() * {days} AS INTEGER) AS launch_date,
+                random() < 0.9 AS is_active
+            FROM range(1, {num_products} + 1) t(i)
+        """
+        )
+
+        conn.execute(
+            f"""
+            CREATE TABLE orders AS
+            SELECT
+                i AS order_id,
+                1 + CAST(random() * ({num_customers} - 1) AS BIGINT) AS customer_id,
+                TIMESTAMP '{end_date}' - INTERVAL (CAST(random() * {days} AS INTEGER)) DAY AS order_date,
+                (['Completed', 'Completed', 'Completed', 'Completed', 'Completed', 'Completed', 'Completed',
+                  'Pending', 'Cancelled', 'Returned'])[1 + CAST(random() * 9.999 AS INTEGER)] AS status,
+                (['Credit Card', 'Credit Card', 'Debit Card', 'PayPal', 'Bank Transfer'])
+                    [1 + CAST(random() * 4.999 AS INTEGER)] AS payment_method,
+                ROUND(random() * 15, 2) AS shipping_cost,
+                ROUND(random() * 20, 2) AS discount_amount,
+                ROUND(random() * 30, 2) AS tax_amount,
+                ROUND(10 + random() * 600, 2) AS total_amount
+            FROM range(1, {num_orders} + 1) t(i)
+            ORDER BY order_date, order_id
+        """
+        )
+
+        conn.execute(
+            f"""
+            CREATE TABLE order_items AS
+            SELECT
+                o.order_id,
+                1 + CAST(random() * ({num_products} - 1) AS BIGINT) AS product_id,
+                1 + CAST(random() * 3 AS BIGINT) AS quantity,
+                ROUND(5 + random() * 200, 2) AS unit_price,
+                ROUND(5 + random() * 600, 2) AS total_price
+            FROM orders o, range(3) r(k)
+        """
+        )
+
+        conn.execute(
+            f"""
+            CREATE TABLE web_sessions AS
+            SELECT
+                i AS session_id,
+                CASE WHEN random() < 0.6 THEN 1 + CAST(random() * ({num_customers} - 1) AS BIGINT) END
+                    AS customer_id,
+                TIMESTAMP '{end_date}' - INTERVAL (CAST(random() * {days} AS INTEGER)) DAY AS session_date,
+                (['organic_search', 'paid_search', 'social', 'email', 'direct', 'referral'])
+                    [1 + CAST(random() * 5.999 AS INTEGER)] AS traffic_source,
+                (['desktop', 'mobile', 'tablet'])[1 + CAST(random() * 2.999 AS INTEGER)] AS device_type,
+                30 + CAST(random() * 600 AS BIGINT) AS session_duration_seconds,
+                1 + CAST(random() * 6 AS BIGINT) AS page_views,
+                CAST(random() < 0.2 AS BIGINT) AS bounced,
+                i <= {num_orders} AS converted,
+                CASE WHEN i <= {num_orders} THEN ROUND(10 + random() * 600, 2) ELSE 0 END AS revenue
+            FROM range(1, {num_orders} * 5 + 1) t(i)
+        """
+        )
+
+        refresh_summaries(conn, mode="full")
+
+    print(f"🧪 Synthetic database: {num_orders:,} orders in {time.perf_counter() - started:.1f}s → {db_path}")
+    return db_path
+
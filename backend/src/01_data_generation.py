@@ -5,27 +5,203 @@ E-commerce Data Generation Script
 Generates realistic e-commerce datasets for analysis with DuckDB.
 This script creates comprehensive test data including customers, products,
 orders, and web analytics data with realistic business patterns.
+
+Usage:
+    python 01_data_generation.py                         # all CPU cores
+    python 01_data_generation.py --workers 4 --chunk-size 50000 --seed 7
+    python 01_data_generation.py --memory-limit 1GB      # cap DuckDB's buffer cache
+    python 01_data_generation.py --attributes fast       # names/places from pre-sampled pools
+    python 01_data_generation.py --format parquet        # zstd Parquet instead of CSV
+    python 01_data_generation.py --append                # one more day of orders on top of the database
+    python 01_data_generation.py --append --start-date 2025-01-01 --end-date 2025-01-31 --orders 5000
+
+Shards are streamed straight into the output files and the database, so
+memory use stays flat as the volume grows. With ``--format parquet`` or
+``both`` the database is built from the Parquet files (data/parquet/, orders
+and web_sessions partitioned by month).
+
+Output depends only on the seed and chunk size, not on the number of workers.
+
+``--append`` keeps the existing database: new orders, order items and web
+sessions for a date range after the last order continue the id sequences,
+and are inserted in one transaction together with an incremental refresh of
+the summary tables. Only once that transaction has committed are the new
+rows read back and appended to the data files, in the formats already
+present in data/ (``--format`` is ignored). Customers and products are
+reused as they are.
 """
 
 import sys
 import os
+import argparse
 import duckdb
+import pandas as pd
 from pathlib import Path
+from typing import Iterator, Tuple
 
 # Add utils to path for imports
 current_dir = Path(__file__).parent
 utils_dir = current_dir / "utils"
 sys.path.insert(0, str(utils_dir))
 
-from data_generator import EcommerceDataGenerator
+from data_generator import ATTRIBUTE_MODES, DEFAULT_CHUNK_SIZE, EcommerceDataGenerator
+from summary_tables import refresh_summaries
+from storage import (
+    CsvTableWriter,
+    DuckDBTableWriter,
+    ParquetTableWriter,
+    cluster_by_time,
+    load_parquet_tables,
+    write_batches,
+)
+
+
+TABLES = ["customers", "products", "orders", "order_items", "web_sessions"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Worker processes generating shards in parallel"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per shard (part of the seeded output)"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Root seed for every shard's random stream")
+    parser.add_argument(
+        "--attributes",
+        choices=ATTRIBUTE_MODES,
+        default="faker",
+        help="Customer/product attributes from Faker per row, or drawn from pre-sampled pools (fast)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet", "both"],
+        default="csv",
+        help="File format of the generated datasets next to the DuckDB database (appends keep the existing one)",
+    )
+    parser.add_argument("--memory-limit", help="DuckDB memory_limit while loading, e.g. 1GB (default: DuckDB's)")
+    parser.add_argument("--append", action="store_true", help="Add new orders to the existing database")
+    parser.add_argument("--start-date", help="First day to append (default: the day after the last order)")
+    parser.add_argument("--end-date", help="Last day to append (default: the start date)")
+    parser.add_argument(
+        "--orders", type=int, help="Orders to append (default: the last 7 days' daily average per appended day)"
+    )
+    return parser.parse_args()
+
+
+def existing_formats(data_dir: Path) -> Tuple[bool, bool]:
+    """Whether the dataset in ``data_dir`` has CSV files and whether it has Parquet files."""
+    return (data_dir / "orders.csv").exists(), (data_dir / "parquet" / "orders").is_dir()
+
+
+def appended_batches(
+    conn: duckdb.DuckDBPyConnection, max_order_id: int, max_session_id: int
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Read back the rows an append added after ``max_order_id``/``max_session_id``, in chunks."""
+    for table, condition, key in (
+        ("orders", "order_id > ?", max_order_id),
+        ("order_items", "order_id > ?", max_order_id),
+        ("web_sessions", "session_id > ?", max_session_id),
+    ):
+        result = conn.execute(f"SELECT * FROM {table} WHERE {condition}", [key])
+        while not (batch := result.fetch_df_chunk()).empty:
+            yield table, batch
+
+
+def append_data(args, data_dir: Path, db_path: Path):
+    """Append a new date range of orders, order items and sessions to the existing database."""
+    if not db_path.exists():
+        sys.exit(f"❌ No database at {db_path} to append to; run without --append first")
+
+    with duckdb.connect(str(db_path)) as conn:
+        if args.memory_limit:
+            conn.execute(f"SET memory_limit = '{args.memory_limit}'")
+
+        max_order_id, last_order = conn.execute("SELECT MAX(order_id), MAX(order_date) FROM orders").fetchone()
+        max_session_id = conn.execute("SELECT MAX(session_id) FROM web_sessions").fetchone()[0]
+        last_day = pd.Timestamp(last_order).normalize()
+
+        start_date = pd.Timestamp(args.start_date) if args.start_date else last_day + pd.Timedelta(days=1)
+        end_date = pd.Timestamp(args.end_date) if args.end_date else start_date
+        if start_date <= last_day:
+            sys.exit(f"❌ --start-date must be after the last order date ({last_day:%Y-%m-%d})")
+        if end_date < start_date:
+            sys.exit("❌ --end-date must not be before --start-date")
+
+        num_orders = args.orders
+        if num_orders is None:
+            recent = conn.execute(
+                "SELECT COUNT(*) FROM orders WHERE order_date >= ?", [last_day - pd.Timedelta(days=6)]
+            ).fetchone()[0]
+            num_orders = max(1, round(recent / 7 * ((end_date - start_date).days + 1)))
+
+        customers_df = conn.execute("SELECT customer_id, customer_segment FROM customers ORDER BY customer_id").df()
+        products_df = conn.execute("SELECT product_id, price FROM products ORDER BY product_id").df()
+
+        generator = EcommerceDataGenerator(
+            num_customers=len(customers_df),
+            num_products=len(products_df),
+            num_orders=num_orders,
+            start_date=f"{start_date:%Y-%m-%d}",
+            end_date=f"{end_date:%Y-%m-%d}",
+            seed=args.seed,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            attributes=args.attributes,
+            order_id_offset=max_order_id or 0,
+            session_id_offset=max_session_id or 0,
+        )
+
+        print(
+            f"➕ Appending {num_orders:,} orders from {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d} "
+            f"(order ids after {max_order_id:,}, session ids after {max_session_id:,})"
+        )
+        # New rows and the summaries covering them become visible together
+        conn.begin()
+        try:
+            rows = write_batches(
+                generator.iter_batches(customers_df, products_df), [DuckDBTableWriter(conn, append=True)]
+            )
+            refreshed = refresh_summaries(conn, mode="incremental")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        # Files are only extended after the commit, so a failed append leaves them untouched
+        write_csv, write_parquet = existing_formats(data_dir)
+        file_writers = []
+        if write_csv:
+            file_writers.append(CsvTableWriter(data_dir, append=True))
+        if write_parquet:
+            file_writers.append(ParquetTableWriter(data_dir / "parquet", append=True))
+        if file_writers:
+            write_batches(appended_batches(conn, max_order_id or 0, max_session_id or 0), file_writers)
+
+        for name, count in rows.items():
+            targets = [(f"{name}.csv", write_csv), (f"parquet/{name}/", write_parquet)]
+            files = " and ".join(["DuckDB"] + [target for target, enabled in targets if enabled])
+            print(f"  ✅ Appended {name}: {count:,} rows → {files}")
+        for name, build in refreshed.items():
+            keys = f"{build['affected_keys']:,} keys" if "affected_keys" in build else "full rebuild"
+            print(f"  ✅ Refreshed {name} ({build['mode']}, {keys}) in {build['seconds']:.2f}s")
+
+    print("\n🚀 Append Complete!")
 
 
 def main():
     """Generate and save all e-commerce datasets."""
+    args = parse_args()
 
     print("🏪 E-commerce Analytics Data Generation")
     print("=" * 50)
 
+    data_dir = Path(__file__).parent.parent / "data"
+    if args.append:
+        append_data(args, data_dir, data_dir / "ecommerce.duckdb")
+        return
+
     # Configuration - use minimal data for CI/testing
     minimal_mode = os.environ.get("MINIMAL_DATA", "false").lower() == "true"
 
@@ -53,101 +229,59 @@ def main():
     print()
 
     # Initialize generator
-    generator = EcommerceDataGenerator(**config)
-
-    # Generate all datasets
-    datasets = generator.generate_all_data()
+    generator = EcommerceDataGenerator(
+        **config,
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        attributes=args.attributes,
+    )
 
     # Setup data directory
-    data_dir = Path(__file__).parent.parent / "data"
     data_dir.mkdir(exist_ok=True)
-
-    print("\n💾 Saving datasets...")
-
-    # Save as CSV files
-    csv_files = {}
-    for name, df in datasets.items():
-        csv_path = data_dir / f"{name}.csv"
-        df.to_csv(csv_path, index=False)
-        csv_files[name] = csv_path
-        print(f"  ✅ Saved {name}: {len(df):,} rows → {csv_path.name}")
-
-    # Create DuckDB database and load data
-    print("\n🦆 Creating DuckDB database...")
     db_path = data_dir / "ecommerce.duckdb"
 
-    with duckdb.connect(str(db_path)) as conn:
-        # Create tables and load data
-        for name, df in datasets.items():
-            table_name = name
-
-            # Create table from DataFrame
-            conn.register(f"{name}_temp", df)
-            conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {name}_temp")
+    # Stream every shard straight into the data files and the DuckDB database
+    print(
+        f"🚀 Generating {config['num_customers']:,} customers, {config['num_products']:,} products and "
+        f"{config['num_orders']:,} orders ({args.chunk_size:,} rows per shard, {args.workers} worker(s))"
+    )
+    parquet_dir = data_dir / "parquet"
+    write_csv = args.format in ("csv", "both")
+    write_parquet = args.format in ("parquet", "both")
+    formats = {"csv": "CSV", "parquet": "Parquet", "both": "CSV and Parquet"}
+    print(f"\n💾 Streaming datasets into {formats[args.format]} files and DuckDB...")
 
-            print(f"  ✅ Created table '{table_name}': {len(df):,} rows")
-
-        # Create some useful views
-        print("\n📊 Creating analytical views...")
-
-        # Monthly revenue view
-        conn.execute(
-            """
-            CREATE OR REPLACE VIEW monthly_revenue AS
-            SELECT
-                DATE_TRUNC('month', order_date) as month,
-                COUNT(*) as order_count,
-                SUM(total_amount) as revenue,
-                AVG(total_amount) as avg_order_value
-            FROM orders
-            WHERE status = 'Completed'
-            GROUP BY DATE_TRUNC('month', order_date)
-            ORDER BY month
-        """
-        )
-
-        # Customer lifetime value view
-        conn.execute(
-            """
-            CREATE OR REPLACE VIEW customer_ltv AS
-            SELECT
-                c.customer_id,
-                c.customer_segment,
-                c.acquisition_channel,
-                COUNT(o.order_id) as total_orders,
-                SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as lifetime_value,
-                AVG(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE NULL END) as avg_order_value,
-                MIN(o.order_date) as first_order_date,
-                MAX(o.order_date) as last_order_date
-            FROM customers c
-            LEFT JOIN orders o ON c.customer_id = o.customer_id
-            GROUP BY c.customer_id, c.customer_segment, c.acquisition_channel
-        """
-        )
-
-        # Product performance view
-        conn.execute(
-            """
-            CREATE OR REPLACE VIEW product_performance AS
-            SELECT
-                p.product_id,
-                p.product_name,
-                p.category,
-                p.price,
-                COUNT(oi.order_id) as times_ordered,
-                SUM(oi.quantity) as total_quantity_sold,
-                SUM(oi.total_price) as total_revenue,
-                AVG(oi.unit_price) as avg_selling_price,
-                (AVG(oi.unit_price) - p.cost) as avg_profit_per_unit
-            FROM products p
-            LEFT JOIN order_items oi ON p.product_id = oi.product_id
-            GROUP BY p.product_id, p.product_name, p.category, p.price, p.cost
-        """
-        )
-
-        print("  ✅ Created monthly_revenue view")
-        print("  ✅ Created customer_ltv view")
-        print("  ✅ Created product_performance view")
+    with duckdb.connect(str(db_path)) as conn:
+        if args.memory_limit:
+            conn.execute(f"SET memory_limit = '{args.memory_limit}'")
+
+        writers = []
+        if write_csv:
+            writers.append(CsvTableWriter(data_dir))
+        if write_parquet:
+            writers.append(ParquetTableWriter(parquet_dir))
+        else:
+            writers.append(DuckDBTableWriter(conn))
+
+        for name, rows in write_batches(generator.iter_batches(), writers).items():
+            targets = [(f"{name}.csv", write_csv), (f"parquet/{name}/", write_parquet)]
+            files = " and ".join(target for target, enabled in targets if enabled)
+            print(f"  ✅ Saved {name}: {rows:,} rows → {files}")
+
+        if write_parquet:
+            print("\n🦆 Loading DuckDB tables from Parquet...")
+            for name, rows in load_parquet_tables(conn, parquet_dir, TABLES).items():
+                print(f"  ✅ Created table '{name}': {rows:,} rows")
+
+        # Time-ordered fact tables keep date-range scans and order listing pages cheap
+        cluster_by_time(conn)
+
+        # Materialize the analytical summary tables
+        print("\n📊 Materializing summary tables...")
+
+        for name, build in refresh_summaries(conn, mode="full").items():
+            print(f"  ✅ Created {name} table: {build['rows']:,} rows in {build['seconds']:.2f}s")
 
         # Show database summary
         print("\n📈 Database Summary:")
@@ -123,98 +123,40 @@ def customer_analysis(conn):
 
     print(acquisition.to_string(index=False))
 
-    # Customer cohort analysis (monthly)
-    print("\n📅 Customer Cohort Analysis (First 6 months):")
-    cohorts = conn.execute(
-        """
-        WITH customer_cohorts AS (
-            SELECT
-                c.customer_id,
-                DATE_TRUNC('month', c.registration_date) as cohort_month,
-                MIN(o.order_date) as first_order_month
-            FROM customers c
-            LEFT JOIN orders o ON c.customer_id = o.customer_id AND o.status = 'Completed'
-            WHERE c.registration_date >= '2024-01-01'
-            GROUP BY c.customer_id, DATE_TRUNC('month', c.registration_date)
-        ),
-        cohort_table AS (
-            SELECT
-                cohort_month,
-                DATE_DIFF('month', cohort_month, first_order_month) as month_number,
-                COUNT(DISTINCT customer_id) as customers
-            FROM customer_cohorts
-            WHERE first_order_month IS NOT NULL
-            GROUP BY cohort_month, DATE_DIFF('month', cohort_month, first_order_month)
-        )
+    # Customer cohort analysis: active customers per month since the first purchase
+    print("\n📅 Customer Cohort Retention (First 6 months):")
+    cohorts = (
+        conn.execute(
+            """
         SELECT
-            cohort_month,
-            SUM(CASE WHEN month_number = 0 THEN customers ELSE 0 END) as month_0,
-            SUM(CASE WHEN month_number = 1 THEN customers ELSE 0 END) as month_1,
-            SUM(CASE WHEN month_number = 2 THEN customers ELSE 0 END) as month_2,
-            SUM(CASE WHEN month_number = 3 THEN customers ELSE 0 END) as month_3,
-            SUM(CASE WHEN month_number = 4 THEN customers ELSE 0 END) as month_4,
-            SUM(CASE WHEN month_number = 5 THEN customers ELSE 0 END) as month_5
-        FROM cohort_table
-        GROUP BY cohort_month
-        ORDER BY cohort_month
-        LIMIT 10
+            cohort as cohort_month,
+            DATE_DIFF('month', cohort, period) as month_number,
+            customers
+        FROM cohort_activity_month
+        WHERE DATE_DIFF('month', cohort, period) < 6
     """
-    ).fetchdf()
+        )
+        .fetchdf()
+        .pivot_table(index="cohort_month", columns="month_number", values="customers", fill_value=0)
+        .reindex(columns=range(6), fill_value=0)
+        .astype(int)
+        .add_prefix("month_")
+        .reset_index()
+    )
 
     print(cohorts.to_string(index=False))
 
-    # RFM Analysis (Recency, Frequency, Monetary)
+    # RFM Analysis (Recency, Frequency, Monetary), scored in the customer_rfm summary table
     print("\n🔍 RFM Customer Segmentation:")
     rfm = conn.execute(
         """
-        WITH rfm_metrics AS (
-            SELECT
-                c.customer_id,
-                DATE_DIFF('day', MAX(o.order_date), '2024-12-31') as recency,
-                COUNT(o.order_id) as frequency,
-                SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as monetary
-            FROM customers c
-            LEFT JOIN orders o ON c.customer_id = o.customer_id
-            WHERE c.registration_date <= '2024-12-01'  -- At least 1 month to evaluate
-            GROUP BY c.customer_id
-        ),
-        rfm_scores AS (
-            SELECT
-                customer_id,
-                recency,
-                frequency,
-                monetary,
-                NTILE(5) OVER (ORDER BY recency DESC) as r_score,
-                NTILE(5) OVER (ORDER BY frequency) as f_score,
-                NTILE(5) OVER (ORDER BY monetary) as m_score
-            FROM rfm_metrics
-            WHERE monetary > 0  -- Only customers who made purchases
-        ),
-        rfm_segments AS (
-            SELECT
-                customer_id,
-                CASE
-                    WHEN r_score >= 4 AND f_score >= 4 THEN 'Champions'
-                    WHEN r_score >= 3 AND f_score >= 3 THEN 'Loyal Customers'
-                    WHEN r_score >= 3 AND f_score >= 2 THEN 'Potential Loyalists'
-                    WHEN r_score >= 4 AND f_score <= 2 THEN 'New Customers'
-                    WHEN r_score >= 2 AND f_score >= 3 THEN 'At Risk'
-                    WHEN r_score <= 2 AND f_score >= 4 THEN 'Cannot Lose Them'
-                    WHEN r_score <= 2 AND f_score <= 2 THEN 'Hibernating'
-                    ELSE 'Others'
-                END as rfm_segment,
-                recency,
-                frequency,
-                monetary
-            FROM rfm_scores
-        )
         SELECT
             rfm_segment,
             COUNT(*) as customers,
             ROUND(AVG(recency), 1) as avg_recency_days,
             ROUND(AVG(frequency), 1) as avg_frequency,
             ROUND(AVG(monetary), 2) as avg_monetary
-        FROM rfm_segments
+        FROM customer_rfm
         GROUP BY rfm_segment
         ORDER BY AVG(monetary) DESC
     """
@@ -14,12 +14,22 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import os
+import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 import warnings
 
+# Make the src directory importable regardless of how the app is launched
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.metrics import revenue_growth
+from utils.summary_tables import summary_source
+
 warnings.filterwarnings("ignore")
 
+DB_PATH = Path(os.environ.get("DATABASE_PATH", Path(__file__).parent.parent / "data" / "ecommerce.duckdb"))
+
 # Page configuration
 st.set_page_config(
     page_title="E-commerce Analytics Dashboard",
@@ -60,101 +70,159 @@ st.markdown(
 )
 
 
-@st.cache_data
-def load_data():
-    """Load data from DuckDB database with caching."""
-    data_dir = Path(__file__).parent.parent / "data"
-    db_path = data_dir / "ecommerce.duckdb"
-
-    if not db_path.exists():
+@st.cache_resource
+def get_connection():
+    """Read-only connection to the analytics database, shared by every session."""
+    if not DB_PATH.exists():
         st.error("❌ Database not found. Please run 01_data_generation.py first!")
         st.stop()
 
-    conn = duckdb.connect(str(db_path), read_only=True)
+    return duckdb.connect(str(DB_PATH), read_only=True)
+
+
+@st.cache_data
+def run_query(query, params=()):
+    """Run an aggregate query and cache its (small) result per query and parameters."""
+    # Each call gets its own cursor; sessions run on separate threads
+    with get_connection().cursor() as cursor:
+        return cursor.execute(query, list(params)).fetchdf()
+
+
+@st.cache_data
+def summary(name):
+    """A summary table, or its defining query over the raw tables on a database built without it."""
+    with get_connection().cursor() as cursor:
+        return summary_source(cursor, name)
 
-    # Load main datasets
-    customers = conn.execute("SELECT * FROM customers").fetchdf()
-    products = conn.execute("SELECT * FROM products").fetchdf()
-    orders = conn.execute("SELECT * FROM orders").fetchdf()
-    order_items = conn.execute("SELECT * FROM order_items").fetchdf()
-    web_sessions = conn.execute("SELECT * FROM web_sessions").fetchdf()
 
-    # Load analytical views
-    monthly_revenue = conn.execute("SELECT * FROM monthly_revenue ORDER BY month").fetchdf()
-    customer_ltv = conn.execute("SELECT * FROM customer_ltv").fetchdf()
-    product_performance = conn.execute("SELECT * FROM product_performance").fetchdf()
+def date_range_sql(column, date_filter):
+    """WHERE-clause condition and parameters for an inclusive range of whole days."""
+    if not date_filter:
+        return "TRUE", ()
+    return f"{column} >= ? AND {column} < ?", (date_filter[0], date_filter[1] + timedelta(days=1))
+
+
+def month_range_sql(date_filter):
+    """WHERE-clause condition and parameters selecting monthly rows whose ``month`` starts within the range."""
+    if not date_filter:
+        return "TRUE", ()
+    return "month BETWEEN ? AND ?", tuple(date_filter)
+
+
+def filter_sql(conditions):
+    """AND together ``(condition, values)`` pairs whose values are not None (None = no filter)."""
+    active = [(condition, list(values)) for condition, values in conditions if values is not None]
+    return " AND ".join(condition for condition, _ in active) or "TRUE", tuple(values for _, values in active)
+
+
+# Semi-join restricting order ids to customers of the selected segments
+SEGMENT_CUSTOMERS = "SELECT customer_id FROM customers WHERE customer_segment IN (SELECT UNNEST(?))"
+
+
+def customer_filter_sql(segments=None, categories=None):
+    """Restrict customers (or per-customer rows) to the segments and to buyers of the categories."""
+    categories_table = summary("customer_categories")
+    category_customers = f"SELECT customer_id FROM {categories_table} WHERE category IN (SELECT UNNEST(?))"
+    return filter_sql(
+        [
+            ("customer_segment IN (SELECT UNNEST(?))", segments),
+            (f"customer_id IN ({category_customers})", categories),
+        ]
+    )
 
-    conn.close()
 
+@st.cache_data
+def load_filter_options():
+    """Date bounds and the segment and category choices for the sidebar."""
+    min_date, max_date = run_query("SELECT MIN(order_date), MAX(order_date) FROM orders").iloc[0]
+    segments = run_query("SELECT DISTINCT customer_segment FROM customers ORDER BY 1")["customer_segment"]
+    categories = run_query("SELECT DISTINCT category FROM products ORDER BY 1")["category"]
     return {
-        "customers": customers,
-        "products": products,
-        "orders": orders,
-        "order_items": order_items,
-        "web_sessions": web_sessions,
-        "monthly_revenue": monthly_revenue,
-        "customer_ltv": customer_ltv,
-        "product_performance": product_performance,
+        "min_date": pd.Timestamp(min_date).date(),
+        "max_date": pd.Timestamp(max_date).date(),
+        "segments": segments.tolist(),
+        "categories": categories.tolist(),
     }
 
 
-def create_kpi_metrics(data, date_filter=None):
-    """Create KPI metrics for the dashboard."""
+@st.cache_data
+def load_revenue_growth(date_from=None, date_to=None):
+    """Revenue growth versus the previous equivalent window, shared with the API (rollup or raw orders)."""
+    with get_connection().cursor() as cursor:
+        return revenue_growth(cursor, date_from, date_to)
 
-    # Apply date filtering if provided
-    orders = data["orders"].copy()
-    if date_filter:
-        orders = orders[
-            (pd.to_datetime(orders["order_date"]) >= date_filter[0])
-            & (pd.to_datetime(orders["order_date"]) <= date_filter[1])
-        ]
 
-    completed_orders = orders[orders["status"] == "Completed"]
+def create_kpi_metrics(date_filter=None, full_range=True):
+    """Create KPI metrics for the dashboard."""
+
+    condition, params = date_range_sql("order_date", date_filter)
+    kpis = run_query(
+        f"""
+        SELECT
+            COALESCE(SUM(total_amount) FILTER (WHERE status = 'Completed'), 0) as total_revenue,
+            COUNT(*) FILTER (WHERE status = 'Completed') as total_orders,
+            COUNT(DISTINCT customer_id) as total_customers,
+            COALESCE(AVG(total_amount) FILTER (WHERE status = 'Completed'), 0) as avg_order_value
+        FROM orders
+        WHERE {condition}
+    """,
+        params,
+    ).iloc[0]
 
-    # Calculate KPIs
-    total_revenue = completed_orders["total_amount"].sum()
-    total_orders = len(completed_orders)
-    total_customers = orders["customer_id"].nunique()
-    avg_order_value = completed_orders["total_amount"].mean() if total_orders > 0 else 0
-
-    # Growth calculations (compare with previous period)
-    if len(orders) > 0:
-        orders["order_date"] = pd.to_datetime(orders["order_date"])
-        current_period_days = (orders["order_date"].max() - orders["order_date"].min()).days
-
-        if current_period_days > 30:
-            # Compare with previous month
-            cutoff_date = orders["order_date"].max() - timedelta(days=30)
-            recent_orders = orders[orders["order_date"] >= cutoff_date]
-            prev_orders = orders[orders["order_date"] < cutoff_date]
-
-            recent_revenue = recent_orders[recent_orders["status"] == "Completed"]["total_amount"].sum()
-            prev_revenue = prev_orders[prev_orders["status"] == "Completed"]["total_amount"].sum()
-
-            revenue_growth = ((recent_revenue - prev_revenue) / prev_revenue * 100) if prev_revenue > 0 else 0
-        else:
-            revenue_growth = 0
+    # Growth versus the previous equivalent window (same definition as the API);
+    # a range covering all orders is unfiltered, i.e. the trailing 30 days
+    if date_filter and not full_range:
+        growth = load_revenue_growth(date_filter[0], date_filter[1])
     else:
-        revenue_growth = 0
+        growth = load_revenue_growth()
 
     return {
-        "total_revenue": total_revenue,
-        "total_orders": total_orders,
-        "total_customers": total_customers,
-        "avg_order_value": avg_order_value,
-        "revenue_growth": revenue_growth,
+        "total_revenue": float(kpis["total_revenue"]),
+        "total_orders": int(kpis["total_orders"]),
+        "total_customers": int(kpis["total_customers"]),
+        "avg_order_value": float(kpis["avg_order_value"]),
+        "revenue_growth": round(growth, 2),
     }
 
 
-def create_revenue_charts(data, date_filter=None):
-    """Create revenue analysis charts."""
+def create_revenue_charts(date_filter=None, segments=None, categories=None):
+    """Create revenue analysis charts.
 
-    monthly_revenue = data["monthly_revenue"].copy()
-    if date_filter:
-        monthly_revenue["month"] = pd.to_datetime(monthly_revenue["month"])
-        monthly_revenue = monthly_revenue[
-            (monthly_revenue["month"] >= date_filter[0]) & (monthly_revenue["month"] <= date_filter[1])
-        ]
+    With a category filter, revenue is the item revenue of those categories.
+    Both charts cover the months of the date range.
+    """
+
+    month_filter, month_params = month_range_sql(date_filter)
+    if categories is not None:
+        filters, params = filter_sql(
+            [("customer_segment IN (SELECT UNNEST(?))", segments), ("category IN (SELECT UNNEST(?))", categories)]
+        )
+        source = f"""(
+            SELECT month, customer_segment, revenue FROM {summary('category_rollup_month')}
+            WHERE status = 'Completed' AND {filters}
+        )"""
+    else:
+        filters, params = filter_sql([("customer_segment IN (SELECT UNNEST(?))", segments)])
+        source = f"""(
+            SELECT period as month, customer_segment, revenue FROM {summary('revenue_rollup_month')}
+            WHERE status = 'Completed' AND {filters}
+        )"""
+
+    if segments is None and categories is None:
+        monthly_revenue = run_query(
+            f"SELECT month, revenue FROM {summary('monthly_revenue')} WHERE {month_filter} ORDER BY month",
+            month_params,
+        )
+    else:
+        monthly_revenue = run_query(
+            f"""
+            SELECT month, SUM(revenue) as revenue FROM {source}
+            WHERE {month_filter}
+            GROUP BY month
+            ORDER BY month
+        """,
+            params + month_params,
+        )
 
     # Monthly revenue trend
     fig_revenue_trend = px.line(
@@ -167,13 +235,20 @@ def create_revenue_charts(data, date_filter=None):
     fig_revenue_trend.update_traces(line=dict(width=3))
     fig_revenue_trend.update_layout(height=400)
 
-    # Revenue by customer segment
-    customer_ltv = data["customer_ltv"]
-    segment_revenue = customer_ltv.groupby("customer_segment")["lifetime_value"].sum().reset_index()
+    # Revenue by customer segment over the same months
+    segment_revenue = run_query(
+        f"""
+        SELECT customer_segment, SUM(revenue) as revenue
+        FROM {source}
+        WHERE customer_segment IS NOT NULL AND {month_filter}
+        GROUP BY customer_segment
+    """,
+        params + month_params,
+    )
 
     fig_segment = px.pie(
         segment_revenue,
-        values="lifetime_value",
+        values="revenue",
         names="customer_segment",
         title="Revenue by Customer Segment",
     )
@@ -182,25 +257,52 @@ def create_revenue_charts(data, date_filter=None):
     return fig_revenue_trend, fig_segment
 
 
-def create_product_charts(data):
+def product_performance_sql(segments=None, categories=None):
+    """Per-product performance table expression and parameters for the filters."""
+    category_filter, category_params = filter_sql([("category IN (SELECT UNNEST(?))", categories)])
+    if segments is None:
+        return f"(SELECT * FROM {summary('product_performance')} WHERE {category_filter})", category_params
+
+    # Only the order items of the segments' customers
+    return (
+        f"""(
+            SELECT
+                p.product_id, p.product_name, p.category,
+                SUM(ps.times_ordered) as times_ordered,
+                SUM(ps.total_quantity_sold) as total_quantity_sold,
+                SUM(ps.total_revenue) as total_revenue,
+                SUM(ps.unit_price_sum) / SUM(ps.times_ordered) as avg_selling_price
+            FROM {summary('product_segment_performance')} ps
+            JOIN products p ON ps.product_id = p.product_id
+            WHERE ps.customer_segment IN (SELECT UNNEST(?)) AND {category_filter}
+            GROUP BY p.product_id, p.product_name, p.category
+        )""",
+        (list(segments),) + category_params,
+    )
+
+
+def create_product_charts(segments=None, categories=None):
     """Create product analysis charts."""
 
+    products, params = product_performance_sql(segments, categories)
+
     # Category performance
-    category_perf = (
-        data["product_performance"]
-        .groupby("category")
-        .agg(
-            {
-                "total_revenue": "sum",
-                "times_ordered": "sum",
-                "total_quantity_sold": "sum",
-            }
-        )
-        .reset_index()
+    category_perf = run_query(
+        f"""
+        SELECT
+            category,
+            SUM(total_revenue) as total_revenue,
+            SUM(times_ordered) as times_ordered,
+            SUM(total_quantity_sold) as total_quantity_sold
+        FROM {products}
+        GROUP BY category
+        ORDER BY total_revenue
+    """,
+        params,
     )
 
     fig_category = px.bar(
-        category_perf.sort_values("total_revenue", ascending=True),
+        category_perf,
         x="total_revenue",
         y="category",
         orientation="h",
@@ -210,7 +312,9 @@ def create_product_charts(data):
     fig_category.update_layout(height=500)
 
     # Top products
-    top_products = data["product_performance"].nlargest(10, "total_revenue")
+    top_products = run_query(
+        f"SELECT product_name, total_revenue FROM {products} ORDER BY total_revenue DESC NULLS LAST LIMIT 10", params
+    )
 
     fig_top_products = px.bar(
         top_products,
@@ -225,12 +329,22 @@ def create_product_charts(data):
     return fig_category, fig_top_products
 
 
-def create_customer_charts(data):
+def create_customer_charts(segments=None, categories=None):
     """Create customer analysis charts."""
 
+    filters, params = customer_filter_sql(segments, categories)
+
     # Customer acquisition channels
-    acquisition = data["customers"]["acquisition_channel"].value_counts().reset_index()
-    acquisition.columns = ["channel", "customers"]
+    acquisition = run_query(
+        f"""
+        SELECT acquisition_channel as channel, COUNT(*) as customers
+        FROM customers
+        WHERE {filters}
+        GROUP BY acquisition_channel
+        ORDER BY customers DESC
+    """,
+        params,
+    )
 
     fig_acquisition = px.pie(
         acquisition,
@@ -240,29 +354,79 @@ def create_customer_charts(data):
     )
     fig_acquisition.update_layout(height=400)
 
-    # Customer LTV distribution by segment
-    fig_ltv_box = px.box(
-        data["customer_ltv"][data["customer_ltv"]["lifetime_value"] > 0],
-        x="customer_segment",
-        y="lifetime_value",
+    # Customer LTV distribution by segment: quartiles and Tukey whiskers computed in DuckDB
+    ltv_stats = run_query(
+        f"""
+        WITH ltv AS MATERIALIZED (
+            SELECT customer_segment, lifetime_value FROM {summary('customer_ltv')}
+            WHERE lifetime_value > 0 AND {filters}
+        ),
+        quartiles AS (
+            SELECT
+                customer_segment,
+                QUANTILE_CONT(lifetime_value, 0.25) as q1,
+                MEDIAN(lifetime_value) as median,
+                QUANTILE_CONT(lifetime_value, 0.75) as q3
+            FROM ltv
+            GROUP BY customer_segment
+        )
+        SELECT
+            q.customer_segment, q.q1, q.median, q.q3,
+            MIN(l.lifetime_value) FILTER (WHERE l.lifetime_value >= q.q1 - 1.5 * (q.q3 - q.q1)) as lowerfence,
+            MAX(l.lifetime_value) FILTER (WHERE l.lifetime_value <= q.q3 + 1.5 * (q.q3 - q.q1)) as upperfence
+        FROM quartiles q
+        JOIN ltv l USING (customer_segment)
+        GROUP BY ALL
+        ORDER BY q.customer_segment
+    """,
+        params,
+    )
+
+    fig_ltv_box = go.Figure(
+        go.Box(
+            x=ltv_stats["customer_segment"],
+            q1=ltv_stats["q1"],
+            median=ltv_stats["median"],
+            q3=ltv_stats["q3"],
+            lowerfence=ltv_stats["lowerfence"],
+            upperfence=ltv_stats["upperfence"],
+        )
+    )
+    fig_ltv_box.update_layout(
         title="Customer Lifetime Value Distribution by Segment",
+        xaxis_title="customer_segment",
+        yaxis_title="lifetime_value",
+        height=400,
     )
-    fig_ltv_box.update_layout(height=400)
 
     return fig_acquisition, fig_ltv_box
 
 
-def create_marketing_charts(data):
-    """Create marketing analysis charts."""
+def create_marketing_charts(segments=None):
+    """Create marketing analysis charts.
+
+    Sessions carry no products, so only the segment filter applies; it drops
+    anonymous sessions.
+    """
+
+    filters, params = filter_sql([("customer_segment IN (SELECT UNNEST(?))", segments)])
 
     # Traffic source performance
-    traffic_perf = (
-        data["web_sessions"]
-        .groupby("traffic_source")
-        .agg({"session_id": "count", "converted": "sum", "revenue": "sum"})
-        .reset_index()
+    traffic_perf = run_query(
+        f"""
+        SELECT
+            traffic_source,
+            SUM(sessions) as session_id,
+            SUM(conversions) as converted,
+            SUM(revenue) as revenue,
+            ROUND(SUM(conversions) * 100.0 / SUM(sessions), 2) as conversion_rate
+        FROM {summary('session_rollup_day')}
+        WHERE {filters}
+        GROUP BY traffic_source
+        ORDER BY traffic_source
+    """,
+        params,
     )
-    traffic_perf["conversion_rate"] = (traffic_perf["converted"] / traffic_perf["session_id"] * 100).round(2)
 
     fig_traffic = px.scatter(
         traffic_perf,
@@ -280,19 +444,18 @@ def create_marketing_charts(data):
     fig_traffic.update_layout(height=400)
 
     # Device performance
-    device_perf = (
-        data["web_sessions"]
-        .groupby("device_type")
-        .agg(
-            {
-                "session_id": "count",
-                "converted": "sum",
-                "session_duration_seconds": "mean",
-            }
-        )
-        .reset_index()
+    device_perf = run_query(
+        f"""
+        SELECT
+            device_type,
+            ROUND(SUM(conversions) * 100.0 / SUM(sessions), 2) as conversion_rate
+        FROM {summary('session_rollup_day')}
+        WHERE {filters}
+        GROUP BY device_type
+        ORDER BY device_type
+    """,
+        params,
     )
-    device_perf["conversion_rate"] = (device_perf["converted"] / device_perf["session_id"] * 100).round(2)
 
     fig_device = px.bar(
         device_perf,
@@ -306,6 +469,71 @@ def create_marketing_charts(data):
     return fig_traffic, fig_device
 
 
+RECENT_ORDERS_COLUMNS = ["order_id", "customer_id", "order_date", "status", "payment_method", "total_amount"]
+
+
+@st.cache_data
+def load_recent_orders(candidates=20000):
+    """The latest orders with their customer segment and item categories, filtered in memory."""
+    return run_query(
+        f"""
+        WITH recent AS (
+            SELECT order_id, customer_id, order_date, status, payment_method, ROUND(total_amount, 2) as total_amount
+            FROM orders
+            ORDER BY order_date DESC
+            LIMIT {candidates}
+        )
+        SELECT r.*, c.customer_segment, LIST(DISTINCT p.category) as categories
+        FROM recent r
+        LEFT JOIN customers c ON r.customer_id = c.customer_id
+        LEFT JOIN order_items oi ON oi.order_id = r.order_id AND oi.order_id IN (SELECT order_id FROM recent)
+        LEFT JOIN products p ON oi.product_id = p.product_id
+        GROUP BY ALL
+        ORDER BY r.order_date DESC
+    """
+    )
+
+
+def recent_orders(segments=None, categories=None, limit=50):
+    """Latest orders of the segments' customers containing items of the categories.
+
+    Filters the cached latest orders, and only scans all orders when fewer
+    than ``limit`` of them match.
+    """
+    if segments is None and categories is None:
+        return load_recent_orders()[RECENT_ORDERS_COLUMNS].head(limit)
+
+    recent = load_recent_orders()
+    matches = pd.Series(True, index=recent.index)
+    if segments is not None:
+        matches &= recent["customer_segment"].isin(segments)
+    if categories is not None:
+        matches &= recent["categories"].map(lambda found: not set(categories).isdisjoint(found))
+    if matches.sum() >= limit:
+        return recent.loc[matches, RECENT_ORDERS_COLUMNS].head(limit)
+
+    filters, params = filter_sql(
+        [
+            (f"customer_id IN ({SEGMENT_CUSTOMERS})", segments),
+            (
+                "order_id IN (SELECT order_id FROM order_items WHERE product_id IN "
+                "(SELECT product_id FROM products WHERE category IN (SELECT UNNEST(?))))",
+                categories,
+            ),
+        ]
+    )
+    return run_query(
+        f"""
+        SELECT order_id, customer_id, order_date, status, payment_method, ROUND(total_amount, 2) as total_amount
+        FROM orders
+        WHERE {filters}
+        ORDER BY order_date DESC
+        LIMIT {limit}
+    """,
+        params,
+    )
+
+
 def main():
     """Main dashboard application."""
 
@@ -315,9 +543,9 @@ def main():
         unsafe_allow_html=True,
     )
 
-    # Load data
+    # Load filter choices
     with st.spinner("Loading data..."):
-        data = load_data()
+        options = load_filter_options()
 
     # Sidebar filters
     st.sidebar.markdown(
@@ -326,8 +554,7 @@ def main():
     )
 
     # Date range filter
-    min_date = pd.to_datetime(data["orders"]["order_date"]).min().date()
-    max_date = pd.to_datetime(data["orders"]["order_date"]).max().date()
+    min_date, max_date = options["min_date"], options["max_date"]
 
     date_range = st.sidebar.date_input(
         "Select Date Range",
@@ -336,26 +563,28 @@ def main():
         max_value=max_date,
     )
 
-    # Convert to datetime for filtering
-    if len(date_range) == 2:
-        date_filter = (pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1]))
-    else:
-        date_filter = None
+    # Inclusive range of whole days, or None until both ends are picked
+    date_filter = tuple(date_range) if len(date_range) == 2 else None
+    full_range = date_filter is None or (date_filter[0] <= min_date and date_filter[1] >= max_date)
 
     # Customer segment filter
     segments = st.sidebar.multiselect(
         "Customer Segments",
-        options=data["customers"]["customer_segment"].unique(),
-        default=data["customers"]["customer_segment"].unique(),
+        options=options["segments"],
+        default=options["segments"],
     )
 
     # Product category filter
     categories = st.sidebar.multiselect(
         "Product Categories",
-        options=data["products"]["category"].unique(),
-        default=data["products"]["category"].unique(),
+        options=options["categories"],
+        default=options["categories"],
     )
 
+    # None when every option is selected, so charts keep reading the summary tables
+    segment_filter = tuple(segments) if set(segments) != set(options["segments"]) else None
+    category_filter = tuple(categories) if set(categories) != set(options["categories"]) else None
+
     # Info box
     st.sidebar.markdown(
         """
@@ -376,7 +605,7 @@ def main():
     )
 
     # Calculate KPIs
-    kpis = create_kpi_metrics(data, date_filter)
+    kpis = create_kpi_metrics(date_filter, full_range)
 
     # KPI Cards
     st.subheader("📈 Key Performance Indicators")
@@ -405,7 +634,7 @@ def main():
     st.subheader("💰 Revenue Analysis")
     col1, col2 = st.columns(2)
 
-    fig_revenue_trend, fig_segment = create_revenue_charts(data, date_filter)
+    fig_revenue_trend, fig_segment = create_revenue_charts(date_filter, segment_filter, category_filter)
 
     with col1:
         st.plotly_chart(fig_revenue_trend, use_container_width=True)
@@ -418,7 +647,7 @@ def main():
     # Product Analysis
     st.subheader("📦 Product Analysis")
 
-    fig_category, fig_top_products = create_product_charts(data)
+    fig_category, fig_top_products = create_product_charts(segment_filter, category_filter)
 
     col1, col2 = st.columns([2, 3])
 
@@ -433,7 +662,7 @@ def main():
     # Customer Analysis
     st.subheader("👥 Customer Analysis")
 
-    fig_acquisition, fig_ltv_box = create_customer_charts(data)
+    fig_acquisition, fig_ltv_box = create_customer_charts(segment_filter, category_filter)
 
     col1, col2 = st.columns(2)
 
@@ -448,7 +677,7 @@ def main():
     # Marketing Analysis
     st.subheader("🎯 Marketing Analysis")
 
-    fig_traffic, fig_device = create_marketing_charts(data)
+    fig_traffic, fig_device = create_marketing_charts(segment_filter)
 
     col1, col2 = st.columns(2)
 
@@ -467,62 +696,53 @@ def main():
 
     with tab1:
         st.write("**Top 20 Products by Revenue**")
-        top_products_detailed = (
-            data["product_performance"]
-            .nlargest(20, "total_revenue")[
-                [
-                    "product_name",
-                    "category",
-                    "times_ordered",
-                    "total_quantity_sold",
-                    "total_revenue",
-                    "avg_selling_price",
-                ]
-            ]
-            .round(2)
+        products, params = product_performance_sql(segment_filter, category_filter)
+        top_products_detailed = run_query(
+            f"""
+            SELECT product_name, category, times_ordered, total_quantity_sold,
+                   ROUND(total_revenue, 2) as total_revenue, ROUND(avg_selling_price, 2) as avg_selling_price
+            FROM {products} products
+            ORDER BY products.total_revenue DESC NULLS LAST
+            LIMIT 20
+        """,
+            params,
         )
         st.dataframe(top_products_detailed, use_container_width=True)
 
     with tab2:
         st.write("**Top 20 Customers by Lifetime Value**")
-        top_customers = (
-            data["customer_ltv"]
-            .nlargest(20, "lifetime_value")[
-                [
-                    "customer_id",
-                    "customer_segment",
-                    "acquisition_channel",
-                    "total_orders",
-                    "lifetime_value",
-                    "avg_order_value",
-                ]
-            ]
-            .round(2)
+        filters, params = customer_filter_sql(segment_filter, category_filter)
+        top_customers = run_query(
+            f"""
+            SELECT customer_id, customer_segment, acquisition_channel, total_orders,
+                   ROUND(lifetime_value, 2) as lifetime_value, ROUND(avg_order_value, 2) as avg_order_value
+            FROM {summary('customer_ltv')} customer_ltv
+            WHERE {filters}
+            ORDER BY customer_ltv.lifetime_value DESC NULLS LAST
+            LIMIT 20
+        """,
+            params,
         )
         st.dataframe(top_customers, use_container_width=True)
 
     with tab3:
         st.write("**Monthly Performance Summary**")
-        monthly_summary = data["monthly_revenue"].round(2)
+        month_filter, month_params = month_range_sql(date_filter)
+        monthly_summary = run_query(
+            f"""
+            SELECT month, order_count, ROUND(revenue, 2) as revenue, ROUND(avg_order_value, 2) as avg_order_value
+            FROM {summary('monthly_revenue')}
+            WHERE {month_filter}
+            ORDER BY month
+        """,
+            month_params,
+        )
         st.dataframe(monthly_summary, use_container_width=True)
 
     with tab4:
         st.write("**Recent 50 Orders**")
-        recent_orders = (
-            data["orders"]
-            .nlargest(50, "order_date")[
-                [
-                    "order_id",
-                    "customer_id",
-                    "order_date",
-                    "status",
-                    "payment_method",
-                    "total_amount",
-                ]
-            ]
-            .round(2)
-        )
-        st.dataframe(recent_orders, use_container_width=True)
+        latest_orders = recent_orders(segment_filter, category_filter)
+        st.dataframe(latest_orders, use_container_width=True)
 
     # Footer
     st.markdown("---")
@@ -0,0 +1,251 @@
+"""
+Analytics Result Cache
+======================
+
+Caches encoded endpoint responses keyed by endpoint name and normalized query
+parameters. The analytics database is read-only and only changes when the
+data generation script rebuilds it, so every key also carries the database
+file version (inode, mtime, size): a rebuild makes all earlier entries
+unreachable without any explicit invalidation call.
+
+Entries live in an in-process LRU with a TTL by default; a Redis backend can
+be plugged in to share the cache between workers. Redis calls run in a worker
+thread, and a failing Redis is logged and treated as a miss, so the response
+is computed as if caching were off.
+"""
+
+import os
+import time
+import struct
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from api.serialization import encode_json
+
+logger = logging.getLogger(__name__)
+
+# Each stored value is prefixed with the compute time so hits can report time saved
+_COST_HEADER = struct.Struct("d")
+
+# Seconds a Redis call may block before it counts as a backend error
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 0.5))
+
+
+def database_file_version(db_path: Optional[Path]) -> Tuple[int, int, int]:
+    """Identify the current database file by inode, mtime and size."""
+    if db_path is None:
+        return (0, 0, 0)
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
+        return (0, 0, 0)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class MemoryCacheBackend:
+    """Thread-safe LRU cache with per-entry expiry."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Cache backend storing entries in Redis with native expiry."""
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client, prefix: str = "ecommerce-analytics:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCacheBackend":
+        import redis
+
+        client = redis.Redis.from_url(
+            url, socket_timeout=REDIS_SOCKET_TIMEOUT, socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+        )
+        return cls(client, **kwargs)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+
+class ResultCache:
+    """Response cache with hit-rate and saved-time accounting.
+
+    ``version`` is called on every lookup and its result is folded into the
+    key; when it changes, the local backend is cleared. Calls to a blocking
+    backend run off the event loop, and backend errors are logged and counted
+    instead of failing the request.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        ttl: Optional[float] = None,
+        version: Optional[Callable[[], Hashable]] = None,
+        enabled: Optional[bool] = None,
+    ):
+        if backend is None:
+            backend = MemoryCacheBackend(int(os.environ.get("CACHE_MAX_ENTRIES", 1024)))
+        self.backend = backend
+        self.ttl = ttl if ttl is not None else float(os.environ.get("CACHE_TTL_SECONDS", 300))
+        self.enabled = enabled if enabled is not None else os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+        self.version = version or (lambda: 0)
+        self._current_version: Hashable = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.backend_errors = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def normalize_params(params: Dict[str, Any]) -> str:
+        """Canonical representation of query parameters (order-free, ``None`` dropped)."""
+        items = sorted((k, v) for k, v in params.items() if v is not None)
+        return "&".join(f"{k}={v}" for k, v in items)
+
+    def make_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        version = self.version()
+        if version != self._current_version:
+            with self._lock:
+                if self._current_version is not None:
+                    logger.info("Database file changed, invalidating result cache")
+                    self.invalidations += 1
+                    if isinstance(self.backend, MemoryCacheBackend):
+                        self.backend.clear()
+                self._current_version = version
+        version_tag = "-".join(str(part) for part in version) if isinstance(version, tuple) else str(version)
+        return f"{endpoint}:{version_tag}:{self.normalize_params(params)}"
+
+    async def _backend_call(self, method: Callable[..., Any], *args) -> Any:
+        """Call a backend method (in a worker thread if it blocks); errors are logged and return ``None``."""
+        try:
+            if self.backend.blocking:
+                return await asyncio.to_thread(method, *args)
+            return method(*args)
+        except Exception as e:
+            logger.warning(f"Result cache {self.backend.name} backend error: {e}")
+            with self._lock:
+                self.backend_errors += 1
+            return None
+
+    async def get_or_compute(
+        self, endpoint: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]]
+    ) -> Tuple[bytes, bool]:
+        """Return ``(encoded body, hit)`` for an endpoint, computing it on a miss.
+
+        Concurrent misses for the same key share one computation.
+        """
+        if not self.enabled:
+            return encode_json(await compute()), False
+
+        key = self.make_key(endpoint, params)
+        stored = await self._backend_call(self.backend.get, key)
+        if stored is not None:
+            (cost,) = _COST_HEADER.unpack_from(stored)
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += cost
+            return stored[_COST_HEADER.size :], True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            with self._lock:
+                self.hits += 1
+            return await asyncio.shield(pending), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            started = time.perf_counter()
+            body = encode_json(await compute())
+            cost = time.perf_counter() - started
+            future.set_result(body)
+            await self._backend_call(self.backend.set, key, _COST_HEADER.pack(cost) + body, self.ttl)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so a failure without concurrent waiters is not logged as unhandled
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        with self._lock:
+            self.misses += 1
+        return body, False
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            entries = len(self.backend)
+        except Exception as e:
+            logger.warning(f"Result cache {self.backend.name} backend error: {e}")
+            entries = None
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_query_ms": round(self.saved_seconds * 1000, 3),
+            "invalidations": self.invalidations,
+            "backend_errors": self.backend_errors,
+        }
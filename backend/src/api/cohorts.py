@@ -0,0 +1,79 @@
+"""
+Cohort Retention Matrix
+=======================
+
+Builds cohort x period retention and revenue matrices from the
+``cohort_activity_<grain>`` tables maintained by ``utils.summary_tables``.
+Customers belong to the cohort of their first completed order; period
+``n`` of a cohort is the ``n``-th week or month after it.
+
+The grid of cohorts and periods is built in SQL and joined to the stored
+cells in one pass, so the matrix is dense: a cohort with nobody active in a
+period gets zeros, and periods after the last day with orders are ``None``
+(not yet observable) rather than zero retention.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.query_builder import Conditions
+from utils.summary_tables import COHORT_GRAINS, cohort_table
+
+DEFAULT_HORIZON = 12
+MAX_HORIZON = 104
+
+# Result columns of ``cohort_query``, one row per cohort and period
+COHORT_CELL_COLUMNS = ("cohort", "period", "observable", "customers", "orders", "revenue")
+
+
+def cohort_query(grain: str, horizon: int, date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, list]:
+    """SQL and parameters for the dense cells of cohorts starting in a date range, periods ``0..horizon``.
+
+    Raises ``ValueError`` on an unknown grain or malformed dates.
+    """
+    if grain not in COHORT_GRAINS:
+        raise ValueError(f"Unknown cohort granularity: {grain}")
+    table = cohort_table(grain)
+    cohorts = Conditions().date_range("cohort", date_from, date_to)
+
+    query = f"""
+        WITH cohorts AS (
+            SELECT DISTINCT cohort FROM {table} {cohorts.sql()}
+        ),
+        grid AS (
+            SELECT cohort, period, cohort + period * INTERVAL 1 {grain} as starts
+            FROM cohorts CROSS JOIN range(0, ? + 1) t(period)
+        )
+        SELECT
+            strftime(g.cohort, '%Y-%m-%d') as cohort,
+            g.period,
+            g.starts <= (SELECT MAX(period) FROM {table}) as observable,
+            COALESCE(a.customers, 0) as customers,
+            COALESCE(a.orders, 0) as orders,
+            ROUND(COALESCE(a.revenue, 0), 2) as revenue
+        FROM grid g
+        LEFT JOIN {table} a ON a.cohort = g.cohort AND a.period = g.starts
+        ORDER BY g.cohort, g.period
+    """
+    return query, cohorts.params + [horizon]
+
+
+def dense_matrix(rows: List[tuple], horizon: int) -> List[Dict[str, Any]]:
+    """Group ``cohort_query`` rows into one entry per cohort with a value per period."""
+    matrix = []
+    width = horizon + 1
+    for start in range(0, len(rows), width):
+        cells = rows[start : start + width]
+        size = cells[0][3]
+        observed = [cell for cell in cells if cell[2]]
+        blank = [None] * (width - len(observed))
+        matrix.append(
+            {
+                "cohort": cells[0][0],
+                "size": size,
+                "customers": [cell[3] for cell in observed] + blank,
+                "retention": [round(cell[3] / size, 4) if size else 0.0 for cell in observed] + blank,
+                "orders": [cell[4] for cell in observed] + blank,
+                "revenue": [float(cell[5]) for cell in observed] + blank,
+            }
+        )
+    return matrix
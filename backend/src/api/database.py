@@ -0,0 +1,165 @@
+"""
+Database Connection Pool
+========================
+
+Pooled access to the read-only DuckDB analytics database. A single parent
+connection is opened per worker process and a bounded number of cursors
+(``conn.cursor()``) are handed out to requests, so concurrent queries run on
+separate DuckDB connection contexts instead of serializing on one.
+"""
+
+import os
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent.parent / "data" / "ecommerce.duckdb"
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no cursor becomes available within the acquire timeout."""
+
+
+class PoolStats:
+    """Thread-safe counters for cursor acquisition."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.acquired += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            avg_wait = self.wait_seconds_total / self.acquired if self.acquired else 0.0
+            return {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_avg": round(avg_wait * 1000, 3),
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+class DatabaseManager:
+    """Read-only DuckDB connection with a bounded pool of cursors.
+
+    Pool size and acquire timeout default to the ``DB_POOL_SIZE`` and
+    ``DB_POOL_TIMEOUT`` environment variables (cpu count and 5 seconds).
+    ``on_wait`` is called with the seconds every successful acquire waited.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        pool_size: Optional[int] = None,
+        acquire_timeout: Optional[float] = None,
+        on_wait: Optional[Callable[[float], None]] = None,
+    ):
+        self.db_path = Path(db_path) if db_path else None
+        self.pool_size = pool_size or int(os.environ.get("DB_POOL_SIZE", os.cpu_count() or 4))
+        self.acquire_timeout = (
+            acquire_timeout if acquire_timeout is not None else float(os.environ.get("DB_POOL_TIMEOUT", 5.0))
+        )
+        self.conn = None
+        self.stats = PoolStats()
+        self.on_wait = on_wait
+        self._cursors: "queue.LifoQueue[duckdb.DuckDBPyConnection]" = queue.LifoQueue()
+        self._init_lock = threading.Lock()
+
+    def initialize(self):
+        """Open the database and pre-create the cursor pool."""
+        with self._init_lock:
+            if self.conn is not None:
+                return
+
+            if self.db_path is None:
+                self.db_path = Path(os.environ.get("DATABASE_PATH", DEFAULT_DB_PATH))
+
+            if not self.db_path.exists():
+                raise FileNotFoundError(f"Database not found at {self.db_path}")
+
+            logger.info(f"Connecting to database: {self.db_path} (pool size {self.pool_size})")
+            self.conn = duckdb.connect(str(self.db_path), read_only=True)
+            for _ in range(self.pool_size):
+                self._cursors.put(self.conn.cursor())
+
+    def get_connection(self):
+        """Get the parent database connection."""
+        if not self.conn:
+            self.initialize()
+        return self.conn
+
+    def acquire(self, timeout: Optional[float] = None) -> duckdb.DuckDBPyConnection:
+        """Borrow a cursor from the pool, waiting at most ``timeout`` seconds."""
+        if not self.conn:
+            self.initialize()
+
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        try:
+            cursor = self._cursors.get(timeout=timeout)
+        except queue.Empty:
+            self.stats.record_timeout()
+            raise PoolTimeoutError(f"No database cursor available after {timeout:.1f}s")
+
+        waited = time.perf_counter() - started
+        self.stats.record_wait(waited)
+        if self.on_wait is not None:
+            self.on_wait(waited)
+        return cursor
+
+    def release(self, cursor: duckdb.DuckDBPyConnection):
+        """Return a cursor to the pool."""
+        self._cursors.put(cursor)
+
+    @contextmanager
+    def cursor(self, timeout: Optional[float] = None):
+        """Context manager that borrows a cursor and always returns it."""
+        cur = self.acquire(timeout)
+        try:
+            yield cur
+        finally:
+            self.release(cur)
+
+    def pool_status(self) -> Dict[str, Any]:
+        """Pool occupancy plus acquisition metrics."""
+        available = self._cursors.qsize()
+        return {
+            "pool_size": self.pool_size,
+            "available": available,
+            "in_use": self.pool_size - available if self.conn else 0,
+            "acquire_timeout_seconds": self.acquire_timeout,
+            **self.stats.snapshot(),
+        }
+
+    def close(self):
+        """Close all cursors and the parent connection."""
+        with self._init_lock:
+            while True:
+                try:
+                    self._cursors.get_nowait().close()
+                except queue.Empty:
+                    break
+            if self.conn:
+                self.conn.close()
+                self.conn = None
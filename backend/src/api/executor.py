@@ -0,0 +1,98 @@
+"""
+Query Execution Layer
+=====================
+
+Runs blocking DuckDB work on a bounded thread pool so async endpoints never
+block the event loop. Each query gets a timeout; on timeout or request
+cancellation the cursor is interrupted with ``conn.interrupt()`` and the
+worker is allowed to unwind before the cursor goes back to the pool.
+
+Work runs in a copy of the caller's context, so per-request instrumentation
+follows queries into the worker threads.
+"""
+
+import os
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+import duckdb
+
+from api.instrumentation import Instrumentation
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class QueryTimeoutError(Exception):
+    """Raised when a query exceeds its execution timeout."""
+
+
+class QueryExecutor:
+    """Bounded thread pool for DuckDB queries.
+
+    Worker count and default timeout default to the ``DB_QUERY_WORKERS`` and
+    ``DB_QUERY_TIMEOUT`` environment variables (cpu count and 30 seconds).
+    With ``instrumentation``, work runs on an ``InstrumentedCursor``.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        default_timeout: Optional[float] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ):
+        self.max_workers = max_workers or int(os.environ.get("DB_QUERY_WORKERS", os.cpu_count() or 4))
+        self.default_timeout = (
+            default_timeout if default_timeout is not None else float(os.environ.get("DB_QUERY_TIMEOUT", 30.0))
+        )
+        self.instrumentation = instrumentation
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="duckdb-query")
+        return self._pool
+
+    async def run(
+        self,
+        cursor: duckdb.DuckDBPyConnection,
+        work: Callable[[duckdb.DuckDBPyConnection], T],
+        timeout: Optional[float] = None,
+        instrument: bool = True,
+    ) -> T:
+        """Run ``work(cursor)`` on the pool and await its result.
+
+        ``instrument=False`` keeps the queries out of the instrumentation.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        if instrument and self.instrumentation is not None:
+            work = self.instrumentation.wrap(work)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), contextvars.copy_context().run, work, cursor)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            await self._interrupt(cursor, future)
+            raise QueryTimeoutError(f"Query exceeded {timeout:.1f}s timeout")
+        except asyncio.CancelledError:
+            await self._interrupt(cursor, future)
+            raise
+
+    async def _interrupt(self, cursor: duckdb.DuckDBPyConnection, future: asyncio.Future):
+        """Interrupt the running query and wait for its worker to finish."""
+        cursor.interrupt()
+        try:
+            await future
+        except Exception as e:
+            logger.info(f"Interrupted query finished with: {str(e)}")
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
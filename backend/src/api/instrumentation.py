@@ -0,0 +1,482 @@
+"""
+Request and Query Instrumentation
+=================================
+
+Records where each request spends its time. ``InstrumentationMiddleware``
+times every HTTP request and keeps its totals of pool wait, DuckDB execution
+and serialization time in a context variable, which ``QueryExecutor`` copies
+into its worker threads. There, queries run on an ``InstrumentedCursor`` that
+times each ``execute()`` (DuckDB runs and materializes the query there) and
+counts the rows fetched from its result; fetching and encoding the result
+count as serialization.
+
+Queries are grouped by fingerprint: the SQL with literals replaced by ``?``
+and whitespace collapsed, identified by a short hash. All timings are kept in
+Prometheus-style histograms labelled by route template and fingerprint and
+rendered in the text exposition format.
+
+Queries slower than a threshold go to the slow-query log. Read queries are
+logged with their ``EXPLAIN ANALYZE`` profile, captured by re-running them on
+a background cursor at most once per fingerprint and interval, so the slow
+request does not wait for it.
+"""
+
+import os
+import re
+import time
+import bisect
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Fingerprints beyond this many share the "other" label, so metric cardinality stays bounded
+MAX_FINGERPRINTS = 500
+OTHER_QUERIES = "other"
+# Endpoint label of queries run outside a request
+NO_ENDPOINT = "none"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_READ_QUERY = re.compile(r"\s*(SELECT|WITH|FROM)\b", re.I)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> Tuple[str, str]:
+    """``(id, normalized SQL)`` of a query; queries differing only in literals share both."""
+    normalized = _COMMENTS.sub(" ", sql)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    normalized = _VALUE_LISTS.sub("(?, ...)", normalized)
+    return hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest(), normalized
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Thread-safe Prometheus-style histogram with one series per combination of label values."""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Label values -> per-bucket counts (the last one is +Inf) followed by the sum
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """``(count, sum)`` of every series."""
+        with self._lock:
+            return {labels: (sum(series[:-1]), series[-1]) for labels, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        """The histogram in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    """Time totals of one request, shared with the worker threads serving it."""
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        """Template of the matched route, so path parameters do not multiply label values."""
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    def add(self, kind: str, seconds: float):
+        with self._lock:
+            self.totals[kind] = self.totals.get(kind, 0.0) + seconds
+
+
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+def current_request() -> Optional[RequestMetrics]:
+    """Metrics of the request being served, if any."""
+    return _current_request.get()
+
+
+@contextmanager
+def serializing():
+    """Count the time spent in the block as serialization of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        request = current_request()
+        if request is not None:
+            request.add("serialization", time.perf_counter() - started)
+
+
+class SlowQueryLog:
+    """Queries over a time threshold, logged with their ``EXPLAIN ANALYZE`` profile.
+
+    Threshold, log file and per-fingerprint explain interval default to the
+    ``SLOW_QUERY_MS`` (1000, 0 disables), ``SLOW_QUERY_LOG`` (unset: the
+    application log) and ``SLOW_QUERY_EXPLAIN_INTERVAL`` (300 seconds)
+    environment variables. The log file gets one JSON object per line.
+    ``connect`` opens the cursor plans are captured on; without it no plans
+    are captured.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: Optional[float] = None,
+        path: Optional[str] = None,
+        explain_interval: Optional[float] = None,
+        explain_timeout: float = 30.0,
+        connect: Optional[Callable[[], Any]] = None,
+        max_recent: int = 50,
+    ):
+        threshold_ms = threshold_ms if threshold_ms is not None else float(os.environ.get("SLOW_QUERY_MS", 1000))
+        self.threshold = threshold_ms / 1000
+        self.path = path if path is not None else os.environ.get("SLOW_QUERY_LOG")
+        self.explain_interval = (
+            explain_interval
+            if explain_interval is not None
+            else float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300.0))
+        )
+        self.explain_timeout = explain_timeout
+        self.connect = connect
+        self.recent: "deque[Dict[str, Any]]" = deque(maxlen=max_recent)
+        self._explained: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def check(
+        self,
+        endpoint: str,
+        query_id: str,
+        sql: str,
+        params: Any,
+        seconds: float,
+        rows: Optional[int],
+        error: Optional[Exception] = None,
+    ):
+        """Log the query if it was slow; its plan is captured in the background."""
+        if self.threshold <= 0 or seconds < self.threshold:
+            return
+
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "endpoint": endpoint,
+            "query": query_id,
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "sql": sql,
+            "params": params,
+            "error": str(error) if error is not None else None,
+            "plan": None,
+        }
+        if error is None and self._should_explain(query_id, sql):
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            self._pool.submit(self._explain_and_write, entry, params)
+        else:
+            self._write(entry)
+
+    def _should_explain(self, query_id: str, sql: str) -> bool:
+        if self.connect is None or not _READ_QUERY.match(sql):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(query_id)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            self._explained[query_id] = now
+        return True
+
+    def _explain_and_write(self, entry: Dict[str, Any], params: Any):
+        try:
+            cursor = self.connect()
+            timer = threading.Timer(self.explain_timeout, cursor.interrupt)
+            timer.start()
+            try:
+                profile = cursor.execute(f"EXPLAIN ANALYZE {entry['sql']}", params).fetchall()
+            finally:
+                timer.cancel()
+                cursor.close()
+            entry["plan"] = "\n".join(row[-1] for row in profile)
+        except Exception as e:
+            logger.warning(f"Could not capture the plan of slow query {entry['query']}: {str(e)}")
+        self._write(entry)
+
+    def _write(self, entry: Dict[str, Any]):
+        message = (
+            f"Slow query {entry['query']} on {entry['endpoint']}: {entry['duration_ms']:.0f}ms, {entry['rows']} rows"
+        )
+        with self._lock:
+            self.recent.append(entry)
+            if self.path:
+                with open(self.path, "ab") as log:
+                    log.write(orjson.dumps(entry, default=str) + b"\n")
+        if self.path or entry["plan"] is None:
+            logger.warning(message)
+        else:
+            logger.warning(f"{message}\n{entry['sql']}\n{entry['plan']}")
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """The latest entries, oldest first."""
+        with self._lock:
+            return list(self.recent)
+
+    def shutdown(self, wait: bool = False):
+        """Stop the plan capturing thread, optionally after pending captures finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+
+class InstrumentedCursor:
+    """DuckDB cursor wrapper timing each ``execute()`` and counting the rows fetched from its result.
+
+    A query is recorded once the next one starts or ``finish()`` is called.
+    Every other attribute is the wrapped cursor's.
+    """
+
+    def __init__(self, cursor, instrumentation: "Instrumentation"):
+        self._cursor = cursor
+        self._instrumentation = instrumentation
+        self._pending: Optional[list] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+    def execute(self, query, parameters=None):
+        self.finish()
+        sql = query if isinstance(query, str) else query.query
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(query, parameters)
+        except Exception as e:
+            self._instrumentation.observe_query(sql, parameters, time.perf_counter() - started, None, error=e)
+            raise
+        self._pending = [sql, parameters, time.perf_counter() - started, 0]
+        return self
+
+    def _fetch(self, fetch: Callable[..., T], count: Callable[[T], int], *args) -> T:
+        with serializing():
+            result = fetch(*args)
+        if self._pending is not None:
+            self._pending[3] += count(result)
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone, lambda row: 0 if row is None else 1)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall, len)
+
+    def fetchmany(self, size: int = 1):
+        return self._fetch(self._cursor.fetchmany, len, size)
+
+    def fetchnumpy(self):
+        return self._fetch(self._cursor.fetchnumpy, lambda columns: len(next(iter(columns.values()), ())))
+
+    def fetchdf(self):
+        return self._fetch(self._cursor.fetchdf, len)
+
+    def finish(self):
+        """Record the pending query, if any."""
+        if self._pending is not None:
+            sql, parameters, seconds, rows = self._pending
+            self._pending = None
+            self._instrumentation.observe_query(sql, parameters, seconds, rows)
+
+
+class Instrumentation:
+    """Request, query and slow-query metrics of one API process."""
+
+    def __init__(self, slow_query_log: Optional[SlowQueryLog] = None):
+        self.requests = Histogram(
+            "api_request_duration_seconds",
+            "Time to serve a request, including streaming the response.",
+            ("endpoint", "method", "status"),
+            TIME_BUCKETS,
+        )
+        self.phases = {
+            "pool_wait": Histogram(
+                "api_request_pool_wait_seconds",
+                "Time a request waited for pooled database cursors.",
+                ("endpoint",),
+                TIME_BUCKETS,
+            ),
+            "db": Histogram(
+                "api_request_db_seconds",
+                "DuckDB execution time of the queries of a request.",
+                ("endpoint",),
+                TIME_BUCKETS,
+            ),
+            "serialization": Histogram(
+                "api_request_serialization_seconds",
+                "Time a request spent fetching query results into Python and encoding them.",
+                ("endpoint",),
+                TIME_BUCKETS,
+            ),
+        }
+        self.query_duration = Histogram(
+            "api_query_duration_seconds",
+            "DuckDB execution time of a query, by query fingerprint.",
+            ("endpoint", "query"),
+            TIME_BUCKETS,
+        )
+        self.query_rows = Histogram(
+            "api_query_rows",
+            "Rows fetched from a query result, by query fingerprint.",
+            ("endpoint", "query"),
+            ROW_BUCKETS,
+        )
+        self.slow_queries = slow_query_log or SlowQueryLog()
+        self._queries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, work: Callable[[Any], T]) -> Callable[[Any], T]:
+        """``work`` running on an ``InstrumentedCursor`` over the cursor it is given."""
+
+        def instrumented(cursor) -> T:
+            wrapped = InstrumentedCursor(cursor, self)
+            try:
+                return work(wrapped)
+            finally:
+                wrapped.finish()
+
+        return instrumented
+
+    def _track(self, sql: str) -> str:
+        query_id, normalized = fingerprint(sql)
+        with self._lock:
+            if query_id not in self._queries:
+                if len(self._queries) >= MAX_FINGERPRINTS:
+                    return OTHER_QUERIES
+                self._queries[query_id] = normalized
+        return query_id
+
+    def observe_query(
+        self, sql: str, params: Any, seconds: float, rows: Optional[int], error: Optional[Exception] = None
+    ):
+        """Record one query; failed queries only count towards request time and the slow-query log."""
+        query_id = self._track(sql)
+        request = current_request()
+        endpoint = request.endpoint if request is not None else NO_ENDPOINT
+        if request is not None:
+            request.add("db", seconds)
+        if error is None:
+            self.query_duration.observe(seconds, endpoint, query_id)
+            self.query_rows.observe(rows, endpoint, query_id)
+        self.slow_queries.check(endpoint, query_id, sql, params, seconds, rows, error)
+
+    def observe_pool_wait(self, seconds: float):
+        request = current_request()
+        if request is not None:
+            request.add("pool_wait", seconds)
+
+    def observe_request(self, request: RequestMetrics, method: str, status: int, seconds: float):
+        endpoint = request.endpoint
+        self.requests.observe(seconds, endpoint, method, str(status))
+        for kind, total in request.totals.items():
+            self.phases[kind].observe(total, endpoint)
+
+    def render(self) -> str:
+        """Every histogram in the Prometheus text exposition format."""
+        lines = []
+        for histogram in (self.requests, *self.phases.values(), self.query_duration, self.query_rows):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+    def query_summary(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Query fingerprints by total DuckDB time, with their normalized SQL."""
+        summary: Dict[str, Dict[str, Any]] = {}
+        for (endpoint, query_id), (calls, seconds) in self.query_duration.totals().items():
+            entry = summary.setdefault(
+                query_id,
+                {"query": query_id, "sql": self._queries.get(query_id), "endpoints": [], "calls": 0, "total_ms": 0.0},
+            )
+            entry["endpoints"].append(endpoint)
+            entry["calls"] += calls
+            entry["total_ms"] += seconds * 1000
+
+        ranked = sorted(summary.values(), key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+        for entry in ranked:
+            entry["endpoints"].sort()
+            entry["mean_ms"] = round(entry["total_ms"] / entry["calls"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+        return ranked
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware timing each HTTP request and recording its totals when it ends."""
+
+    def __init__(self, app, instrumentation: Instrumentation):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics(scope)
+        token = _current_request.set(request)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_request.reset(token)
+            self.instrumentation.observe_request(request, scope["method"], status, time.perf_counter() - started)
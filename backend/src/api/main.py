@@ -8,16 +8,46 @@ Provides flexible endpoints for building modern frontend applications.
 
 from fastapi import FastAPI, HTTPException, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
 import duckdb
-import pandas as pd
+import orjson
+import os
+import sys
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Union
+from datetime import date, datetime, timedelta
 import logging
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
 
+# Make the src directory importable regardless of how the app is launched
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.database import DatabaseManager, PoolTimeoutError
+from api.executor import QueryExecutor, QueryTimeoutError
+from api.instrumentation import MAX_FINGERPRINTS, Instrumentation, InstrumentationMiddleware, SlowQueryLog, serializing
+from api.serialization import ORJSONResponse, FieldSpec, columns_to_records, fetch_records
+from api.cache import ResultCache, RedisCacheBackend, database_file_version
+from api.cohorts import DEFAULT_HORIZON, MAX_HORIZON, cohort_query, dense_matrix
+from api.query_builder import Conditions, ParseCache
+from api.export import EXPORT_FORMATS, EXPORT_TABLES, export_query, stream_export
+from api.pagination import decode_cursor, encode_cursor, page_key, page_query, windows
+from api.rollups import (
+    APPROX_TABLES,
+    GROUP_BY_GRAINS,
+    HLL_RELATIVE_ERROR,
+    hll_estimate,
+    plan_distinct_customers,
+    plan_revenue_series,
+    plan_segment_totals,
+    plan_session_totals,
+    rollups_available,
+    tables_available,
+)
+from utils.metrics import revenue_growth
+from utils.summary_tables import RFM_BOUNDARIES_TABLE, rfm_segments_sql, summary_source
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +61,9 @@ class KPIResponse(BaseModel):
     avg_order_value: float
     revenue_growth: float
     conversion_rate: float
+    approximate: bool = False
+    # Half-width of the ~95% interval around an approximate total_customers
+    total_customers_error: Optional[int] = None
 
 
 class RevenueBreakdown(BaseModel):
@@ -64,37 +97,27 @@ class TimeSeriesPoint(BaseModel):
     orders: Optional[int] = None
 
 
-# Database connection manager
-class DatabaseManager:
-    def __init__(self):
-        self.db_path = None
-        self.conn = None
-
-    def initialize(self):
-        """Initialize database connection."""
-        data_dir = Path(__file__).parent.parent.parent / "data"
-        self.db_path = data_dir / "ecommerce.duckdb"
-
-        if not self.db_path.exists():
-            raise FileNotFoundError(f"Database not found at {self.db_path}")
-
-        logger.info(f"Connecting to database: {self.db_path}")
-        self.conn = duckdb.connect(str(self.db_path), read_only=True)
+class MetricRequest(BaseModel):
+    metric: str
+    id: Optional[str] = None
+    params: Dict[str, Union[bool, int, str, None]] = {}
 
-    def get_connection(self):
-        """Get database connection."""
-        if not self.conn:
-            self.initialize()
-        return self.conn
 
-    def close(self):
-        """Close database connection."""
-        if self.conn:
-            self.conn.close()
+class BatchRequest(BaseModel):
+    metrics: List[MetricRequest] = Field(min_length=1, max_length=20)
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
 
 
-# Global database manager
-db_manager = DatabaseManager()
+# Global instrumentation, database manager, query executor and result cache
+instrumentation = Instrumentation(SlowQueryLog(connect=lambda: db_manager.get_connection().cursor()))
+db_manager = DatabaseManager(on_wait=instrumentation.observe_pool_wait)
+query_executor = QueryExecutor(instrumentation=instrumentation)
+result_cache = ResultCache(
+    backend=RedisCacheBackend.from_url(os.environ["REDIS_URL"]) if os.environ.get("REDIS_URL") else None,
+    version=lambda: database_file_version(db_manager.db_path),
+)
+parse_cache = ParseCache()
 
 
 # Lifespan event handler
@@ -106,6 +129,8 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     logger.info("Shutting down API...")
+    query_executor.shutdown()
+    instrumentation.slow_queries.shutdown()
     db_manager.close()
 
 
@@ -115,6 +140,7 @@ app = FastAPI(
     description="Comprehensive REST API for e-commerce business intelligence",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware for frontend integration
@@ -126,6 +152,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request, query and slow-query instrumentation
+app.add_middleware(InstrumentationMiddleware, instrumentation=instrumentation)
+
 
 # Health check endpoint
 @app.get("/health")
@@ -134,27 +163,68 @@ async def health_check():
     return {"status": "healthy", "service": "e-commerce-analytics-api"}
 
 
-# Dependency to get database connection
+# Pool metrics endpoint
+@app.get("/api/v1/system/pool")
+async def get_pool_status():
+    """Database cursor pool occupancy and wait-time metrics."""
+    return db_manager.pool_status()
+
+
+# Result cache metrics endpoint
+@app.get("/api/v1/system/cache")
+async def get_cache_status():
+    """Result cache hit rate and query time saved, plus how often query texts skip re-parsing."""
+    return {**result_cache.stats(), "parse_cache": parse_cache.stats()}
+
+
+# Query fingerprint metrics endpoint
+@app.get("/api/v1/system/queries")
+async def get_query_stats(limit: int = Query(20, ge=1, le=MAX_FINGERPRINTS, description="Fingerprints to list")):
+    """Query fingerprints by total DuckDB time, plus the latest slow-query log entries."""
+    return {
+        "queries": instrumentation.query_summary(limit),
+        "slow_queries": instrumentation.slow_queries.entries(),
+    }
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def get_metrics():
+    """Request, pool wait, DuckDB, serialization and per-query histograms in the Prometheus text format."""
+    return Response(content=instrumentation.render(), media_type="text/plain; version=0.0.4")
+
+
+# Dependency to borrow a pooled database cursor for the duration of a request
 def get_db():
-    return db_manager.get_connection()
+    try:
+        cursor = db_manager.acquire()
+    except PoolTimeoutError as e:
+        logger.warning(f"Database pool exhausted: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
 
+    try:
+        yield cursor
+    finally:
+        db_manager.release(cursor)
 
-# Helper function for date filtering
-def apply_date_filter(query: str, date_from: Optional[str], date_to: Optional[str]) -> str:
-    """Apply date filtering to SQL queries."""
-    if date_from or date_to:
-        date_conditions = []
-        if date_from:
-            date_conditions.append(f"order_date >= '{date_from}'")
-        if date_to:
-            date_conditions.append(f"order_date <= '{date_to}'")
 
-        if "WHERE" in query.upper():
-            query += f" AND {' AND '.join(date_conditions)}"
-        else:
-            query += f" WHERE {' AND '.join(date_conditions)}"
+# Helpers to run queries on the executor instead of the event loop
+async def fetch_rows(
+    db: duckdb.DuckDBPyConnection, query: str, fields: FieldSpec, params: Optional[list] = None
+) -> List[Dict[str, Any]]:
+    """Execute a query off the event loop and return serialized records."""
+    return await query_executor.run(db, lambda cur: fetch_records(parse_cache.execute(cur, query, params), fields))
+
+
+async def fetch_one(db: duckdb.DuckDBPyConnection, query: str, params: Optional[list] = None) -> Optional[tuple]:
+    """Execute a query off the event loop and return its first row."""
+    return await query_executor.run(db, lambda cur: parse_cache.execute(cur, query, params).fetchone())
 
-    return query
+
+async def cached_response(endpoint: str, params: Dict[str, Any], compute) -> Response:
+    """Serve an endpoint payload from the result cache, computing it on a miss."""
+    body, hit = await result_cache.get_or_compute(endpoint, params, compute)
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT" if hit else "MISS"})
 
 
 @app.get("/")
@@ -169,65 +239,135 @@ async def root():
             "overview": "/api/v1/analytics/overview",
             "revenue": "/api/v1/analytics/revenue",
             "customers": "/api/v1/analytics/customers",
+            "rfm_history": "/api/v1/analytics/customers/rfm-history",
+            "cohorts": "/api/v1/analytics/cohorts",
             "products": "/api/v1/analytics/products",
             "marketing": "/api/v1/analytics/marketing",
+            "batch": "/api/v1/analytics/batch",
+            "export": "/api/v1/reports/export/{table}",
         },
     }
 
 
+async def exact_overview(db: duckdb.DuckDBPyConnection, order_filter: Conditions, session_filter: Conditions):
+    """``(orders, customers, revenue, avg order value, sessions, conversions)`` scanned from the fact tables."""
+    base_query = f"""
+    SELECT
+        COUNT(DISTINCT order_id) as total_orders,
+        COUNT(DISTINCT customer_id) as total_customers,
+        SUM(CASE WHEN status = 'Completed' THEN total_amount ELSE 0 END) as total_revenue,
+        AVG(CASE WHEN status = 'Completed' THEN total_amount ELSE NULL END) as avg_order_value
+    FROM orders
+    {order_filter.sql()}
+    """
+    result = await fetch_one(db, base_query, order_filter.params)
+
+    # Conversion rate from web sessions
+    conversion_query = f"""
+    SELECT
+        COUNT(*) as total_sessions,
+        SUM(CASE WHEN converted THEN 1 ELSE 0 END) as conversions
+    FROM web_sessions
+    {session_filter.sql()}
+    """
+    conv_result = await fetch_one(db, conversion_query, session_filter.params)
+    return (*result, *conv_result)
+
+
+async def approximate_overview(db: duckdb.DuckDBPyConnection, date_from: Optional[str], date_to: Optional[str]):
+    """Same as ``exact_overview`` from the rollups, with customers estimated from the HyperLogLog sketches."""
+    totals_query, totals_params = plan_segment_totals(date_from, date_to)
+    orders, revenue, completed = await fetch_one(
+        db,
+        f"""
+        SELECT
+            SUM(orders),
+            SUM(revenue) FILTER (WHERE status = 'Completed'),
+            SUM(orders) FILTER (WHERE status = 'Completed')
+        FROM ({totals_query})
+        """,
+        totals_params,
+    )
+    filled, harmonic = await fetch_one(db, *plan_distinct_customers(date_from, date_to))
+    sessions, conversions = await fetch_one(db, *plan_session_totals(date_from, date_to))
+    avg_order_value = revenue / completed if completed else None
+    return orders, round(hll_estimate(filled, harmonic)), revenue, avg_order_value, sessions, conversions
+
+
 @app.get("/api/v1/analytics/overview", response_model=KPIResponse)
 async def get_overview_metrics(
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    approx: bool = Query(False, description="Read totals from the rollups and estimate distinct customers"),
     db: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
-    """Get high-level KPI metrics for dashboard overview."""
+    """Get high-level KPI metrics for dashboard overview.
 
-    try:
-        # Base query for KPIs
-        base_query = """
-        SELECT
-            COUNT(DISTINCT order_id) as total_orders,
-            COUNT(DISTINCT customer_id) as total_customers,
-            SUM(CASE WHEN status = 'Completed' THEN total_amount ELSE 0 END) as total_revenue,
-            AVG(CASE WHEN status = 'Completed' THEN total_amount ELSE NULL END) as avg_order_value
-        FROM orders
-        """
-
-        # Apply date filtering
-        filtered_query = apply_date_filter(base_query, date_from, date_to)
+    ``revenue_growth`` compares the range with the previous equally long one
+    (default: the trailing 30 days), as defined in ``utils.metrics``.
 
-        result = db.execute(filtered_query).fetchone()
+    With ``approx=true`` every total comes from the rollup tables and
+    ``total_customers`` is a HyperLogLog estimate, with the half-width of its
+    ~95% interval in ``total_customers_error``. Without the summary tables
+    the exact scan is used and ``approximate`` is false.
+    """
 
-        # Calculate conversion rate from web sessions
-        conversion_query = """
-        SELECT
-            COUNT(*) as total_sessions,
-            SUM(CASE WHEN converted THEN 1 ELSE 0 END) as conversions
-        FROM web_sessions
-        """
-        conversion_query = apply_date_filter(conversion_query.replace("order_date", "session_date"), date_from, date_to)
-        conv_result = db.execute(conversion_query).fetchone()
+    try:
+        order_filter = Conditions().date_range("order_date", date_from, date_to)
+        session_filter = Conditions().date_range("session_date", date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date filter: {str(e)}")
+
+    async def compute():
+        approximate = approx and await query_executor.run(db, lambda cur: tables_available(cur, APPROX_TABLES))
+        if approximate:
+            result = await approximate_overview(db, date_from, date_to)
+        else:
+            result = await exact_overview(db, order_filter, session_filter)
+        orders, customers, revenue, avg_order_value, sessions, conversions = result
 
-        conversion_rate = (conv_result[1] / conv_result[0] * 100) if conv_result[0] > 0 else 0
+        conversion_rate = (conversions / sessions * 100) if sessions else 0
 
-        # Calculate revenue growth (simplified - comparing with previous period)
-        revenue_growth = 5.2  # Placeholder - you can implement proper period comparison
+        # Revenue growth versus the previous equivalent window, from the daily rollup when it exists
+        growth_pct = await query_executor.run(db, lambda cur: revenue_growth(cur, date_from, date_to))
 
         return KPIResponse(
-            total_revenue=float(result[2]) if result[2] else 0,
-            total_orders=int(result[0]) if result[0] else 0,
-            total_customers=int(result[1]) if result[1] else 0,
-            avg_order_value=float(result[3]) if result[3] else 0,
-            revenue_growth=revenue_growth,
+            total_revenue=float(revenue) if revenue else 0,
+            total_orders=int(orders) if orders else 0,
+            total_customers=int(customers) if customers else 0,
+            avg_order_value=float(avg_order_value) if avg_order_value else 0,
+            revenue_growth=round(growth_pct, 2),
             conversion_rate=round(conversion_rate, 2),
-        )
+            approximate=approximate,
+            total_customers_error=round(2 * HLL_RELATIVE_ERROR * customers) if approximate else None,
+        ).model_dump()
 
+    try:
+        params = {"date_from": date_from, "date_to": date_to, "approx": approx}
+        return await cached_response("overview", params, compute)
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in overview metrics: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in overview metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
 
+REVENUE_SERIES_FIELDS: FieldSpec = {
+    "date": ("period", "timestamp"),
+    "revenue": ("revenue", "float"),
+    "orders": ("orders", "int"),
+}
+
+REVENUE_SEGMENT_FIELDS: FieldSpec = {
+    "segment": ("segment", "str"),
+    "revenue": ("revenue", "float"),
+    "orders": ("orders", "int"),
+    "customers": ("customers", "int"),
+    "avg_order_value": ("avg_order_value", "float"),
+}
+
+
 @app.get("/api/v1/analytics/revenue")
 async def get_revenue_analytics(
     date_from: Optional[str] = Query(None),
@@ -235,190 +375,298 @@ async def get_revenue_analytics(
     group_by: str = Query("month", description="Grouping: day, week, month, quarter"),
     db: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
-    """Get revenue analytics with time series and breakdowns."""
+    """Get revenue analytics with time series and breakdowns.
 
-    try:
-        # Revenue by time period
-        time_groupings = {
-            "day": "DATE(order_date)",
-            "week": "DATE_TRUNC('week', order_date)",
-            "month": "DATE_TRUNC('month', order_date)",
-            "quarter": "DATE_TRUNC('quarter', order_date)",
-        }
+    The time series and the segment breakdown are answered from the revenue
+    rollup tables when they exist.
+    """
 
-        if group_by not in time_groupings:
-            group_by = "month"
+    if group_by not in GROUP_BY_GRAINS:
+        group_by = "month"
 
-        time_query = f"""
-        SELECT
-            {time_groupings[group_by]} as period,
-            SUM(CASE WHEN status = 'Completed' THEN total_amount ELSE 0 END) as revenue,
-            COUNT(CASE WHEN status = 'Completed' THEN order_id END) as orders
-        FROM orders
-        """
+    try:
+        # Filtering the joined orders keeps customers without orders in range
+        join_filter = Conditions().date_range("o.order_date", date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date filter: {str(e)}")
 
-        time_query = apply_date_filter(time_query, date_from, date_to)
-        time_query += f" GROUP BY {time_groupings[group_by]} ORDER BY period"
+    async def compute():
+        # Revenue by time period
+        use_rollups = await query_executor.run(db, rollups_available)
+        time_query, time_params = plan_revenue_series(group_by, date_from, date_to, use_rollups=use_rollups)
 
-        time_series = db.execute(time_query).fetchdf()
+        time_series = await fetch_rows(db, time_query, REVENUE_SERIES_FIELDS, time_params)
 
-        # Revenue by customer segment
-        segment_query = """
-        SELECT
-            c.customer_segment as segment,
-            SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as revenue,
-            COUNT(CASE WHEN o.status = 'Completed' THEN o.order_id END) as orders,
-            COUNT(DISTINCT c.customer_id) as customers,
-            AVG(CASE WHEN o.status = 'Completed' THEN o.total_amount END) as avg_order_value
-        FROM customers c
-        LEFT JOIN orders o ON c.customer_id = o.customer_id
-        """
+        # Revenue by customer segment; customers counts every customer in the segment
+        if use_rollups:
+            totals_query, totals_params = plan_segment_totals(date_from, date_to)
+            segment_query = f"""
+            SELECT
+                s.customer_segment as segment,
+                COALESCE(SUM(t.revenue) FILTER (WHERE t.status = 'Completed'), 0) as revenue,
+                COALESCE(SUM(t.orders) FILTER (WHERE t.status = 'Completed'), 0) as orders,
+                s.customers,
+                SUM(t.revenue) FILTER (WHERE t.status = 'Completed')
+                    / SUM(t.orders) FILTER (WHERE t.status = 'Completed') as avg_order_value
+            FROM (SELECT customer_segment, COUNT(*) as customers FROM customers GROUP BY customer_segment) s
+            LEFT JOIN ({totals_query}) t ON t.customer_segment IS NOT DISTINCT FROM s.customer_segment
+            GROUP BY s.customer_segment, s.customers
+            ORDER BY revenue DESC
+            """
+            segments = await fetch_rows(db, segment_query, REVENUE_SEGMENT_FIELDS, totals_params)
+        else:
+            segment_query = f"""
+            SELECT
+                c.customer_segment as segment,
+                SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as revenue,
+                COUNT(CASE WHEN o.status = 'Completed' THEN o.order_id END) as orders,
+                COUNT(DISTINCT c.customer_id) as customers,
+                AVG(CASE WHEN o.status = 'Completed' THEN o.total_amount END) as avg_order_value
+            FROM customers c
+            LEFT JOIN orders o ON c.customer_id = o.customer_id {join_filter.sql("AND")}
+            GROUP BY c.customer_segment
+            ORDER BY revenue DESC
+            """
+            segments = await fetch_rows(db, segment_query, REVENUE_SEGMENT_FIELDS, join_filter.params)
 
-        segment_query = apply_date_filter(segment_query, date_from, date_to)
-        segment_query += " GROUP BY c.customer_segment ORDER BY revenue DESC"
-
-        segments = db.execute(segment_query).fetchdf()
-
-        return {
-            "time_series": [
-                {
-                    "date": str(row["period"]),
-                    "revenue": float(row["revenue"]),
-                    "orders": int(row["orders"]),
-                }
-                for _, row in time_series.iterrows()
-            ],
-            "by_segment": [
-                {
-                    "segment": row["segment"],
-                    "revenue": float(row["revenue"]) if pd.notna(row["revenue"]) else 0,
-                    "orders": int(row["orders"]) if pd.notna(row["orders"]) else 0,
-                    "customers": int(row["customers"]),
-                    "avg_order_value": (float(row["avg_order_value"]) if pd.notna(row["avg_order_value"]) else 0),
-                }
-                for _, row in segments.iterrows()
-            ],
-        }
+        return {"time_series": time_series, "by_segment": segments}
 
+    try:
+        return await cached_response(
+            "revenue", {"date_from": date_from, "date_to": date_to, "group_by": group_by}, compute
+        )
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in revenue analytics: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in revenue analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+RFM_SEGMENT_FIELDS: FieldSpec = {
+    "segment": ("rfm_segment", "str"),
+    "customers": ("customers", "int"),
+    "avg_recency_days": ("avg_recency_days", "float"),
+    "avg_frequency": ("avg_frequency", "float"),
+    "avg_monetary": ("avg_monetary", "float"),
+}
+
+ACQUISITION_FIELDS: FieldSpec = {
+    "channel": ("acquisition_channel", "str"),
+    "customers": ("customers", "int"),
+    "avg_ltv": ("avg_ltv", "float"),
+    "avg_orders": ("avg_orders", "float"),
+}
+
+
+RFM_SEGMENTS_QUERY = """
+SELECT
+    rfm_segment,
+    COUNT(*) as customers,
+    ROUND(AVG(recency), 1) as avg_recency_days,
+    ROUND(AVG(frequency), 1) as avg_frequency,
+    ROUND(AVG(monetary), 2) as avg_monetary
+FROM customer_rfm
+GROUP BY rfm_segment
+ORDER BY AVG(monetary) DESC
+"""
+
+RFM_HISTORY_COLUMNS = """
+    strftime(as_of, '%Y-%m-%d') as as_of,
+    rfm_segment,
+    customers,
+    avg_recency_days,
+    avg_frequency,
+    avg_monetary
+"""
+
+RFM_SNAPSHOT_QUERY = f"SELECT {RFM_HISTORY_COLUMNS} FROM ({rfm_segments_sql('SELECT CAST(? AS DATE) as as_of')})"
+
+# Everything the default (precomputed) RFM segments read
+RFM_TABLES = ("customer_rfm", RFM_BOUNDARIES_TABLE)
+
+
+async def rfm_segments_as_of(db: duckdb.DuckDBPyConnection, as_of: Optional[date]) -> Dict[str, Any]:
+    """RFM segments as of a date: the current build by default, else a month-end snapshot or a one-off scoring.
+
+    Without the summary tables every date, including the default latest
+    order date, is scored on demand from the raw tables.
+    """
+    if as_of is None:
+        if await query_executor.run(db, lambda cur: tables_available(cur, RFM_TABLES)):
+            reference = await fetch_one(db, f"SELECT strftime(reference_date, '%Y-%m-%d') FROM {RFM_BOUNDARIES_TABLE}")
+            segments = await fetch_rows(db, RFM_SEGMENTS_QUERY, RFM_SEGMENT_FIELDS)
+            return {"rfm_as_of": reference[0] if reference else None, "rfm_segments": segments}
+        latest = await fetch_one(db, "SELECT CAST(MAX(order_date) AS DATE) FROM orders")
+        if latest is None or latest[0] is None:
+            return {"rfm_as_of": None, "rfm_segments": []}
+        as_of = latest[0]
+    elif await query_executor.run(db, lambda cur: tables_available(cur, ["customer_rfm_history"])):
+        history_query = (
+            f"SELECT {RFM_HISTORY_COLUMNS} FROM customer_rfm_history WHERE as_of = ? ORDER BY avg_monetary DESC"
+        )
+        segments = await fetch_rows(db, history_query, RFM_SEGMENT_FIELDS, [as_of])
+        if segments:
+            return {"rfm_as_of": as_of.isoformat(), "rfm_segments": segments}
+
+    segments = await fetch_rows(db, RFM_SNAPSHOT_QUERY, RFM_SEGMENT_FIELDS, [as_of])
+    return {"rfm_as_of": as_of.isoformat(), "rfm_segments": segments}
+
+
 @app.get("/api/v1/analytics/customers")
 async def get_customer_analytics(
     segment: Optional[str] = Query(None, description="Filter by customer segment"),
+    as_of: Optional[str] = Query(None, description="RFM reference date (YYYY-MM-DD, default: latest order date)"),
     db: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
-    """Get customer analytics including segmentation and LTV."""
+    """Get customer analytics including segmentation and LTV.
+
+    RFM segments come from ``customer_rfm`` by default; any other ``as_of``
+    date is read from the month-end snapshots in ``customer_rfm_history`` or
+    scored on demand, and cached per date like every other response.
+    """
 
     try:
-        # RFM segments
-        rfm_query = """
-        WITH rfm_metrics AS (
-            SELECT
-                c.customer_id,
-                c.customer_segment,
-                DATE_DIFF('day', MAX(o.order_date), '2024-12-31') as recency,
-                COUNT(o.order_id) as frequency,
-                SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as monetary
-            FROM customers c
-            LEFT JOIN orders o ON c.customer_id = o.customer_id
-            WHERE c.registration_date <= '2024-12-01'
-            GROUP BY c.customer_id, c.customer_segment
-        ),
-        rfm_scores AS (
-            SELECT
-                customer_id,
-                customer_segment,
-                NTILE(5) OVER (ORDER BY recency DESC) as r_score,
-                NTILE(5) OVER (ORDER BY frequency) as f_score,
-                NTILE(5) OVER (ORDER BY monetary) as m_score,
-                recency, frequency, monetary
-            FROM rfm_metrics
-            WHERE monetary > 0
-        )
-        SELECT
-            CASE
-                WHEN r_score >= 4 AND f_score >= 4 THEN 'Champions'
-                WHEN r_score >= 3 AND f_score >= 3 THEN 'Loyal Customers'
-                WHEN r_score >= 3 AND f_score >= 2 THEN 'Potential Loyalists'
-                WHEN r_score >= 4 AND f_score <= 2 THEN 'New Customers'
-                WHEN r_score >= 2 AND f_score >= 3 THEN 'At Risk'
-                WHEN r_score <= 2 AND f_score >= 4 THEN 'Cannot Lose Them'
-                WHEN r_score <= 2 AND f_score <= 2 THEN 'Hibernating'
-                ELSE 'Others'
-            END as rfm_segment,
-            COUNT(*) as customers,
-            ROUND(AVG(recency), 1) as avg_recency_days,
-            ROUND(AVG(frequency), 1) as avg_frequency,
-            ROUND(AVG(monetary), 2) as avg_monetary
-        FROM rfm_scores
-        GROUP BY rfm_segment
-        ORDER BY AVG(monetary) DESC
-        """
+        rfm_date = date.fromisoformat(as_of) if as_of else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid as_of date: {as_of}")
 
-        rfm_segments = db.execute(rfm_query).fetchdf()
+    async def compute():
+        rfm = await rfm_segments_as_of(db, rfm_date)
 
         # Customer acquisition channels
-        acquisition_query = """
+        acquisition_filter = Conditions("total_orders > 0").equals("customer_segment", segment)
+        ltv_source = await query_executor.run(db, lambda cur: summary_source(cur, "customer_ltv"))
+        acquisition_query = f"""
         SELECT
             acquisition_channel,
             COUNT(*) as customers,
             ROUND(AVG(lifetime_value), 2) as avg_ltv,
             ROUND(AVG(total_orders), 2) as avg_orders
-        FROM customer_ltv
-        WHERE total_orders > 0
+        FROM {ltv_source}
+        {acquisition_filter.sql()}
         GROUP BY acquisition_channel
         ORDER BY avg_ltv DESC
         """
 
-        if segment:
-            acquisition_query = acquisition_query.replace(
-                "FROM customer_ltv",
-                f"FROM customer_ltv WHERE customer_segment = '{segment}'",
-            )
-
-        acquisition = db.execute(acquisition_query).fetchdf()
-
-        return {
-            "rfm_segments": [
-                {
-                    "segment": row["rfm_segment"],
-                    "customers": int(row["customers"]),
-                    "avg_recency_days": float(row["avg_recency_days"]),
-                    "avg_frequency": float(row["avg_frequency"]),
-                    "avg_monetary": float(row["avg_monetary"]),
-                }
-                for _, row in rfm_segments.iterrows()
-            ],
-            "acquisition_channels": [
-                {
-                    "channel": row["acquisition_channel"],
-                    "customers": int(row["customers"]),
-                    "avg_ltv": float(row["avg_ltv"]),
-                    "avg_orders": float(row["avg_orders"]),
-                }
-                for _, row in acquisition.iterrows()
-            ],
-        }
+        acquisition = await fetch_rows(db, acquisition_query, ACQUISITION_FIELDS, acquisition_filter.params)
+
+        return {**rfm, "acquisition_channels": acquisition}
 
+    try:
+        return await cached_response("customers", {"segment": segment, "as_of": rfm_date}, compute)
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in customer analytics: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in customer analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+RFM_HISTORY_FIELDS: FieldSpec = {"as_of": ("as_of", "str"), **RFM_SEGMENT_FIELDS}
+
+
+@app.get("/api/v1/analytics/customers/rfm-history")
+async def get_rfm_history(
+    date_from: Optional[str] = Query(None, description="First snapshot date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Last snapshot date (YYYY-MM-DD)"),
+    db: duckdb.DuckDBPyConnection = Depends(get_db),
+):
+    """RFM segment sizes as of every month end in the range, from ``customer_rfm_history``."""
+
+    try:
+        snapshot_filter = Conditions().date_range("as_of", date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date filter: {str(e)}")
+
+    async def compute():
+        history_source = await query_executor.run(db, lambda cur: summary_source(cur, "customer_rfm_history"))
+        query = f"""
+        SELECT {RFM_HISTORY_COLUMNS}
+        FROM {history_source}
+        {snapshot_filter.sql()}
+        ORDER BY as_of, avg_monetary DESC
+        """
+        return {"snapshots": await fetch_rows(db, query, RFM_HISTORY_FIELDS, snapshot_filter.params)}
+
+    try:
+        return await cached_response("rfm_history", {"date_from": date_from, "date_to": date_to}, compute)
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in RFM history: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in RFM history: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/v1/analytics/cohorts")
+async def get_cohort_analytics(
+    granularity: str = Query("month", description="Cohort and period length (week, month)"),
+    horizon: int = Query(DEFAULT_HORIZON, ge=1, le=MAX_HORIZON, description="Periods after the first one"),
+    date_from: Optional[str] = Query(None, description="First cohort date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Last cohort date (YYYY-MM-DD)"),
+    db: duckdb.DuckDBPyConnection = Depends(get_db),
+):
+    """Retention and revenue of first-purchase cohorts over periods ``0..horizon``.
+
+    Each cohort lists one value per period; periods that have not happened
+    yet are null.
+    """
+
+    try:
+        query, params = cohort_query(granularity, horizon, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    async def compute():
+        rows = await query_executor.run(db, lambda cur: parse_cache.execute(cur, query, params).fetchall())
+        return {"granularity": granularity, "horizon": horizon, "cohorts": dense_matrix(rows, horizon)}
+
+    try:
+        return await cached_response(
+            "cohorts",
+            {"granularity": granularity, "horizon": horizon, "date_from": date_from, "date_to": date_to},
+            compute,
+        )
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in cohort analytics: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in cohort analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+TOP_PRODUCT_FIELDS: FieldSpec = {
+    "product_name": ("product_name", "str"),
+    "category": ("category", "str"),
+    "revenue": ("revenue", "float"),
+    "times_ordered": ("times_ordered", "int"),
+    "units_sold": ("total_quantity_sold", "int"),
+    "avg_price": ("avg_price", "float"),
+    "profit_per_unit": ("profit_per_unit", "float"),
+}
+
+CATEGORY_FIELDS: FieldSpec = {
+    "category": ("category", "str"),
+    "total_products": ("total_products", "int"),
+    "products_sold": ("products_sold", "int"),
+    "sell_through_rate": ("sell_through_rate", "float"),
+    "revenue": ("category_revenue", "float"),
+}
+
+
 @app.get("/api/v1/analytics/products")
 async def get_product_analytics(
     category: Optional[str] = Query(None, description="Filter by product category"),
-    limit: int = Query(20, description="Number of top products to return"),
+    limit: int = Query(20, ge=1, le=1000, description="Number of top products to return"),
     db: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
     """Get product performance analytics."""
 
-    try:
+    async def compute():
         # Top products by revenue
-        products_query = """
+        product_filter = Conditions("times_ordered > 0").equals("category", category)
+        products_query = f"""
         SELECT
             product_name,
             category,
@@ -428,15 +676,12 @@ async def get_product_analytics(
             ROUND(avg_selling_price, 2) as avg_price,
             ROUND(avg_profit_per_unit, 2) as profit_per_unit
         FROM product_performance
-        WHERE times_ordered > 0
+        {product_filter.sql()}
+        ORDER BY total_revenue DESC
+        LIMIT ?
         """
 
-        if category:
-            products_query += f" AND category = '{category}'"
-
-        products_query += f" ORDER BY total_revenue DESC LIMIT {limit}"
-
-        products = db.execute(products_query).fetchdf()
+        products = await fetch_rows(db, products_query, TOP_PRODUCT_FIELDS, product_filter.params + [limit])
 
         # Category performance
         category_query = """
@@ -451,43 +696,46 @@ async def get_product_analytics(
         ORDER BY category_revenue DESC
         """
 
-        categories = db.execute(category_query).fetchdf()
-
-        return {
-            "top_products": [
-                {
-                    "product_name": row["product_name"],
-                    "category": row["category"],
-                    "revenue": float(row["revenue"]),
-                    "times_ordered": int(row["times_ordered"]),
-                    "units_sold": int(row["total_quantity_sold"]),
-                    "avg_price": float(row["avg_price"]),
-                    "profit_per_unit": float(row["profit_per_unit"]),
-                }
-                for _, row in products.iterrows()
-            ],
-            "category_performance": [
-                {
-                    "category": row["category"],
-                    "total_products": int(row["total_products"]),
-                    "products_sold": int(row["products_sold"]),
-                    "sell_through_rate": float(row["sell_through_rate"]),
-                    "revenue": float(row["category_revenue"]),
-                }
-                for _, row in categories.iterrows()
-            ],
-        }
+        categories = await fetch_rows(db, category_query, CATEGORY_FIELDS)
+
+        return {"top_products": products, "category_performance": categories}
 
+    try:
+        return await cached_response("products", {"category": category, "limit": limit}, compute)
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in product analytics: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in product analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+TRAFFIC_SOURCE_FIELDS: FieldSpec = {
+    "source": ("traffic_source", "str"),
+    "sessions": ("sessions", "int"),
+    "conversions": ("conversions", "int"),
+    "conversion_rate": ("conversion_rate", "float"),
+    "avg_session_duration": ("avg_session_duration", "int"),
+    "avg_page_views": ("avg_page_views", "float"),
+    "revenue": ("total_revenue", "float"),
+    "revenue_per_session": ("revenue_per_session", "float"),
+}
+
+DEVICE_FIELDS: FieldSpec = {
+    "device": ("device_type", "str"),
+    "sessions": ("sessions", "int"),
+    "avg_duration": ("avg_duration", "int"),
+    "avg_page_views": ("avg_page_views", "float"),
+    "bounce_rate": ("bounce_rate", "float"),
+    "conversion_rate": ("conversion_rate", "float"),
+}
+
+
 @app.get("/api/v1/analytics/marketing")
 async def get_marketing_analytics(db: duckdb.DuckDBPyConnection = Depends(get_db)):
     """Get marketing attribution and traffic source analytics."""
 
-    try:
+    async def compute():
         # Traffic source performance
         traffic_query = """
         SELECT
@@ -504,7 +752,7 @@ async def get_marketing_analytics(db: duckdb.DuckDBPyConnection = Depends(get_db
         ORDER BY total_revenue DESC
         """
 
-        traffic = db.execute(traffic_query).fetchdf()
+        traffic = await fetch_rows(db, traffic_query, TRAFFIC_SOURCE_FIELDS)
 
         # Device performance
         device_query = """
@@ -520,82 +768,219 @@ async def get_marketing_analytics(db: duckdb.DuckDBPyConnection = Depends(get_db
         ORDER BY conversion_rate DESC
         """
 
-        devices = db.execute(device_query).fetchdf()
-
-        return {
-            "traffic_sources": [
-                {
-                    "source": row["traffic_source"],
-                    "sessions": int(row["sessions"]),
-                    "conversions": int(row["conversions"]),
-                    "conversion_rate": float(row["conversion_rate"]),
-                    "avg_session_duration": int(row["avg_session_duration"]),
-                    "avg_page_views": float(row["avg_page_views"]),
-                    "revenue": float(row["total_revenue"]),
-                    "revenue_per_session": float(row["revenue_per_session"]),
-                }
-                for _, row in traffic.iterrows()
-            ],
-            "device_performance": [
-                {
-                    "device": row["device_type"],
-                    "sessions": int(row["sessions"]),
-                    "avg_duration": int(row["avg_duration"]),
-                    "avg_page_views": float(row["avg_page_views"]),
-                    "bounce_rate": float(row["bounce_rate"]),
-                    "conversion_rate": float(row["conversion_rate"]),
-                }
-                for _, row in devices.iterrows()
-            ],
-        }
+        devices = await fetch_rows(db, device_query, DEVICE_FIELDS)
+
+        return {"traffic_sources": traffic, "device_performance": devices}
 
+    try:
+        return await cached_response("marketing", {}, compute)
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in marketing analytics: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in marketing analytics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+RECENT_ORDER_FIELDS: FieldSpec = {
+    "order_id": ("order_id", "str"),
+    "customer_id": ("customer_id", "str"),
+    "order_date": ("order_date", "timestamp"),
+    "status": ("status", "str"),
+    "payment_method": ("payment_method", "str"),
+    "total_amount": ("total_amount", "float"),
+}
+
+
 @app.get("/api/v1/reports/recent-orders")
 async def get_recent_orders(
     limit: int = Query(50, ge=1, le=1000, description="Number of recent orders to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    status: Optional[str] = Query(None, description="Filter by order status"),
+    payment_method: Optional[str] = Query(None, description="Filter by payment method"),
+    customer_id: Optional[int] = Query(None, description="Filter by customer"),
     db: duckdb.DuckDBPyConnection = Depends(get_db),
 ):
-    """Get recent orders for real-time monitoring."""
+    """Get recent orders for real-time monitoring, newest first.
+
+    Pass ``next_cursor`` back as ``cursor`` for the following page; it is
+    null on the last page.
+    """
 
     try:
-        query = """
-        SELECT
-            order_id,
-            customer_id,
-            order_date,
-            status,
-            payment_method,
-            ROUND(total_amount, 2) as total_amount
-        FROM orders
-        ORDER BY order_date DESC
-        LIMIT ?
-        """
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    filters = {"status": status, "payment_method": payment_method, "customer_id": customer_id}
+
+    def fetch_page(cur):
+        # One extra row tells whether another page follows
+        anchor = after[0] if after else cur.execute("SELECT MAX(order_date) FROM orders").fetchone()[0]
+        for since in windows(anchor):
+            query, params = page_query(filters, after, since, limit + 1)
+            columns = parse_cache.execute(cur, query, params).fetchnumpy()
+            if len(columns["order_id"]) > limit:
+                break
+        with serializing():
+            orders = columns_to_records(columns, RECENT_ORDER_FIELDS)
+        if len(orders) <= limit:
+            return orders, None
+        return orders[:limit], encode_cursor(*page_key(columns, limit - 1))
+
+    try:
+        orders, next_cursor = await query_executor.run(db, fetch_page)
 
-        orders = db.execute(query, [limit]).fetchdf()
-
-        return {
-            "recent_orders": [
-                {
-                    "order_id": str(row["order_id"]),
-                    "customer_id": str(row["customer_id"]),
-                    "order_date": str(row["order_date"]),
-                    "status": row["status"],
-                    "payment_method": row["payment_method"],
-                    "total_amount": float(row["total_amount"]),
-                }
-                for _, row in orders.iterrows()
-            ]
-        }
+        return ORJSONResponse({"recent_orders": orders, "next_cursor": next_cursor})
 
+    except QueryTimeoutError as e:
+        logger.warning(f"Timeout in recent orders: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in recent orders: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/v1/reports/export/{table}")
+async def export_table(
+    table: str,
+    format: str = Query("ndjson", description="Output format: ndjson, csv, parquet"),
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+):
+    """Stream a full extract of ``orders`` or ``web_sessions`` for a date range.
+
+    A pooled cursor is acquired once streaming starts and held until the
+    stream ends or the client disconnects.
+    """
+
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export table: {table}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"Unsupported export format: {format}")
+
+    try:
+        query, params = export_query(table, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date filter: {str(e)}")
+
+    return StreamingResponse(
+        stream_export(db_manager.acquire, query_executor, db_manager.release, query, params, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+
+# Metrics servable by the batch endpoint: endpoint function and its parameters with their defaults
+BATCH_METRICS = {
+    "overview": (get_overview_metrics, {"date_from": None, "date_to": None, "approx": False}),
+    "revenue": (get_revenue_analytics, {"date_from": None, "date_to": None, "group_by": "month"}),
+    "customers": (get_customer_analytics, {"segment": None, "as_of": None}),
+    "rfm_history": (get_rfm_history, {"date_from": None, "date_to": None}),
+    "cohorts": (
+        get_cohort_analytics,
+        {"granularity": "month", "horizon": DEFAULT_HORIZON, "date_from": None, "date_to": None},
+    ),
+    "products": (get_product_analytics, {"category": None, "limit": 20}),
+    "marketing": (get_marketing_analytics, {}),
+    "recent_orders": (
+        get_recent_orders,
+        {"limit": 50, "cursor": None, "status": None, "payment_method": None, "customer_id": None},
+    ),
+}
+
+# Every other batch parameter (dates, filters, groupings, cursors) is a string or null
+BATCH_NON_STRING_PARAMS = {"limit", "horizon", "customer_id", "approx"}
+
+
+async def run_batch_metric(metric: str, params: Dict[str, Any]) -> Response:
+    """Serve one batched metric through its endpoint on a cursor of its own."""
+    endpoint, _ = BATCH_METRICS[metric]
+    try:
+        cursor = await asyncio.to_thread(db_manager.acquire)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        return await endpoint(db=cursor, **params)
+    finally:
+        db_manager.release(cursor)
+
+
+@app.post("/api/v1/analytics/batch")
+async def get_batch_analytics(request: BatchRequest):
+    """Serve several metrics in one round trip.
+
+    ``date_from``/``date_to`` apply to every metric that accepts them; a
+    metric's own ``params`` take precedence. Identical metric requests are
+    computed once, distinct ones run concurrently on separate pooled cursors,
+    and every result goes through the same cache as the single endpoints.
+    Each result is keyed by its ``id`` (default: the metric name); failed
+    metrics are reported under ``errors`` without failing the batch.
+    """
+
+    shared = {"date_from": request.date_from, "date_to": request.date_to}
+    planned = {}
+    for item in request.metrics:
+        if item.metric not in BATCH_METRICS:
+            raise HTTPException(status_code=422, detail=f"Unknown metric: {item.metric}")
+        _, defaults = BATCH_METRICS[item.metric]
+        unknown = set(item.params) - set(defaults)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown parameters for {item.metric}: {sorted(unknown)}")
+
+        # JSON booleans are ints to Python, so integer parameters compare types exactly
+        limit = item.params.get("limit", 1)
+        if type(limit) is not int or not 1 <= limit <= 1000:
+            raise HTTPException(status_code=422, detail="limit must be an integer between 1 and 1000")
+
+        horizon = item.params.get("horizon", DEFAULT_HORIZON)
+        if type(horizon) is not int or not 1 <= horizon <= MAX_HORIZON:
+            raise HTTPException(status_code=422, detail=f"horizon must be an integer between 1 and {MAX_HORIZON}")
+
+        customer_id = item.params.get("customer_id")
+        if customer_id is not None and type(customer_id) is not int:
+            raise HTTPException(status_code=422, detail="customer_id must be an integer")
+
+        if not isinstance(item.params.get("approx", False), bool):
+            raise HTTPException(status_code=422, detail="approx must be a boolean")
+
+        for name, value in item.params.items():
+            if name not in BATCH_NON_STRING_PARAMS and value is not None and not isinstance(value, str):
+                raise HTTPException(status_code=422, detail=f"{name} must be a string")
+
+        result_id = item.id or item.metric
+        if result_id in planned:
+            raise HTTPException(status_code=422, detail=f"Duplicate metric id: {result_id}")
+        params = {name: shared.get(name, default) for name, default in defaults.items()}
+        params.update(item.params)
+        planned[result_id] = (item.metric, params)
+
+    # One task per distinct (metric, parameters)
+    tasks = {}
+    for metric, params in planned.values():
+        key = (metric, result_cache.normalize_params(params))
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(run_batch_metric(metric, params))
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    results, errors = [], {}
+    for result_id, (metric, params) in planned.items():
+        task = tasks[(metric, result_cache.normalize_params(params))]
+        error = task.exception()
+        if error is None:
+            results.append(orjson.dumps(result_id) + b":" + task.result().body)
+        elif isinstance(error, HTTPException):
+            errors[result_id] = {"status": error.status_code, "detail": error.detail}
+        else:
+            logger.error(f"Error in batch metric {metric}: {str(error)}")
+            errors[result_id] = {"status": 500, "detail": str(error)}
+
+    # Cached bodies are already encoded, so the combined payload is assembled without re-encoding them
+    body = b'{"results":{' + b",".join(results) + b'},"errors":' + orjson.dumps(errors) + b"}"
+    return Response(content=body, media_type="application/json")
+
+
 if __name__ == "__main__":
     import uvicorn
 
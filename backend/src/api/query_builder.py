@@ -0,0 +1,109 @@
+"""
+Parameterized Query Building
+============================
+
+Builds SQL predicates with bound parameters instead of formatting filter
+values into the query text. ``Conditions`` collects predicates and their
+parameters and renders them wherever the query needs them: a ``WHERE``
+clause, or the ``ON`` clause of a ``LEFT JOIN`` so that filtering the joined
+table keeps unmatched rows::
+
+    on = Conditions().date_range("o.order_date", date_from, date_to)
+    sql = f"... LEFT JOIN orders o ON c.customer_id = o.customer_id {on.sql('AND')}"
+    cursor.execute(sql, on.params)
+
+Date bounds are parsed into typed values (``rollups.parse_bound``); a bare
+``date_to`` includes that whole day, as in the rollup planner.
+
+``ParseCache`` keeps parsed statements keyed by their SQL text. Filter
+values are parameters, so every request shape maps to one statement that is
+parsed once per process and re-executed with new values on any pooled cursor.
+Only parsing is skipped: DuckDB's Python API does not expose prepared
+statement handles, so each execution still binds and plans the statement.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+import duckdb
+
+from api.rollups import parse_bound
+
+
+class Conditions:
+    """Conjunction of SQL predicates with positional ``?`` parameters."""
+
+    def __init__(self, *clauses: str):
+        self.clauses: List[str] = list(clauses)
+        self.params: List[Any] = []
+
+    def add(self, clause: str, *params: Any) -> "Conditions":
+        """Add a predicate with one ``?`` per parameter."""
+        self.clauses.append(clause)
+        self.params.extend(params)
+        return self
+
+    def equals(self, column: str, value: Any) -> "Conditions":
+        """``column = value``; no predicate when ``value`` is None."""
+        return self if value is None else self.add(f"{column} = ?", value)
+
+    def date_range(self, column: str, date_from: Optional[str], date_to: Optional[str]) -> "Conditions":
+        """Typed range on a timestamp column (raises ``ValueError`` on malformed dates)."""
+        lo, hi = parse_bound(date_from), parse_bound(date_to)
+        if lo is not None:
+            self.add(f"{column} >= ?", lo if isinstance(lo, datetime) else datetime.combine(lo, datetime.min.time()))
+        if isinstance(hi, datetime):
+            self.add(f"{column} <= ?", hi)
+        elif hi is not None:
+            self.add(f"{column} < ?", datetime.combine(hi + timedelta(days=1), datetime.min.time()))
+        return self
+
+    def sql(self, keyword: str = "WHERE") -> str:
+        """Render as ``<keyword> a AND b``, or an empty string without predicates."""
+        return f"{keyword} {' AND '.join(self.clauses)}" if self.clauses else ""
+
+    def __bool__(self) -> bool:
+        return bool(self.clauses)
+
+
+class ParseCache:
+    """Thread-safe LRU of parsed (not prepared) statements keyed by SQL text."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._statements: "OrderedDict[str, duckdb.Statement]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cursor: duckdb.DuckDBPyConnection, query: str) -> duckdb.Statement:
+        """The parsed single statement for ``query``, parsing it on first use."""
+        with self._lock:
+            statement = self._statements.get(query)
+            if statement is not None:
+                self._statements.move_to_end(query)
+                self.hits += 1
+                return statement
+
+        (statement,) = cursor.extract_statements(query)
+        with self._lock:
+            self.misses += 1
+            self._statements[query] = statement
+            while len(self._statements) > self.max_entries:
+                self._statements.popitem(last=False)
+        return statement
+
+    def execute(self, cursor: duckdb.DuckDBPyConnection, query: str, params: Optional[list] = None):
+        """Execute ``query`` on ``cursor`` from its cached parsed statement."""
+        return cursor.execute(self.get(cursor, query), params)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "statements": len(self._statements),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
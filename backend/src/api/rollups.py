@@ -0,0 +1,303 @@
+"""
+Revenue Rollup Planner
+======================
+
+Answers the revenue time series from the ``revenue_rollup_<grain>`` tables
+maintained by ``utils.summary_tables`` instead of aggregating ``orders`` on
+every request. A date range is split into the coarsest rollup periods that
+fit inside it and nest inside the requested ``group_by`` period (a quarter
+is built from whole quarters, then whole months, then days); only partial
+edge days, when a bound carries a time of day, are read from raw orders.
+
+The same split answers range totals: orders and revenue per segment and
+status, sessions and conversions from ``session_rollup_day``, and the
+number of distinct customers, estimated by merging the HyperLogLog sketches
+of whole months and days with registers computed from the edge orders.
+
+A bare ``date_to`` (``YYYY-MM-DD``) includes that whole day.
+"""
+
+import math
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple, Union
+
+import duckdb
+
+from utils.summary_tables import HLL_REGISTERS, SKETCH_GRAINS, hll_registers_sql, sketch_table
+
+GROUP_BY_GRAINS = ("day", "week", "month", "quarter")
+
+# Rollup grains usable for each group_by, coarsest first; every period nests in the group_by period
+NESTED_GRAINS = {
+    "day": ("day",),
+    "week": ("week", "day"),
+    "month": ("month", "day"),
+    "quarter": ("quarter", "month", "day"),
+}
+
+# Relative standard error of a distinct-customer estimate
+HLL_RELATIVE_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+
+
+def rollup_table(grain: str) -> str:
+    return f"revenue_rollup_{grain}"
+
+
+# Everything the approximate overview reads
+APPROX_TABLES = (
+    *(rollup_table(grain) for grain in GROUP_BY_GRAINS),
+    *(sketch_table(grain) for grain in SKETCH_GRAINS),
+    "session_rollup_day",
+)
+
+
+def tables_available(cursor: duckdb.DuckDBPyConnection, tables: Iterable[str]) -> bool:
+    """Whether every one of ``tables`` has been materialized in the database."""
+    names = list(tables)
+    found = cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = 'main' AND table_name IN (SELECT UNNEST(?))
+    """,
+        [names],
+    ).fetchone()[0]
+    return found == len(names)
+
+
+def rollups_available(cursor: duckdb.DuckDBPyConnection) -> bool:
+    """Whether every rollup table has been materialized in the database."""
+    return tables_available(cursor, (rollup_table(grain) for grain in GROUP_BY_GRAINS))
+
+
+def parse_bound(value: Optional[str]) -> Union[None, date, datetime]:
+    """Parse a date filter: a ``date`` for whole days, a ``datetime`` when it has a time of day."""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def floor_period(day: date, grain: str) -> date:
+    """Start of the ``grain`` period containing ``day``."""
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    if grain == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day
+
+
+def next_period(start: date, grain: str) -> date:
+    """Start of the ``grain`` period following the one starting at ``start``."""
+    if grain == "day":
+        return start + timedelta(days=1)
+    if grain == "week":
+        return start + timedelta(days=7)
+    months = start.month - 1 + (3 if grain == "quarter" else 1)
+    return start.replace(year=start.year + months // 12, month=months % 12 + 1)
+
+
+def ceil_period(day: date, grain: str) -> date:
+    """Start of the first ``grain`` period beginning on or after ``day``."""
+    start = floor_period(day, grain)
+    return start if start == day else next_period(start, grain)
+
+
+def decompose(
+    lo: Optional[date], hi: Optional[date], grains: Tuple[str, ...]
+) -> List[Tuple[str, Optional[date], Optional[date]]]:
+    """Cover the days ``[lo, hi)`` (``None`` = unbounded) with whole periods, coarsest grain first.
+
+    ``grains`` must end with ``"day"``, which covers any remainder exactly.
+    """
+    if lo is not None and hi is not None and lo >= hi:
+        return []
+    grain, finer = grains[0], grains[1:]
+    if not finer:
+        return [(grain, lo, hi)]
+
+    first = None if lo is None else ceil_period(lo, grain)
+    last = None if hi is None else floor_period(hi, grain)
+    if first is not None and last is not None and first >= last:
+        return decompose(lo, hi, finer)
+
+    head = decompose(lo, first, finer) if lo is not None else []
+    tail = decompose(last, hi, finer) if hi is not None else []
+    return head + [(grain, first, last)] + tail
+
+
+def _range_filter(column: str, lo, hi, hi_inclusive: bool = False) -> Tuple[str, list]:
+    conditions, params = [], []
+    if lo is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(lo)
+    if hi is not None:
+        conditions.append(f"{column} {'<=' if hi_inclusive else '<'} ?")
+        params.append(hi)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def _raw_piece(lo, hi, hi_inclusive: bool) -> Tuple[str, list]:
+    where, params = _range_filter("order_date", lo, hi, hi_inclusive)
+    return f"SELECT order_date AS period, status, total_amount AS revenue, 1 AS orders FROM orders{where}", params
+
+
+def split_range(
+    date_from: Optional[str], date_to: Optional[str], grains: Tuple[str, ...], use_rollups: bool = True
+) -> List[Tuple[Optional[str], Optional[Union[date, datetime]], Optional[Union[date, datetime]], bool]]:
+    """Cover a date range with whole ``grains`` periods and raw-order edges.
+
+    Returns ``(grain, lo, hi, hi_inclusive)`` pieces, where ``grain`` is None
+    for a partial edge day (or, with ``use_rollups=False``, the whole range)
+    to be read from raw orders.
+    """
+    lo, hi = parse_bound(date_from), parse_bound(date_to)
+
+    # Whole days [first_day, end_day) come from rollups, partial edge days from orders
+    head_partial = isinstance(lo, datetime) and lo.time() != time.min
+    tail_partial = isinstance(hi, datetime)
+    first_day = lo.date() + timedelta(days=head_partial) if isinstance(lo, datetime) else lo
+    end_day = hi.date() if tail_partial else None if hi is None else hi + timedelta(days=1)
+
+    if not use_rollups or (first_day is not None and end_day is not None and first_day >= end_day):
+        # No whole day in range: a single raw scan
+        return [(None, lo, hi if tail_partial else end_day, tail_partial)]
+
+    pieces = []
+    if head_partial:
+        pieces.append((None, lo, first_day, False))
+    pieces.extend((grain, start, stop, False) for grain, start, stop in decompose(first_day, end_day, grains))
+    if tail_partial:
+        pieces.append((None, end_day, hi, True))
+    return pieces
+
+
+def _union(pieces: List[Tuple[str, list]]) -> Tuple[str, list]:
+    union = "\n            UNION ALL\n            ".join(sql for sql, _ in pieces)
+    return union, [param for _, params in pieces for param in params]
+
+
+def plan_revenue_series(
+    group_by: str, date_from: Optional[str], date_to: Optional[str], use_rollups: bool = True
+) -> Tuple[str, list]:
+    """SQL and parameters for the revenue time series (Completed revenue and orders per period).
+
+    Periods with orders but no completed ones are kept with zero revenue.
+    With ``use_rollups=False`` the whole range is read from raw orders.
+    """
+    pieces = []
+    for grain, lo, hi, hi_inclusive in split_range(date_from, date_to, NESTED_GRAINS[group_by], use_rollups):
+        if grain is None:
+            pieces.append(_raw_piece(lo, hi, hi_inclusive))
+        else:
+            where, params = _range_filter("period", lo, hi)
+            pieces.append((f"SELECT period, status, revenue, orders FROM {rollup_table(grain)}{where}", params))
+
+    union, params = _union(pieces)
+    query = f"""
+        SELECT
+            DATE_TRUNC('{group_by}', period) as period,
+            SUM(CASE WHEN status = 'Completed' THEN revenue ELSE 0 END) as revenue,
+            SUM(CASE WHEN status = 'Completed' THEN orders ELSE 0 END) as orders
+        FROM (
+            {union}
+        )
+        GROUP BY 1
+        ORDER BY period
+    """
+    return query, params
+
+
+def plan_segment_totals(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, list]:
+    """SQL and parameters for orders and revenue per customer segment and status over a date range.
+
+    Whole periods come from the coarsest rollups (quarters, then months, then
+    days); partial edge days are joined from raw orders.
+    """
+    pieces = []
+    for grain, lo, hi, hi_inclusive in split_range(date_from, date_to, NESTED_GRAINS["quarter"]):
+        if grain is None:
+            where, params = _range_filter("o.order_date", lo, hi, hi_inclusive)
+            pieces.append(
+                (
+                    f"""SELECT c.customer_segment, o.status, o.total_amount AS revenue, 1 AS orders
+            FROM orders o LEFT JOIN customers c ON o.customer_id = c.customer_id{where}""",
+                    params,
+                )
+            )
+        else:
+            where, params = _range_filter("period", lo, hi)
+            pieces.append(
+                (f"SELECT customer_segment, status, revenue, orders FROM {rollup_table(grain)}{where}", params)
+            )
+
+    union, params = _union(pieces)
+    query = f"""
+        SELECT customer_segment, status, SUM(revenue) as revenue, SUM(orders) as orders
+        FROM (
+            {union}
+        )
+        GROUP BY ALL
+    """
+    return query, params
+
+
+def plan_session_totals(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, list]:
+    """SQL and parameters for ``(sessions, conversions)`` over a date range."""
+    pieces = []
+    for grain, lo, hi, hi_inclusive in split_range(date_from, date_to, ("day",)):
+        if grain is None:
+            where, params = _range_filter("session_date", lo, hi, hi_inclusive)
+            sql = f"SELECT 1 AS sessions, CAST(converted AS INTEGER) AS conversions FROM web_sessions{where}"
+            pieces.append((sql, params))
+        else:
+            where, params = _range_filter("day", lo, hi)
+            pieces.append((f"SELECT sessions, conversions FROM session_rollup_day{where}", params))
+
+    union, params = _union(pieces)
+    return f"SELECT COALESCE(SUM(sessions), 0), COALESCE(SUM(conversions), 0) FROM ({union})", params
+
+
+def plan_distinct_customers(date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, list]:
+    """SQL and parameters for the merged sketch of the customers ordering in a date range.
+
+    The query returns ``(filled registers, sum of 2^-rank over them)`` for ``hll_estimate``.
+    """
+    pieces = []
+    for grain, lo, hi, hi_inclusive in split_range(date_from, date_to, tuple(reversed(SKETCH_GRAINS))):
+        if grain is None:
+            where, params = _range_filter("order_date", lo, hi, hi_inclusive)
+            pieces.append((f"SELECT bucket, rank FROM ({hll_registers_sql('NULL', where)})", params))
+        else:
+            where, params = _range_filter("period", lo, hi)
+            pieces.append((f"SELECT bucket, rank FROM {sketch_table(grain)}{where}", params))
+
+    union, params = _union(pieces)
+    query = f"""
+        SELECT COUNT(*), COALESCE(SUM(pow(0.5, rank)), 0)
+        FROM (
+            SELECT bucket, MAX(rank) as rank
+            FROM (
+                {union}
+            )
+            GROUP BY bucket
+        )
+    """
+    return query, params
+
+
+def hll_estimate(filled: int, harmonic: float) -> float:
+    """Distinct count estimated from a merged sketch (``plan_distinct_customers``).
+
+    Small counts, where some registers are still empty, use linear counting.
+    """
+    registers = HLL_REGISTERS
+    empty = registers - filled
+    alpha = 0.7213 / (1 + 1.079 / registers)
+    estimate = alpha * registers * registers / (harmonic + empty)
+    if estimate <= 2.5 * registers and empty:
+        estimate = registers * math.log(registers / empty)
+    return estimate
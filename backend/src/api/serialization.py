@@ -0,0 +1,79 @@
+"""
+Columnar Response Serialization
+===============================
+
+Turns DuckDB results into JSON records without going through pandas
+``iterrows()``. Results are fetched as NumPy columns, each column is cast and
+NULL/NaN-filled in one vectorized step, and records are zipped together at
+the end. Responses are encoded to bytes with orjson. Both steps count as
+serialization time in the request instrumentation.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import orjson
+from starlette.responses import Response
+
+from api.instrumentation import serializing
+
+# Output key -> (result column, kind). Kinds: "str", "int", "float", "timestamp".
+FieldSpec = Dict[str, Tuple[str, str]]
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+def encode_json(content: Any) -> bytes:
+    """Encode a response payload with orjson."""
+    with serializing():
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _convert_column(values: np.ndarray, kind: str) -> List[Any]:
+    """Cast one result column to JSON-ready Python values."""
+    mask = np.ma.getmaskarray(values)
+    data = np.ma.getdata(values)
+
+    if kind == "float":
+        return np.nan_to_num(np.where(mask, 0.0, data.astype(np.float64)), nan=0.0).tolist()
+
+    if kind == "int":
+        if data.dtype.kind == "f":
+            data = np.nan_to_num(data, nan=0.0)
+        return np.where(mask, 0, data).astype(np.int64).tolist()
+
+    if kind == "timestamp":
+        if data.size == 0:
+            return []
+        converted = np.char.replace(np.datetime_as_string(data.astype("datetime64[s]"), unit="s"), "T", " ")
+    elif kind == "str":
+        converted = data if data.dtype == object else data.astype(str)
+    else:
+        raise ValueError(f"Unknown field kind: {kind}")
+
+    result = converted.tolist()
+    if mask.any():
+        for i in np.flatnonzero(mask):
+            result[i] = None
+    return result
+
+
+def columns_to_records(columns: Dict[str, np.ndarray], fields: FieldSpec) -> List[Dict[str, Any]]:
+    """Build records from a dict of result columns according to ``fields``."""
+    keys = list(fields)
+    converted = [_convert_column(columns[column], kind) for column, kind in fields.values()]
+    return [dict(zip(keys, row)) for row in zip(*converted)]
+
+
+def fetch_records(cursor, fields: FieldSpec) -> List[Dict[str, Any]]:
+    """Fetch the pending result of ``cursor`` as serialized records."""
+    columns = cursor.fetchnumpy()
+    with serializing():
+        return columns_to_records(columns, fields)
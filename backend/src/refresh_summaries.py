@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Summary Table Refresh
+=====================
+
+Rebuilds or incrementally updates the materialized summary tables
+(monthly_revenue, customer_ltv, product_performance) in the DuckDB database.
+
+Usage:
+    python refresh_summaries.py                      # full rebuild of every table
+    python refresh_summaries.py --mode incremental   # only keys touched by new orders
+    python refresh_summaries.py --tables customer_ltv product_performance
+
+The API opens the database read-only; stop it before refreshing.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+import duckdb
+
+# Add utils to path for imports
+current_dir = Path(__file__).parent
+utils_dir = current_dir / "utils"
+sys.path.insert(0, str(utils_dir))
+
+from summary_tables import SUMMARY_TABLES, METADATA_TABLE, refresh_summaries
+
+
+def main():
+    """Refresh the summary tables."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["full", "incremental"], default="full", help="Refresh strategy")
+    parser.add_argument("--tables", nargs="+", choices=sorted(SUMMARY_TABLES), help="Tables to refresh (default: all)")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=current_dir.parent / "data" / "ecommerce.duckdb",
+        help="DuckDB database file",
+    )
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"❌ Database not found at {args.db}. Please run 01_data_generation.py first!")
+        sys.exit(1)
+
+    print(f"🔄 Refreshing summary tables ({args.mode}) in {args.db}")
+
+    with duckdb.connect(str(args.db)) as conn:
+        conn.execute("BEGIN TRANSACTION")
+        results = refresh_summaries(conn, mode=args.mode, tables=args.tables)
+        conn.execute("COMMIT")
+
+        for name, build in results.items():
+            detail = f", {build['affected_keys']:,} keys recomputed" if "affected_keys" in build else ""
+            print(f"  ✅ {name}: {build['mode']} refresh, {build['rows']:,} rows in {build['seconds']:.2f}s{detail}")
+
+        built = conn.execute(f"SELECT table_name, built_at FROM {METADATA_TABLE} ORDER BY table_name").fetchall()
+        print("\n🕒 Build timestamps:")
+        for name, built_at in built:
+            print(f"  {name}: {built_at}")
+
+
+if __name__ == "__main__":
+    main()
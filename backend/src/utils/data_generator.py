@@ -4,20 +4,122 @@ Data Generation Utilities for E-commerce Analytics
 
 This module provides utilities to generate realistic e-commerce data
 including customers, products, orders, and web analytics data.
+
+Every table is generated in shards of ``chunk_size`` rows. Each shard draws
+from its own random stream derived from the root ``seed``, the table and the
+shard index, so shards can run on a process pool and the output is identical
+for any number of workers.
+
+``iter_batches()`` streams every table as one DataFrame per shard with a
+bounded number of shards in flight, so memory stays flat as volumes grow;
+``generate_all_data()`` collects the same batches into complete frames.
 """
 
 import pandas as pd
 import numpy as np
 from faker import Faker
-from datetime import datetime, timedelta
-import random
-from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Stream key of each table, mixed into the per-shard seeds
+TABLE_STREAMS = {"customers": 0, "products": 1, "orders": 2, "web_sessions": 3, "attribute_pools": 4}
+
+# "faker" calls Faker for every customer and product; "fast" draws from pools sampled once
+ATTRIBUTE_MODES = ("faker", "fast")
+ATTRIBUTE_POOL_SIZE = 2000
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Large read-only inputs of each shard method (set once per worker process)
+_shard_inputs: Dict[str, dict] = {}
+
+# Faker-sampled attribute pools per seed, built once per process
+_attribute_pools: Dict[int, Dict[str, np.ndarray]] = {}
+
+
+def _set_shard_inputs(inputs: Dict[str, dict]):
+    global _shard_inputs
+    _shard_inputs = inputs
 
-# Set seeds for reproducible data
-np.random.seed(42)
-random.seed(42)
-fake = Faker()
-Faker.seed(42)
+
+def _run_shard(generator: "EcommerceDataGenerator", method: str, args: tuple):
+    return getattr(generator, method)(*args, **_shard_inputs.get(method, {}))
+
+
+class _ShardRunner:
+    """Runs shard methods in-process or on a process pool.
+
+    ``inputs`` maps a shard method name to keyword arguments shared by all of
+    its shards; they are shipped to each worker process once.
+    """
+
+    def __init__(self, generator: "EcommerceDataGenerator", inputs: Optional[Dict[str, dict]] = None):
+        self.generator = generator
+        self.inputs = inputs or {}
+        self.window = 2 * generator.workers  # Shards in flight per stream
+        self.pool = None
+
+    def __enter__(self) -> "_ShardRunner":
+        if self.generator.workers > 1:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.generator.workers,
+                initializer=_set_shard_inputs,
+                initargs=(self.inputs,),
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def submit(self, method: str, *args) -> Future:
+        if self.pool is not None:
+            return self.pool.submit(_run_shard, self.generator, method, args)
+        future = Future()
+        future.set_result(getattr(self.generator, method)(*args, **self.inputs.get(method, {})))
+        return future
+
+    def map(self, method: str, shards: Iterable[tuple]) -> Iterator:
+        """Yield ``method(*shard)`` for every shard, in order, keeping at most ``window`` in flight."""
+        pending = deque()
+        for shard in shards:
+            pending.append(self.submit(method, *shard))
+            if len(pending) >= self.window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _choice(rng: np.random.Generator, labels: List[str], size: int, p: Optional[List[float]] = None) -> np.ndarray:
+    """Draw ``size`` labels as an object array sharing one string per label."""
+    return np.array(labels, dtype=object)[rng.choice(len(labels), size=size, p=p)]
+
+
+def _sample_distinct(rng: np.random.Generator, counts: np.ndarray, population: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Draw ``counts[i]`` distinct indices from ``range(population)`` for every group ``i``.
+
+    Returns the group of each draw and the drawn index. Draws that repeat an
+    index already picked for the same group are re-drawn, which keeps every
+    group a uniform sample without replacement.
+    """
+    groups = np.repeat(np.arange(len(counts)), counts)
+    picks = rng.integers(0, population, len(groups))
+
+    for _ in range(20):
+        keys = groups * population + picks
+        order = np.argsort(keys, kind="stable")
+        repeated = np.zeros(len(keys), dtype=bool)
+        repeated[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+        if not repeated.any():
+            return groups, picks
+        picks[repeated] = rng.integers(0, population, int(repeated.sum()))
+
+    # Groups drawing most of a small population rarely converge; sample them directly
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    for group in np.unique(groups[repeated]):
+        picks[offsets[group] : offsets[group + 1]] = rng.choice(population, counts[group], replace=False)
+    return groups, picks
 
 
 class EcommerceDataGenerator:
@@ -30,13 +132,28 @@ class EcommerceDataGenerator:
         num_orders: int = 50000,
         start_date: str = "2022-01-01",
         end_date: str = "2024-12-31",
+        seed: int = 42,
+        workers: int = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        attributes: str = "faker",
+        order_id_offset: int = 0,
+        session_id_offset: int = 0,
     ):
+        if attributes not in ATTRIBUTE_MODES:
+            raise ValueError(f"Unknown attribute mode: {attributes}")
 
         self.num_customers = num_customers
         self.num_products = num_products
         self.num_orders = num_orders
         self.start_date = pd.to_datetime(start_date)
         self.end_date = pd.to_datetime(end_date)
+        self.seed = seed
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.attributes = attributes
+
+        # Appending to an existing dataset continues its id sequences
+        self.id_offsets = {"orders": order_id_offset, "web_sessions": session_id_offset}
 
         # Business parameters for realism
         self.customer_segments = ["Budget", "Standard", "Premium", "Enterprise"]
@@ -60,106 +177,8 @@ class EcommerceDataGenerator:
             "Automotive",
         ]
 
-    def generate_customers(self) -> pd.DataFrame:
-        """Generate customer data with demographics and acquisition info."""
-        print(f"🏃‍♂️ Generating {self.num_customers:,} customers...")
-
-        customers = []
-        for i in range(self.num_customers):
-            # Demographics
-            profile = fake.profile()
-
-            # Customer segment (affects spending behavior)
-            segment = np.random.choice(self.customer_segments, p=[0.3, 0.4, 0.25, 0.05])  # Realistic distribution
-
-            # Acquisition channel
-            channel = np.random.choice(self.acquisition_channels, p=[0.25, 0.2, 0.15, 0.15, 0.1, 0.08, 0.07])
-
-            # Registration date (weighted towards recent)
-            days_back = np.random.exponential(200)  # Exponential decay
-            days_back = min(days_back, (self.end_date - self.start_date).days)
-            registration_date = self.end_date - timedelta(days=int(days_back))
-
-            customer = {
-                "customer_id": i + 1,
-                "email": profile["mail"],
-                "first_name": profile["name"].split()[0],
-                "last_name": profile["name"].split()[-1],
-                "birth_date": profile["birthdate"],
-                "gender": profile["sex"],
-                "address": profile["address"],
-                "city": fake.city(),
-                "country": fake.country(),
-                "postal_code": fake.postcode(),
-                "customer_segment": segment,
-                "acquisition_channel": channel,
-                "registration_date": registration_date,
-                "is_active": np.random.choice([True, False], p=[0.85, 0.15]),
-            }
-            customers.append(customer)
-
-        df = pd.DataFrame(customers)
-        print(f"✅ Generated customers with segments: {df['customer_segment'].value_counts().to_dict()}")
-        return df
-
-    def generate_products(self) -> pd.DataFrame:
-        """Generate product catalog with categories, pricing, and inventory."""
-        print(f"📦 Generating {self.num_products:,} products...")
-
-        products = []
-        for i in range(self.num_products):
-            category = np.random.choice(self.product_categories)
-
-            # Price based on category (some categories are more expensive)
-            category_price_multipliers = {
-                "Electronics": 3.0,
-                "Automotive": 2.5,
-                "Home & Garden": 1.8,
-                "Health & Beauty": 1.2,
-                "Clothing": 1.0,
-                "Sports": 1.5,
-                "Books": 0.4,
-                "Toys": 0.8,
-            }
-
-            base_price = np.random.lognormal(3, 1)  # Log-normal for realistic price distribution
-            price = base_price * category_price_multipliers.get(category, 1.0)
-
-            # Cost (margin varies by category)
-            margin_rate = np.random.normal(0.4, 0.1)  # Average 40% margin
-            margin_rate = max(0.1, min(0.8, margin_rate))  # Constrain between 10-80%
-            cost = price * (1 - margin_rate)
-
-            product = {
-                "product_id": i + 1,
-                "product_name": f"{fake.word().title()} {fake.word().title()}",
-                "category": category,
-                "subcategory": f"{category} - {fake.word().title()}",
-                "brand": fake.company(),
-                "price": round(price, 2),
-                "cost": round(cost, 2),
-                "weight_kg": round(np.random.lognormal(0, 1), 2),
-                "dimensions_cm": f"{fake.random_int(5,50)}x{fake.random_int(5,50)}x{fake.random_int(2,20)}",
-                "launch_date": fake.date_between(start_date=self.start_date.date(), end_date=self.end_date.date()),
-                "is_active": np.random.choice([True, False], p=[0.9, 0.1]),
-            }
-            products.append(product)
-
-        df = pd.DataFrame(products)
-        print(f"✅ Generated products across categories: {df['category'].value_counts().to_dict()}")
-        return df
-
-    def generate_orders(
-        self, customers_df: pd.DataFrame, products_df: pd.DataFrame
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        """Generate orders and order items with realistic patterns."""
-        print(f"🛒 Generating {self.num_orders:,} orders with realistic patterns...")
-
-        orders = []
-        order_items = []
-
         # Customer behavior patterns by segment
-        segment_behavior = {
+        self.segment_behavior = {
             "Budget": {
                 "avg_order_value": 50,
                 "order_frequency": 0.3,
@@ -182,111 +201,229 @@ class EcommerceDataGenerator:
             },
         }
 
-        for order_id in range(1, self.num_orders + 1):
-            # Select customer (weighted by segment activity)
-            segment_weights = (
-                customers_df["customer_segment"].map(lambda x: segment_behavior[x]["order_frequency"]).values
-            )
-            customer = customers_df.sample(1, weights=segment_weights).iloc[0]
-
-            # Order date (more recent orders more likely, seasonal patterns)
-            days_range = (self.end_date - self.start_date).days
-
-            # Add seasonality (higher sales in Nov-Dec, lower in Jan-Feb)
-            month_weights = [0.7, 0.7, 0.9, 0.9, 1.0, 1.0, 0.8, 0.8, 1.1, 1.1, 1.4, 1.5]
-
-            # Random date with recent bias
-            days_back = np.random.exponential(30)  # More recent orders more likely
-            days_back = min(days_back, days_range)
-            order_date = self.end_date - timedelta(days=int(days_back))
+    def shard_rng(self, table: str, shard: int) -> np.random.Generator:
+        """Independent random stream for one shard of ``table``.
+
+        Appended shards mix their id offset into the key so they never replay
+        the streams of the run they extend.
+        """
+        offset = self.id_offsets.get(table, 0)
+        return np.random.default_rng([self.seed, TABLE_STREAMS[table], shard] + ([offset] if offset else []))
+
+    def _faker(self, rng: np.random.Generator) -> Faker:
+        fake = Faker()
+        fake.seed_instance(int(rng.integers(2**63)))
+        return fake
+
+    def attribute_pools(self) -> Dict[str, np.ndarray]:
+        """Names, places and words sampled from Faker once per seed for the fast attribute mode."""
+        if self.seed not in _attribute_pools:
+            fake = self._faker(self.shard_rng("attribute_pools", 0))
+            samplers = {
+                "first_name": fake.first_name,
+                "last_name": fake.last_name,
+                "street_address": fake.street_address,
+                "city": fake.city,
+                "country": fake.country,
+                "postcode": fake.postcode,
+                "email_domain": fake.free_email_domain,
+                "word": lambda: fake.word().title(),
+                "company": fake.company,
+            }
+            _attribute_pools[self.seed] = {
+                name: np.array([sample() for _ in range(ATTRIBUTE_POOL_SIZE)], dtype=object)
+                for name, sample in samplers.items()
+            }
+        return _attribute_pools[self.seed]
 
-            # Adjust for seasonality
-            month_weight = month_weights[order_date.month - 1]
-            if np.random.random() > month_weight / 1.5:  # Skip some orders based on seasonality
-                continue
+    def _draw(self, rng: np.random.Generator, pool: str, size: int) -> np.ndarray:
+        values = self.attribute_pools()[pool]
+        return values[rng.integers(0, len(values), size)]
 
-            # Order status (most orders completed)
-            status = np.random.choice(
-                ["Completed", "Pending", "Cancelled", "Returned"],
-                p=[0.85, 0.05, 0.05, 0.05],
-            )
+    def shards(self, total: int) -> List[Tuple[int, int, int]]:
+        """Split ``range(total)`` into ``(shard, start, stop)`` chunks of ``chunk_size`` rows."""
+        return [
+            (index, start, min(start + self.chunk_size, total))
+            for index, start in enumerate(range(0, total, self.chunk_size))
+        ]
 
-            # Shipping and payment info
-            shipping_cost = np.random.normal(10, 3) if np.random.random() > 0.1 else 0  # 10% free shipping
-            shipping_cost = max(0, shipping_cost)
+    def generate_customers(self) -> pd.DataFrame:
+        """Generate customer data with demographics and acquisition info."""
+        print(f"🏃‍♂️ Generating {self.num_customers:,} customers...")
 
-            payment_method = np.random.choice(
-                ["Credit Card", "Debit Card", "PayPal", "Bank Transfer"],
-                p=[0.6, 0.25, 0.1, 0.05],
-            )
+        with _ShardRunner(self) as runner:
+            df = pd.concat(runner.map("_customers_shard", self.shards(self.num_customers)), ignore_index=True)
+        print(f"✅ Generated customers with segments: {df['customer_segment'].value_counts().to_dict()}")
+        return df
 
-            order = {
-                "order_id": order_id,
-                "customer_id": customer["customer_id"],
-                "order_date": order_date,
-                "status": status,
-                "payment_method": payment_method,
-                "shipping_cost": round(shipping_cost, 2),
-                "discount_amount": 0,  # Will calculate after items
-                "tax_amount": 0,  # Will calculate after items
-                "total_amount": 0,  # Will calculate after items
-            }
+    def _customers_shard(self, shard: int, start: int, stop: int) -> pd.DataFrame:
+        rng = self.shard_rng("customers", shard)
+        fake = self._faker(rng) if self.attributes == "faker" else None
+        size = stop - start
 
-            # Generate order items
-            segment = customer["customer_segment"]
-            behavior = segment_behavior[segment]
+        # Customer segment (affects spending behavior)
+        segment = _choice(rng, self.customer_segments, size, p=[0.3, 0.4, 0.25, 0.05])  # Realistic distribution
 
-            # Number of items (Poisson distribution around segment average)
-            num_items = max(1, np.random.poisson(behavior["items_per_order"]))
+        # Acquisition channel
+        channel = _choice(rng, self.acquisition_channels, size, p=[0.25, 0.2, 0.15, 0.15, 0.1, 0.08, 0.07])
 
-            order_total = 0
-            selected_products = products_df.sample(min(num_items, len(products_df)))
+        # Registration date (weighted towards recent)
+        days_back = rng.exponential(200, size)  # Exponential decay
+        days_back = np.minimum(days_back, (self.end_date - self.start_date).days).astype(np.int64)
+        registration_date = self.end_date - pd.to_timedelta(days_back, unit="D")
 
-            for _, product in selected_products.iterrows():
-                quantity = max(1, np.random.poisson(2))  # Most orders have 1-3 of each item
+        is_active = rng.random(size) < 0.85
 
-                # Price variations (promotions, dynamic pricing)
-                price_variation = np.random.normal(1.0, 0.1)  # ±10% price variation
-                unit_price = product["price"] * max(0.5, price_variation)  # Min 50% of base price
+        # Demographics
+        if self.attributes == "fast":
+            df = self._fast_demographics(rng, start, size)
+        else:
+            df = self._faker_demographics(fake, start, size)
 
-                item_total = quantity * unit_price
-                order_total += item_total
+        df["customer_segment"] = segment
+        df["acquisition_channel"] = channel
+        df["registration_date"] = registration_date
+        df["is_active"] = is_active
+        return df
 
-                order_item = {
-                    "order_id": order_id,
-                    "product_id": product["product_id"],
-                    "quantity": quantity,
-                    "unit_price": round(unit_price, 2),
-                    "total_price": round(item_total, 2),
-                }
-                order_items.append(order_item)
-
-            # Calculate order totals
-            discount_rate = 0
-            if order_total > 200:  # Discounts for larger orders
-                discount_rate = np.random.uniform(0.05, 0.15)
-            elif np.random.random() < 0.1:  # Random promotional discounts
-                discount_rate = np.random.uniform(0.1, 0.25)
-
-            discount_amount = order_total * discount_rate
-            subtotal = order_total - discount_amount
-            tax_rate = 0.08  # 8% tax rate
-            tax_amount = subtotal * tax_rate
-            total_amount = subtotal + tax_amount + shipping_cost
-
-            # Update order totals
-            order.update(
+    def _faker_demographics(self, fake: Faker, start: int, size: int) -> pd.DataFrame:
+        customers = []
+        for i in range(size):
+            profile = fake.profile()
+            customers.append(
                 {
-                    "discount_amount": round(discount_amount, 2),
-                    "tax_amount": round(tax_amount, 2),
-                    "total_amount": round(total_amount, 2),
+                    "customer_id": start + i + 1,
+                    "email": profile["mail"],
+                    "first_name": profile["name"].split()[0],
+                    "last_name": profile["name"].split()[-1],
+                    "birth_date": profile["birthdate"],
+                    "gender": profile["sex"],
+                    "address": profile["address"],
+                    "city": fake.city(),
+                    "country": fake.country(),
+                    "postal_code": fake.postcode(),
                 }
             )
+        return pd.DataFrame(customers)
+
+    def _fast_demographics(self, rng: np.random.Generator, start: int, size: int) -> pd.DataFrame:
+        customer_ids = np.arange(start + 1, start + size + 1)
+        first_name = self._draw(rng, "first_name", size)
+        last_name = self._draw(rng, "last_name", size)
+        city = self._draw(rng, "city", size)
+        postal_code = self._draw(rng, "postcode", size)
+
+        # Same age range as Faker profiles (0-115 years)
+        birth_days = rng.integers(0, 115 * 365, size)
+
+        return pd.DataFrame(
+            {
+                "customer_id": customer_ids,
+                "email": (
+                    pd.Series(first_name).str.lower()
+                    + "."
+                    + pd.Series(last_name).str.lower()
+                    + customer_ids.astype(str)
+                    + "@"
+                    + self._draw(rng, "email_domain", size)
+                ),
+                "first_name": first_name,
+                "last_name": last_name,
+                "birth_date": (self.end_date - pd.to_timedelta(birth_days, unit="D")).date,
+                "gender": _choice(rng, ["M", "F"], size),
+                "address": self._draw(rng, "street_address", size) + "\n" + city + ", " + postal_code,
+                "city": city,
+                "country": self._draw(rng, "country", size),
+                "postal_code": postal_code,
+            }
+        )
 
-            orders.append(order)
+    def generate_products(self) -> pd.DataFrame:
+        """Generate product catalog with categories, pricing, and inventory."""
+        print(f"📦 Generating {self.num_products:,} products...")
 
-        orders_df = pd.DataFrame(orders)
-        order_items_df = pd.DataFrame(order_items)
+        with _ShardRunner(self) as runner:
+            df = pd.concat(runner.map("_products_shard", self.shards(self.num_products)), ignore_index=True)
+        print(f"✅ Generated products across categories: {df['category'].value_counts().to_dict()}")
+        return df
+
+    def _products_shard(self, shard: int, start: int, stop: int) -> pd.DataFrame:
+        rng = self.shard_rng("products", shard)
+        fake = self._faker(rng) if self.attributes == "faker" else None
+        size = stop - start
+
+        category = _choice(rng, self.product_categories, size)
+
+        # Price based on category (some categories are more expensive)
+        category_price_multipliers = {
+            "Electronics": 3.0,
+            "Automotive": 2.5,
+            "Home & Garden": 1.8,
+            "Health & Beauty": 1.2,
+            "Clothing": 1.0,
+            "Sports": 1.5,
+            "Books": 0.4,
+            "Toys": 0.8,
+        }
+
+        base_price = rng.lognormal(3, 1, size)  # Log-normal for realistic price distribution
+        price = base_price * np.array([category_price_multipliers.get(c, 1.0) for c in category])
+
+        # Cost (margin varies by category)
+        margin_rate = rng.normal(0.4, 0.1, size)  # Average 40% margin
+        margin_rate = np.clip(margin_rate, 0.1, 0.8)  # Constrain between 10-80%
+        cost = price * (1 - margin_rate)
+
+        weight_kg = rng.lognormal(0, 1, size)
+        dimensions = (
+            rng.integers(5, 51, size).astype(str).astype(object)
+            + "x"
+            + rng.integers(5, 51, size).astype(str).astype(object)
+            + "x"
+            + rng.integers(2, 21, size).astype(str).astype(object)
+        )
+        launch_days = rng.integers(0, (self.end_date - self.start_date).days + 1, size)
+        is_active = rng.random(size) < 0.9
+
+        if self.attributes == "fast":
+            product_name = self._draw(rng, "word", size) + " " + self._draw(rng, "word", size)
+            subcategory = category + " - " + self._draw(rng, "word", size)
+            brand = self._draw(rng, "company", size)
+        else:
+            product_name, subcategory, brand = [], [], []
+            for c in category:
+                product_name.append(f"{fake.word().title()} {fake.word().title()}")
+                subcategory.append(f"{c} - {fake.word().title()}")
+                brand.append(fake.company())
+
+        df = pd.DataFrame(
+            {
+                "product_id": np.arange(start + 1, stop + 1),
+                "product_name": product_name,
+                "category": category,
+                "subcategory": subcategory,
+                "brand": brand,
+                "dimensions_cm": dimensions,
+            }
+        )
+        df.insert(5, "price", np.round(price, 2))
+        df.insert(6, "cost", np.round(cost, 2))
+        df.insert(7, "weight_kg", np.round(weight_kg, 2))
+        df["launch_date"] = (self.start_date + pd.to_timedelta(launch_days, unit="D")).date
+        df["is_active"] = is_active
+        return df
+
+    def generate_orders(
+        self, customers_df: pd.DataFrame, products_df: pd.DataFrame
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Generate orders and order items with realistic patterns."""
+        print(f"🛒 Generating {self.num_orders:,} orders with realistic patterns...")
+
+        inputs = {"_orders_shard": self._order_inputs(customers_df, products_df)}
+        with _ShardRunner(self, inputs) as runner:
+            shards = list(runner.map("_orders_shard", self.shards(self.num_orders)))
+        orders_df = pd.concat([orders for orders, _ in shards], ignore_index=True)
+        order_items_df = pd.concat([items for _, items in shards], ignore_index=True)
 
         print(f"✅ Generated {len(orders_df):,} orders and {len(order_items_df):,} order items")
         print(f"   Order statuses: {orders_df['status'].value_counts().to_dict()}")
@@ -294,70 +431,275 @@ class EcommerceDataGenerator:
 
         return orders_df, order_items_df
 
+    def _order_inputs(self, customers_df: pd.DataFrame, products_df: pd.DataFrame) -> dict:
+        """Customer and product arrays every order shard samples from."""
+        # Select customers weighted by segment activity
+        segments = customers_df["customer_segment"]
+        segment_weights = segments.map({s: b["order_frequency"] for s, b in self.segment_behavior.items()})
+        segment_weights = segment_weights.to_numpy(dtype=float)
+        items_per_order = segments.map({s: b["items_per_order"] for s, b in self.segment_behavior.items()})
+
+        return {
+            "customer_ids": customers_df["customer_id"].to_numpy(),
+            "customer_p": segment_weights / segment_weights.sum(),
+            "customer_items": items_per_order.to_numpy(dtype=float),
+            "product_ids": products_df["product_id"].to_numpy(),
+            "product_prices": products_df["price"].to_numpy(dtype=float),
+        }
+
+    def _orders_shard(
+        self,
+        shard: int,
+        start: int,
+        stop: int,
+        customer_ids: np.ndarray,
+        customer_p: np.ndarray,
+        customer_items: np.ndarray,
+        product_ids: np.ndarray,
+        product_prices: np.ndarray,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        rng = self.shard_rng("orders", shard)
+        size = stop - start
+        days_range = (self.end_date - self.start_date).days
+
+        # Order date (more recent orders more likely, seasonal patterns)
+        days_back = np.minimum(rng.exponential(30, size), days_range).astype(np.int64)
+        order_dates = self.end_date - pd.to_timedelta(days_back, unit="D")
+
+        # Add seasonality (higher sales in Nov-Dec, lower in Jan-Feb)
+        month_weights = np.array([0.7, 0.7, 0.9, 0.9, 1.0, 1.0, 0.8, 0.8, 1.1, 1.1, 1.4, 1.5])
+        keep = rng.random(size) <= month_weights[order_dates.month - 1] / 1.5  # Skip some orders
+
+        order_ids = np.arange(start + 1, stop + 1)[keep] + self.id_offsets["orders"]
+        order_dates = order_dates[keep]
+        num_orders = len(order_ids)
+
+        # Select customers (weighted by segment activity)
+        customer_idx = rng.choice(len(customer_ids), size=num_orders, p=customer_p)
+
+        # Order status (most orders completed)
+        status = _choice(
+            rng,
+            ["Completed", "Pending", "Cancelled", "Returned"],
+            size=num_orders,
+            p=[0.85, 0.05, 0.05, 0.05],
+        )
+
+        # Shipping and payment info
+        shipping_cost = np.where(
+            rng.random(num_orders) > 0.1,  # 10% free shipping
+            np.maximum(0, rng.normal(10, 3, num_orders)),
+            0.0,
+        )
+
+        payment_method = _choice(
+            rng,
+            ["Credit Card", "Debit Card", "PayPal", "Bank Transfer"],
+            size=num_orders,
+            p=[0.6, 0.25, 0.1, 0.05],
+        )
+
+        # Number of items (Poisson distribution around segment average)
+        num_items = np.maximum(1, rng.poisson(customer_items[customer_idx]))
+        num_items = np.minimum(num_items, len(product_ids))
+
+        # Generate order items (distinct products within each order)
+        item_order, product_idx = _sample_distinct(rng, num_items, len(product_ids))
+        num_order_items = len(item_order)
+
+        quantity = np.maximum(1, rng.poisson(2, num_order_items))  # Most orders have 1-3 of each item
+
+        # Price variations (promotions, dynamic pricing)
+        price_variation = np.maximum(0.5, rng.normal(1.0, 0.1, num_order_items))  # ±10%, min 50% of base price
+        unit_price = product_prices[product_idx] * price_variation
+        item_total = quantity * unit_price
+        order_total = np.bincount(item_order, weights=item_total, minlength=num_orders)
+
+        # Calculate order totals
+        discount_rate = np.where(
+            order_total > 200,  # Discounts for larger orders
+            rng.uniform(0.05, 0.15, num_orders),
+            np.where(
+                rng.random(num_orders) < 0.1,  # Random promotional discounts
+                rng.uniform(0.1, 0.25, num_orders),
+                0.0,
+            ),
+        )
+
+        discount_amount = order_total * discount_rate
+        subtotal = order_total - discount_amount
+        tax_rate = 0.08  # 8% tax rate
+        tax_amount = subtotal * tax_rate
+        total_amount = subtotal + tax_amount + shipping_cost
+
+        orders_df = pd.DataFrame(
+            {
+                "order_id": order_ids,
+                "customer_id": customer_ids[customer_idx],
+                "order_date": order_dates,
+                "status": status,
+                "payment_method": payment_method,
+                "shipping_cost": np.round(shipping_cost, 2),
+                "discount_amount": np.round(discount_amount, 2),
+                "tax_amount": np.round(tax_amount, 2),
+                "total_amount": np.round(total_amount, 2),
+            }
+        )
+        order_items_df = pd.DataFrame(
+            {
+                "order_id": order_ids[item_order],
+                "product_id": product_ids[product_idx],
+                "quantity": quantity,
+                "unit_price": np.round(unit_price, 2),
+                "total_price": np.round(item_total, 2),
+            }
+        )
+        return orders_df, order_items_df
+
     def generate_web_analytics(self, customers_df: pd.DataFrame, orders_df: pd.DataFrame) -> pd.DataFrame:
         """Generate web analytics data (sessions, page views, conversions)."""
         print("🌐 Generating web analytics data...")
 
-        sessions = []
-
         # Generate more sessions than orders (not every session converts)
         num_sessions = len(orders_df) * 5  # 20% conversion rate
 
-        for session_id in range(1, num_sessions + 1):
-            # Random or existing customer
-            if np.random.random() < 0.6:  # 60% are existing customers
-                customer_id = customers_df.sample(1)["customer_id"].iloc[0]
-            else:
-                customer_id = None  # Anonymous session
-
-            # Session timing (similar to order patterns)
-            days_back = np.random.exponential(20)
-            session_date = self.end_date - timedelta(days=int(days_back))
-
-            # Traffic sources
-            traffic_source = np.random.choice(
-                [
-                    "organic_search",
-                    "paid_search",
-                    "social",
-                    "email",
-                    "direct",
-                    "referral",
-                ],
-                p=[0.35, 0.25, 0.15, 0.1, 0.1, 0.05],
-            )
+        order_totals = orders_df["total_amount"].to_numpy(dtype=float)
+        shards = [(shard, start, stop, order_totals[start:stop]) for shard, start, stop in self.shards(num_sessions)]
 
-            # Device type
-            device_type = np.random.choice(["desktop", "mobile", "tablet"], p=[0.4, 0.5, 0.1])
+        inputs = {"_sessions_shard": {"customer_ids": customers_df["customer_id"].to_numpy(dtype=np.int64)}}
+        with _ShardRunner(self, inputs) as runner:
+            sessions_df = pd.concat(runner.map("_sessions_shard", shards), ignore_index=True)
+        print(f"✅ Generated {len(sessions_df):,} web sessions")
+        print(f"   Conversion rate: {sessions_df['converted'].mean()*100:.1f}%")
+        print(f"   Traffic sources: {sessions_df['traffic_source'].value_counts().to_dict()}")
+
+        return sessions_df
+
+    def _sessions_shard(
+        self, shard: int, start: int, stop: int, order_totals: np.ndarray, customer_ids: np.ndarray
+    ) -> pd.DataFrame:
+        """Sessions ``start + 1 .. stop``; ``order_totals`` holds the orders converted by the first of them."""
+        rng = self.shard_rng("web_sessions", shard)
+        size = stop - start
+        session_ids = np.arange(start + 1, stop + 1) + self.id_offsets["web_sessions"]
+
+        # Random or existing customer (60% are existing customers, the rest anonymous)
+        customer_id = pd.arrays.IntegerArray(
+            customer_ids[rng.integers(0, len(customer_ids), size)],
+            mask=rng.random(size) >= 0.6,
+        )
+
+        # Session timing (similar to order patterns)
+        days_back = np.minimum(rng.exponential(20, size), (self.end_date - self.start_date).days).astype(np.int64)
+        session_dates = self.end_date - pd.to_timedelta(days_back, unit="D")
+
+        # Traffic sources
+        traffic_source = _choice(
+            rng,
+            [
+                "organic_search",
+                "paid_search",
+                "social",
+                "email",
+                "direct",
+                "referral",
+            ],
+            size=size,
+            p=[0.35, 0.25, 0.15, 0.1, 0.1, 0.05],
+        )
+
+        # Device type
+        device_type = _choice(rng, ["desktop", "mobile", "tablet"], size=size, p=[0.4, 0.5, 0.1])
 
-            # Session metrics
-            session_duration = max(30, np.random.exponential(300))  # Seconds
-            page_views = max(1, np.random.poisson(3))
-            bounce_rate = 1 if page_views == 1 else 0
+        # Session metrics
+        session_duration = np.maximum(30, rng.exponential(300, size))  # Seconds
+        page_views = np.maximum(1, rng.poisson(3, size))
+        bounced = (page_views == 1).astype(np.int64)
 
-            # Conversion (did this session result in an order?)
-            converted = session_id <= len(orders_df)  # First N sessions converted
+        # Conversion (did this session result in an order?) - first N sessions converted
+        converted = np.arange(size) < len(order_totals)
+        revenue = np.zeros(size)
+        revenue[: len(order_totals)] = order_totals
 
-            session = {
-                "session_id": session_id,
+        return pd.DataFrame(
+            {
+                "session_id": session_ids,
                 "customer_id": customer_id,
-                "session_date": session_date,
+                "session_date": session_dates,
                 "traffic_source": traffic_source,
                 "device_type": device_type,
-                "session_duration_seconds": int(session_duration),
+                "session_duration_seconds": session_duration.astype(np.int64),
                 "page_views": page_views,
-                "bounced": bounce_rate,
+                "bounced": bounced,
                 "converted": converted,
-                "revenue": (orders_df.iloc[session_id - 1]["total_amount"] if converted else 0),
+                "revenue": revenue,
             }
-            sessions.append(session)
+        )
 
-        sessions_df = pd.DataFrame(sessions)
-        print(f"✅ Generated {len(sessions_df):,} web sessions")
-        print(f"   Conversion rate: {sessions_df['converted'].mean()*100:.1f}%")
-        print(f"   Traffic sources: {sessions_df['traffic_source'].value_counts().to_dict()}")
+    def iter_batches(
+        self, customers_df: Optional[pd.DataFrame] = None, products_df: Optional[pd.DataFrame] = None
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Stream ``(table, batch)`` pairs, one batch per shard, without materializing whole tables.
+
+        Batches of each table arrive in id order and match ``generate_all_data()``.
+        Only the customer and product columns that orders sample from are kept;
+        session shards are generated as soon as the order totals they convert
+        have been buffered. Passing existing customers (``customer_id``,
+        ``customer_segment``) and products (``product_id``, ``price``) skips
+        those tables and only generates orders, order items and sessions.
+        """
+        customers, products = [], []
+        with _ShardRunner(self) as runner:
+            if customers_df is None:
+                for batch in runner.map("_customers_shard", self.shards(self.num_customers)):
+                    customers.append(batch[["customer_id", "customer_segment"]])
+                    yield "customers", batch
+                customers_df = pd.concat(customers, ignore_index=True)
+            if products_df is None:
+                for batch in runner.map("_products_shard", self.shards(self.num_products)):
+                    products.append(batch[["product_id", "price"]])
+                    yield "products", batch
+                products_df = pd.concat(products, ignore_index=True)
+
+        inputs = {
+            "_orders_shard": self._order_inputs(customers_df, products_df),
+            "_sessions_shard": {"customer_ids": customers_df["customer_id"].to_numpy(dtype=np.int64)},
+        }
 
-        return sessions_df
+        with _ShardRunner(self, inputs) as runner:
+            sessions = deque()
+            buffered_totals = np.empty(0)
+            session_shard = 0
+            num_orders = 0
+
+            def submit_sessions(start: int, stop: int, order_totals: np.ndarray):
+                nonlocal session_shard
+                sessions.append(runner.submit("_sessions_shard", session_shard, start, stop, order_totals))
+                session_shard += 1
+
+            for orders, order_items in runner.map("_orders_shard", self.shards(self.num_orders)):
+                num_orders += len(orders)
+                yield "orders", orders
+                yield "order_items", order_items
+
+                # Sessions converted entirely by buffered orders can be generated now
+                buffered_totals = np.concatenate([buffered_totals, orders["total_amount"].to_numpy(dtype=float)])
+                while len(buffered_totals) >= self.chunk_size:
+                    start = session_shard * self.chunk_size
+                    submit_sessions(start, start + self.chunk_size, buffered_totals[: self.chunk_size])
+                    buffered_totals = buffered_totals[self.chunk_size :]
+                    if len(sessions) >= runner.window:
+                        yield "web_sessions", sessions.popleft().result()
+
+            # Generate more sessions than orders (not every session converts)
+            for shard, start, stop in self.shards(num_orders * 5)[session_shard:]:
+                submit_sessions(start, stop, buffered_totals[: stop - start])
+                buffered_totals = buffered_totals[stop - start :]
+                if len(sessions) >= runner.window:
+                    yield "web_sessions", sessions.popleft().result()
+
+            while sessions:
+                yield "web_sessions", sessions.popleft().result()
 
     def generate_all_data(self) -> Dict[str, pd.DataFrame]:
         """Generate all datasets and return as dictionary."""
@@ -366,6 +708,7 @@ class EcommerceDataGenerator:
             f"Parameters: {self.num_customers:,} customers, {self.num_products:,} products, {self.num_orders:,} orders"
         )
         print(f"Date range: {self.start_date.date()} to {self.end_date.date()}")
+        print(f"Sharding: {self.chunk_size:,} rows per shard, {self.workers} worker(s), seed {self.seed}")
         print("-" * 60)
 
         # Generate in order (dependencies)
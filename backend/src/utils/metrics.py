@@ -0,0 +1,97 @@
+"""
+Shared Business Metrics
+=======================
+
+Metric definitions used by both the REST API and the Streamlit dashboard, so
+the two always report the same numbers.
+
+``revenue_growth`` compares Completed revenue in a window of whole days with
+the equally long window immediately before it. Without ``date_from`` the
+window is the trailing 30 days ending at ``date_to`` (default: the last day
+with orders). Daily revenue is read from the ``revenue_rollup_day`` table
+maintained by ``summary_tables``, so the comparison costs two small range
+scans regardless of order volume; databases built without it fall back to
+raw orders.
+"""
+
+from datetime import date, timedelta
+from typing import Optional, Tuple, Union
+
+import duckdb
+
+DEFAULT_GROWTH_WINDOW_DAYS = 30
+
+# Daily revenue sources: the rollup table, or raw orders for databases built without it
+DAILY_REVENUE_ROLLUP = "revenue_rollup_day"
+DAILY_REVENUE_FROM_ORDERS = (
+    "(SELECT DATE_TRUNC('day', order_date) AS period, status, total_amount AS revenue FROM orders)"
+)
+
+DateLike = Union[str, date, None]
+
+
+def daily_revenue_source(conn: duckdb.DuckDBPyConnection) -> str:
+    """The daily revenue rollup if it has been built, else the equivalent query over raw orders."""
+    built = conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'main' AND table_name = ?",
+        [DAILY_REVENUE_ROLLUP],
+    ).fetchone()[0]
+    return DAILY_REVENUE_ROLLUP if built else DAILY_REVENUE_FROM_ORDERS
+
+
+def _as_day(value: DateLike) -> Optional[date]:
+    """Day of a date, datetime or ISO string (a time of day is ignored)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value if type(value) is date else value.date()
+
+
+def growth_windows(
+    conn: duckdb.DuckDBPyConnection,
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    source: Optional[str] = None,
+) -> Optional[Tuple[date, date, date]]:
+    """Return ``(previous_start, current_start, current_end)``, ends exclusive; None if there are no orders."""
+    source = source or daily_revenue_source(conn)
+    end = _as_day(date_to)
+    if end is None:
+        last = conn.execute(f"SELECT MAX(period) FROM {source}").fetchone()[0]
+        if last is None:
+            return None
+        end = _as_day(last)
+    start = _as_day(date_from) or end - timedelta(days=DEFAULT_GROWTH_WINDOW_DAYS - 1)
+    current_end = end + timedelta(days=1)
+    return start - (current_end - start), start, current_end
+
+
+def revenue_growth(
+    conn: duckdb.DuckDBPyConnection,
+    date_from: DateLike = None,
+    date_to: DateLike = None,
+    source: Optional[str] = None,
+) -> float:
+    """Percent change of Completed revenue versus the previous equivalent window (0 without a baseline).
+
+    ``source`` defaults to ``daily_revenue_source(conn)``.
+    """
+    source = source or daily_revenue_source(conn)
+    windows = growth_windows(conn, date_from, date_to, source)
+    if windows is None or windows[1] >= windows[2]:
+        return 0.0
+    previous_start, current_start, current_end = windows
+
+    current, previous = conn.execute(
+        f"""
+        SELECT
+            COALESCE(SUM(revenue) FILTER (WHERE period >= ?), 0) as current_revenue,
+            COALESCE(SUM(revenue) FILTER (WHERE period < ?), 0) as previous_revenue
+        FROM {source}
+        WHERE status = 'Completed' AND period >= ? AND period < ?
+    """,
+        [current_start, current_start, previous_start, current_end],
+    ).fetchone()
+
+    return float((current - previous) / previous * 100) if previous > 0 else 0.0
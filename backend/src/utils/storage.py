@@ -0,0 +1,163 @@
+"""
+Streaming Table Writers
+=======================
+
+Writers that append record batches to their destination as they are
+generated, so a dataset never has to be held in memory as complete
+DataFrames. Used with ``EcommerceDataGenerator.iter_batches()``.
+
+Parquet output is zstd-compressed, one file per batch, with the large fact
+tables split into hive-style monthly partitions::
+
+    parquet/customers/part-00000.parquet
+    parquet/orders/month=2024-11/part-00000_0.parquet
+
+With ``append=True`` the writers extend existing tables and files instead
+of replacing them (see ``01_data_generation.py --append``).
+
+``cluster_by_time`` rewrites the fact tables in timestamp order once they
+are loaded, so DuckDB's per-row-group min/max statistics (zone maps) let
+date-range and keyset-paginated scans skip everything outside the range.
+Appends add later dates after the existing rows and keep that property.
+"""
+
+import shutil
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import duckdb
+import pandas as pd
+
+# Fact tables split into monthly Parquet partitions: table -> (timestamp column, id restoring row order)
+MONTHLY_PARTITIONS = {"orders": ("order_date", "order_id"), "web_sessions": ("session_date", "session_id")}
+
+
+class DuckDBTableWriter:
+    """Append batches into DuckDB tables, replacing each table on its first batch unless appending."""
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection, append: bool = False):
+        self.conn = conn
+        self.append = append
+        self.rows = Counter()
+
+    def write(self, table: str, batch: pd.DataFrame):
+        self.conn.register("incoming_batch", batch)
+        try:
+            if self.append or table in self.rows:
+                self.conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM incoming_batch")
+            else:
+                self.conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM incoming_batch")
+        finally:
+            self.conn.unregister("incoming_batch")
+        self.rows[table] += len(batch)
+
+
+class CsvTableWriter:
+    """Append batches to ``<directory>/<table>.csv``, writing the header with the first batch."""
+
+    def __init__(self, directory: Path, append: bool = False):
+        self.directory = Path(directory)
+        self.append = append
+        self.rows = Counter()
+
+    def path(self, table: str) -> Path:
+        return self.directory / f"{table}.csv"
+
+    def write(self, table: str, batch: pd.DataFrame):
+        path = self.path(table)
+        if table in self.rows or (self.append and path.exists()):
+            batch.to_csv(path, mode="a", header=False, index=False)
+        else:
+            batch.to_csv(path, mode="w", header=True, index=False)
+        self.rows[table] += len(batch)
+
+
+class ParquetTableWriter:
+    """Write each batch as zstd Parquet under ``<directory>/<table>/``, fact tables partitioned by month."""
+
+    def __init__(self, directory: Path, append: bool = False):
+        self.directory = Path(directory)
+        self.append = append
+        self.rows = Counter()
+        self.batches = Counter()
+        self.conn = duckdb.connect()
+        # Appended files sort after those of earlier runs
+        self.prefix = f"part-r{datetime.now():%Y%m%d%H%M%S}-" if append else "part-"
+
+    def path(self, table: str) -> Path:
+        return self.directory / table
+
+    def write(self, table: str, batch: pd.DataFrame):
+        table_dir = self.path(table)
+        if table not in self.rows:
+            if not self.append:
+                # Drop files left by a previous run so they are not read back
+                shutil.rmtree(table_dir, ignore_errors=True)
+            table_dir.mkdir(parents=True, exist_ok=True)
+
+        part = f"{self.prefix}{self.batches[table]:05d}"
+        self.conn.register("incoming_batch", batch)
+        try:
+            if table in MONTHLY_PARTITIONS:
+                date_column, _ = MONTHLY_PARTITIONS[table]
+                self.conn.execute(
+                    f"""
+                    COPY (SELECT *, strftime({date_column}, '%Y-%m') AS month FROM incoming_batch)
+                    TO '{table_dir}'
+                    (FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (month), OVERWRITE_OR_IGNORE,
+                     FILENAME_PATTERN '{part}_{{i}}')
+                """
+                )
+            else:
+                self.conn.execute(
+                    f"COPY incoming_batch TO '{table_dir / part}.parquet' (FORMAT PARQUET, COMPRESSION ZSTD)"
+                )
+        finally:
+            self.conn.unregister("incoming_batch")
+        self.rows[table] += len(batch)
+        self.batches[table] += 1
+
+
+def parquet_source(directory: Path, table: str) -> str:
+    """SQL table expression reading one table written by ``ParquetTableWriter``."""
+    if table in MONTHLY_PARTITIONS:
+        return (
+            f"(SELECT * EXCLUDE (month) FROM read_parquet('{Path(directory) / table}/*/*.parquet', "
+            f"hive_partitioning = true))"
+        )
+    return f"read_parquet('{Path(directory) / table}/*.parquet')"
+
+
+def load_parquet_tables(conn: duckdb.DuckDBPyConnection, directory: Path, tables: Iterable[str]) -> Dict[str, int]:
+    """Create DuckDB tables from Parquet written by ``ParquetTableWriter``; returns rows per table.
+
+    Monthly partitions are read back month by month, so partitioned tables
+    are re-sorted by their id to keep the generated row order.
+    """
+    rows = {}
+    for table in tables:
+        order = f" ORDER BY {MONTHLY_PARTITIONS[table][1]}" if table in MONTHLY_PARTITIONS else ""
+        conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {parquet_source(directory, table)}{order}")
+        rows[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return rows
+
+
+def cluster_by_time(conn: duckdb.DuckDBPyConnection, tables: Iterable[str] = tuple(MONTHLY_PARTITIONS)):
+    """Rewrite fact tables sorted by (timestamp, id)."""
+    for table in tables:
+        date_column, id_column = MONTHLY_PARTITIONS[table]
+        conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM {table} ORDER BY {date_column}, {id_column}")
+
+
+def write_batches(batches: Iterable[Tuple[str, pd.DataFrame]], writers: list) -> Dict[str, int]:
+    """Send every non-empty ``(table, batch)`` to all writers; returns rows written per table."""
+    rows = Counter()
+    for table, batch in batches:
+        if batch.empty:
+            continue
+        for writer in writers:
+            writer.write(table, batch)
+        rows[table] += len(batch)
+    return dict(rows)
@@ -0,0 +1,653 @@
+"""
+Materialized Summary Tables
+===========================
+
+Maintains ``monthly_revenue``, ``customer_ltv`` and ``product_performance`` as
+physical tables instead of views, so readers (the API, the dashboard and the
+analysis scripts) scan a few thousand pre-aggregated rows instead of
+re-joining the full fact tables on every query.
+
+It also maintains the revenue rollups ``revenue_rollup_day``, ``_week``,
+``_month`` and ``_quarter``: orders, revenue and distinct customers per period,
+customer segment, status and payment method. Revenue and orders add up across
+rows and grains; ``customers`` is only exact for its own row.
+
+The dashboard's segment and category filters read ``category_rollup_month``
+(item revenue per month, segment, category and status),
+``product_segment_performance``, ``session_rollup_day`` and
+``customer_categories``, the set of categories each customer has bought
+from, sorted by category so a category filter only scans its own rows.
+
+``customer_rfm`` holds each purchasing customer's recency, frequency and
+monetary values, their 1-5 scores and RFM segment. A full build fixes a
+reference date (the day of the latest order) and the quintile cutoffs of the
+three values in ``customer_rfm_boundaries`` under a new build version;
+customers are then scored by counting the cutoffs below their values instead
+of sorting everyone with ``NTILE``. An incremental refresh moves the
+reference date to the latest order day, which shifts every stored recency by
+the same number of days, and rescores only the customers with new orders (or
+newly past the tenure minimum) in full, all against the cached cutoffs, so
+scores stay comparable within a build version until the next full refresh.
+``customer_rfm_history`` keeps the RFM segment sizes as of every month end,
+each scored against its own cutoffs, so trends read one row per month and
+segment.
+
+Cohorts are customers grouped by the week or month of their first completed
+order (``customer_cohorts``). ``cohort_activity_week`` and
+``cohort_activity_month`` hold one row per cohort and period with the
+cohort's active customers, orders and revenue in that period, so a retention
+matrix of any horizon is a scan of a few thousand rows.
+
+``customer_sketch_day`` and ``customer_sketch_month`` hold HyperLogLog
+registers of the customers ordering in each period. Sketches of any set of
+periods merge into the distinct-customer estimate of their union, so the
+number of customers in a date range is read from a few thousand registers
+instead of a ``COUNT(DISTINCT)`` over its orders.
+
+Every refresh is recorded in ``summary_metadata`` together with the highest
+``order_id`` it covers. An incremental refresh only recomputes the keys
+touched by orders above that watermark (new months, customers and products),
+which is exact for appended orders. Edits to existing orders need a full
+refresh.
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import duckdb
+
+METADATA_TABLE = "summary_metadata"
+RFM_BOUNDARIES_TABLE = "customer_rfm_boundaries"
+
+RFM_QUANTILES = [0.2, 0.4, 0.6, 0.8]
+# Customers need this much history before the reference date to be scored
+RFM_MIN_TENURE_DAYS = 30
+
+SUMMARY_TABLES = {
+    "monthly_revenue": {
+        "key": "month",
+        "sql": """
+            SELECT
+                DATE_TRUNC('month', order_date) as month,
+                COUNT(*) as order_count,
+                SUM(total_amount) as revenue,
+                AVG(total_amount) as avg_order_value
+            FROM orders
+            WHERE status = 'Completed' {key_filter}
+            GROUP BY DATE_TRUNC('month', order_date)
+            ORDER BY month
+        """,
+        "key_filter": "AND DATE_TRUNC('month', order_date) IN (SELECT * FROM affected_keys)",
+        # Keys touched by orders above the watermark
+        "affected": """
+            SELECT DISTINCT DATE_TRUNC('month', order_date) FROM orders WHERE order_id > ?
+        """,
+    },
+    "customer_ltv": {
+        "key": "customer_id",
+        "sql": """
+            SELECT
+                c.customer_id,
+                c.customer_segment,
+                c.acquisition_channel,
+                COUNT(o.order_id) as total_orders,
+                SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as lifetime_value,
+                AVG(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE NULL END) as avg_order_value,
+                MIN(o.order_date) as first_order_date,
+                MAX(o.order_date) as last_order_date
+            FROM customers c
+            LEFT JOIN orders o ON c.customer_id = o.customer_id
+            {key_filter}
+            GROUP BY c.customer_id, c.customer_segment, c.acquisition_channel
+        """,
+        "key_filter": "WHERE c.customer_id IN (SELECT * FROM affected_keys)",
+        "affected": """
+            SELECT DISTINCT customer_id FROM orders WHERE order_id > ?
+            UNION
+            SELECT customer_id FROM customers WHERE customer_id NOT IN (SELECT customer_id FROM customer_ltv)
+        """,
+    },
+    "product_performance": {
+        "key": "product_id",
+        "sql": """
+            SELECT
+                p.product_id,
+                p.product_name,
+                p.category,
+                p.price,
+                COUNT(oi.order_id) as times_ordered,
+                SUM(oi.quantity) as total_quantity_sold,
+                SUM(oi.total_price) as total_revenue,
+                AVG(oi.unit_price) as avg_selling_price,
+                (AVG(oi.unit_price) - p.cost) as avg_profit_per_unit
+            FROM products p
+            LEFT JOIN order_items oi ON p.product_id = oi.product_id
+            {key_filter}
+            GROUP BY p.product_id, p.product_name, p.category, p.price, p.cost
+        """,
+        "key_filter": "WHERE p.product_id IN (SELECT * FROM affected_keys)",
+        "affected": """
+            SELECT DISTINCT product_id FROM order_items WHERE order_id > ?
+            UNION
+            SELECT product_id FROM products WHERE product_id NOT IN (SELECT product_id FROM product_performance)
+        """,
+    },
+}
+
+ROLLUP_GRAINS = ("day", "week", "month", "quarter")
+
+
+def _rollup_spec(grain: str) -> dict:
+    return {
+        "key": "period",
+        "sql": f"""
+            SELECT
+                DATE_TRUNC('{grain}', o.order_date) as period,
+                c.customer_segment,
+                o.status,
+                o.payment_method,
+                COUNT(*) as orders,
+                SUM(o.total_amount) as revenue,
+                COUNT(DISTINCT o.customer_id) as customers
+            FROM orders o
+            LEFT JOIN customers c ON o.customer_id = c.customer_id
+            {{key_filter}}
+            GROUP BY ALL
+            ORDER BY ALL
+        """,
+        "key_filter": f"WHERE DATE_TRUNC('{grain}', o.order_date) IN (SELECT * FROM affected_keys)",
+        "affected": f"SELECT DISTINCT DATE_TRUNC('{grain}', order_date) FROM orders WHERE order_id > ?",
+    }
+
+
+SUMMARY_TABLES.update({f"revenue_rollup_{grain}": _rollup_spec(grain) for grain in ROLLUP_GRAINS})
+
+SUMMARY_TABLES.update(
+    {
+        "category_rollup_month": {
+            "key": "month",
+            "sql": """
+                SELECT
+                    DATE_TRUNC('month', o.order_date) as month,
+                    c.customer_segment,
+                    p.category,
+                    o.status,
+                    COUNT(DISTINCT o.order_id) as orders,
+                    SUM(oi.quantity) as units,
+                    SUM(oi.total_price) as revenue
+                FROM order_items oi
+                JOIN orders o ON oi.order_id = o.order_id
+                JOIN products p ON oi.product_id = p.product_id
+                LEFT JOIN customers c ON o.customer_id = c.customer_id
+                {key_filter}
+                GROUP BY ALL
+                ORDER BY ALL
+            """,
+            "key_filter": "WHERE DATE_TRUNC('month', o.order_date) IN (SELECT * FROM affected_keys)",
+            "affected": """
+                SELECT DISTINCT DATE_TRUNC('month', order_date) FROM orders WHERE order_id > ?
+            """,
+        },
+        "product_segment_performance": {
+            "key": "product_id",
+            "sql": """
+                SELECT
+                    oi.product_id,
+                    c.customer_segment,
+                    COUNT(oi.order_id) as times_ordered,
+                    SUM(oi.quantity) as total_quantity_sold,
+                    SUM(oi.total_price) as total_revenue,
+                    SUM(oi.unit_price) as unit_price_sum
+                FROM order_items oi
+                JOIN orders o ON oi.order_id = o.order_id
+                LEFT JOIN customers c ON o.customer_id = c.customer_id
+                {key_filter}
+                GROUP BY ALL
+                ORDER BY ALL
+            """,
+            "key_filter": "WHERE oi.product_id IN (SELECT * FROM affected_keys)",
+            "affected": """
+                SELECT DISTINCT product_id FROM order_items WHERE order_id > ?
+            """,
+        },
+        "customer_categories": {
+            "key": "customer_id",
+            "sql": """
+                SELECT DISTINCT o.customer_id, p.category
+                FROM order_items oi
+                JOIN orders o ON oi.order_id = o.order_id
+                JOIN products p ON oi.product_id = p.product_id
+                {key_filter}
+                ORDER BY p.category, o.customer_id
+            """,
+            "key_filter": "WHERE o.customer_id IN (SELECT * FROM affected_keys)",
+            "affected": """
+                SELECT DISTINCT customer_id FROM orders WHERE order_id > ?
+            """,
+        },
+        "session_rollup_day": {
+            "key": "day",
+            # Sums are stored as BIGINT: scanning HUGEINT columns is ~100x slower
+            "sql": """
+                SELECT
+                    DATE_TRUNC('day', s.session_date) as day,
+                    c.customer_segment,
+                    s.traffic_source,
+                    s.device_type,
+                    COUNT(*) as sessions,
+                    CAST(SUM(CAST(s.converted AS INTEGER)) AS BIGINT) as conversions,
+                    SUM(s.revenue) as revenue,
+                    CAST(SUM(s.session_duration_seconds) AS BIGINT) as duration_seconds,
+                    CAST(SUM(s.page_views) AS BIGINT) as page_views,
+                    CAST(SUM(CAST(s.bounced AS INTEGER)) AS BIGINT) as bounces
+                FROM web_sessions s
+                LEFT JOIN customers c ON s.customer_id = c.customer_id
+                {key_filter}
+                GROUP BY ALL
+                ORDER BY ALL
+            """,
+            "key_filter": "WHERE DATE_TRUNC('day', s.session_date) IN (SELECT * FROM affected_keys)",
+            # Appended sessions are dated after the last order covered by the watermark
+            "affected": """
+                SELECT DISTINCT DATE_TRUNC('day', session_date) FROM web_sessions
+                WHERE DATE_TRUNC('day', session_date) > (
+                    SELECT MAX(DATE_TRUNC('day', order_date)) FROM orders WHERE order_id <= ?
+                )
+            """,
+        },
+    }
+)
+
+
+RFM_SEGMENT = """
+    CASE
+        WHEN r_score >= 4 AND f_score >= 4 THEN 'Champions'
+        WHEN r_score >= 3 AND f_score >= 3 THEN 'Loyal Customers'
+        WHEN r_score >= 3 AND f_score >= 2 THEN 'Potential Loyalists'
+        WHEN r_score >= 4 AND f_score <= 2 THEN 'New Customers'
+        WHEN r_score >= 2 AND f_score >= 3 THEN 'At Risk'
+        WHEN r_score <= 2 AND f_score >= 4 THEN 'Cannot Lose Them'
+        WHEN r_score <= 2 AND f_score <= 2 THEN 'Hibernating'
+        ELSE 'Others'
+    END
+"""
+
+
+def _rfm_metrics(snapshots: str, key_filter: str = "") -> str:
+    """Recency, frequency and monetary value per purchasing customer for each ``as_of`` date of ``snapshots``.
+
+    Only orders up to the end of the ``as_of`` day count.
+    """
+    return f"""
+        SELECT
+            s.as_of,
+            c.customer_id,
+            c.customer_segment,
+            DATE_DIFF('day', MAX(o.order_date), s.as_of) as recency,
+            COUNT(o.order_id) as frequency,
+            SUM(CASE WHEN o.status = 'Completed' THEN o.total_amount ELSE 0 END) as monetary
+        FROM ({snapshots}) s
+        JOIN orders o ON o.order_date < s.as_of + INTERVAL 1 DAY
+        JOIN customers c ON o.customer_id = c.customer_id
+        WHERE c.registration_date <= s.as_of - INTERVAL {RFM_MIN_TENURE_DAYS} DAY {key_filter}
+        GROUP BY s.as_of, c.customer_id, c.customer_segment
+        HAVING monetary > 0
+    """
+
+
+# Quintile cutoffs per as_of over a ``metrics`` relation
+_RFM_CUTOFFS = f"""
+    SELECT
+        as_of,
+        quantile_disc(recency, {RFM_QUANTILES}) as recency_cutoffs,
+        quantile_disc(frequency, {RFM_QUANTILES}) as frequency_cutoffs,
+        quantile_disc(monetary, {RFM_QUANTILES}) as monetary_cutoffs
+    FROM metrics
+    GROUP BY as_of
+"""
+
+# ``metrics`` scored against the ``cutoffs`` of the same as_of
+_RFM_SCORES = """
+    SELECT
+        m.*,
+        5 - len(list_filter(b.recency_cutoffs, lambda x: x < m.recency)) as r_score,
+        1 + len(list_filter(b.frequency_cutoffs, lambda x: x < m.frequency)) as f_score,
+        1 + len(list_filter(b.monetary_cutoffs, lambda x: x < m.monetary)) as m_score,
+        b.* EXCLUDE (as_of, recency_cutoffs, frequency_cutoffs, monetary_cutoffs)
+    FROM metrics m
+    JOIN cutoffs b ON m.as_of = b.as_of
+"""
+
+
+def rfm_segments_sql(snapshots: str) -> str:
+    """Size and averages of each RFM segment for every ``as_of`` date of ``snapshots``.
+
+    ``snapshots`` is a query with an ``as_of`` DATE column; every snapshot is
+    scored against its own quintile cutoffs.
+    """
+    return f"""
+        WITH metrics AS ({_rfm_metrics(snapshots)}),
+        cutoffs AS ({_RFM_CUTOFFS}),
+        scores AS ({_RFM_SCORES})
+        SELECT
+            as_of,
+            {RFM_SEGMENT} as rfm_segment,
+            COUNT(*) as customers,
+            ROUND(AVG(recency), 1) as avg_recency_days,
+            ROUND(AVG(frequency), 1) as avg_frequency,
+            ROUND(AVG(monetary), 2) as avg_monetary
+        FROM scores
+        GROUP BY ALL
+        ORDER BY as_of, avg_monetary DESC
+    """
+
+
+def _build_rfm_boundaries(conn: duckdb.DuckDBPyConnection):
+    """Fix a new reference date and quintile cutoffs under the next build version."""
+    version = 1
+    if _object_type(conn, RFM_BOUNDARIES_TABLE) is not None:
+        version += conn.execute(f"SELECT COALESCE(MAX(build_version), 0) FROM {RFM_BOUNDARIES_TABLE}").fetchone()[0]
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {RFM_BOUNDARIES_TABLE} AS
+        WITH metrics AS ({_rfm_metrics("SELECT CAST(MAX(order_date) AS DATE) as as_of FROM orders")}),
+        cutoffs AS ({_RFM_CUTOFFS})
+        SELECT
+            CAST(? AS INTEGER) as build_version,
+            as_of as reference_date,
+            now()::TIMESTAMP as built_at,
+            recency_cutoffs,
+            frequency_cutoffs,
+            monetary_cutoffs
+        FROM cutoffs
+    """,
+        [version],
+    )
+
+
+def _advance_rfm_reference(conn: duckdb.DuckDBPyConnection):
+    """Move the build's reference date to the latest order day, rescoring every customer's recency."""
+    days = conn.execute(
+        f"""
+        SELECT DATE_DIFF('day', reference_date, (SELECT CAST(MAX(order_date) AS DATE) FROM orders))
+        FROM {RFM_BOUNDARIES_TABLE}
+    """
+    ).fetchone()[0]
+    if not days or days <= 0:
+        return
+
+    conn.execute(f"UPDATE {RFM_BOUNDARIES_TABLE} SET reference_date = reference_date + CAST(? AS INTEGER)", [days])
+    conn.execute(
+        f"""
+        UPDATE customer_rfm
+        SET recency = recency + ?,
+            reference_date = b.reference_date,
+            r_score = 5 - len(list_filter(b.recency_cutoffs, lambda x: x < customer_rfm.recency + ?))
+        FROM {RFM_BOUNDARIES_TABLE} b
+    """,
+        [days, days],
+    )
+    conn.execute(f"UPDATE customer_rfm SET rfm_segment = {RFM_SEGMENT}")
+
+
+SUMMARY_TABLES["customer_rfm"] = {
+    "key": "customer_id",
+    "sql": f"""
+        WITH metrics AS (
+            {_rfm_metrics(f"SELECT reference_date as as_of FROM {RFM_BOUNDARIES_TABLE}", "{key_filter}")}
+        ),
+        cutoffs AS (SELECT reference_date as as_of, * EXCLUDE (reference_date) FROM {RFM_BOUNDARIES_TABLE}),
+        scores AS ({_RFM_SCORES})
+        SELECT
+            customer_id,
+            customer_segment,
+            recency,
+            frequency,
+            monetary,
+            r_score,
+            f_score,
+            m_score,
+            {RFM_SEGMENT} as rfm_segment,
+            as_of as reference_date,
+            build_version
+        FROM scores
+        ORDER BY customer_id
+    """,
+    "key_filter": "AND c.customer_id IN (SELECT * FROM affected_keys)",
+    # Customers with new orders, and buyers the advanced reference date brings past the tenure minimum
+    "affected": f"""
+        SELECT DISTINCT customer_id FROM orders WHERE order_id > ?
+        UNION
+        SELECT DISTINCT o.customer_id
+        FROM orders o
+        JOIN customers c ON o.customer_id = c.customer_id
+        WHERE o.status = 'Completed'
+          AND c.registration_date
+              <= (SELECT reference_date FROM {RFM_BOUNDARIES_TABLE}) - INTERVAL {RFM_MIN_TENURE_DAYS} DAY
+          AND o.customer_id NOT IN (SELECT customer_id FROM customer_rfm)
+    """,
+    # Full builds re-derive the cutoffs first; incremental refreshes reuse them at the latest order day
+    "prepare": _build_rfm_boundaries,
+    "prepare_incremental": _advance_rfm_reference,
+}
+
+# Month-end RFM snapshots for trends; new orders change the snapshots from their month onwards
+SUMMARY_TABLES["customer_rfm_history"] = {
+    "key": "as_of",
+    "sql": rfm_segments_sql("SELECT DISTINCT LAST_DAY(order_date) as as_of FROM orders {key_filter}"),
+    "key_filter": "WHERE LAST_DAY(order_date) IN (SELECT * FROM affected_keys)",
+    "affected": """
+        SELECT DISTINCT LAST_DAY(order_date) FROM orders
+        WHERE order_date >= (SELECT MIN(DATE_TRUNC('month', order_date)) FROM orders WHERE order_id > ?)
+    """,
+}
+
+
+COHORT_GRAINS = ("week", "month")
+
+
+def cohort_table(grain: str) -> str:
+    return f"cohort_activity_{grain}"
+
+
+SUMMARY_TABLES["customer_cohorts"] = {
+    "key": "customer_id",
+    "sql": """
+        SELECT customer_id, MIN(order_date) as first_order_date
+        FROM orders
+        WHERE status = 'Completed' {key_filter}
+        GROUP BY customer_id
+        ORDER BY customer_id
+    """,
+    "key_filter": "AND customer_id IN (SELECT * FROM affected_keys)",
+    "affected": """
+        SELECT DISTINCT customer_id FROM orders WHERE order_id > ? AND status = 'Completed'
+    """,
+}
+
+
+def _cohort_spec(grain: str) -> dict:
+    # Reads customer_cohorts, which is refreshed first
+    return {
+        "key": "period",
+        "sql": f"""
+            SELECT
+                DATE_TRUNC('{grain}', c.first_order_date) as cohort,
+                DATE_TRUNC('{grain}', o.order_date) as period,
+                COUNT(DISTINCT o.customer_id) as customers,
+                COUNT(*) as orders,
+                ROUND(SUM(o.total_amount), 2) as revenue
+            FROM orders o
+            JOIN customer_cohorts c ON o.customer_id = c.customer_id
+            WHERE o.status = 'Completed' {{key_filter}}
+            GROUP BY ALL
+            ORDER BY ALL
+        """,
+        "key_filter": f"AND DATE_TRUNC('{grain}', o.order_date) IN (SELECT * FROM affected_keys)",
+        "affected": f"""
+            SELECT DISTINCT DATE_TRUNC('{grain}', order_date) FROM orders WHERE order_id > ? AND status = 'Completed'
+        """,
+    }
+
+
+SUMMARY_TABLES.update({cohort_table(grain): _cohort_spec(grain) for grain in COHORT_GRAINS})
+
+
+# HyperLogLog sketches of customer_id: 2**HLL_PRECISION registers, ~1.04 / sqrt(2**HLL_PRECISION) relative error
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+SKETCH_GRAINS = ("day", "month")
+
+
+def sketch_table(grain: str) -> str:
+    return f"customer_sketch_{grain}"
+
+
+def hll_registers_sql(period: str, orders_filter: str = "") -> str:
+    """HyperLogLog registers ``(period, bucket, rank)`` of the customers of the filtered orders.
+
+    The low ``HLL_PRECISION`` bits of the hash pick the bucket; the rank is
+    one plus the number of trailing zeros of the remaining bits. Registers
+    of any set of periods merge by taking the highest rank per bucket.
+    """
+    width = 64 - HLL_PRECISION
+    return f"""
+        SELECT
+            period,
+            CAST(h & {HLL_REGISTERS - 1} AS USMALLINT) as bucket,
+            CAST(MAX(CASE WHEN h >> {HLL_PRECISION} = 0 THEN {width + 1}
+                          ELSE bit_count(xor(h >> {HLL_PRECISION}, (h >> {HLL_PRECISION}) - 1))
+                      END) AS UTINYINT) as rank
+        FROM (SELECT {period} as period, hash(customer_id) as h FROM orders {orders_filter})
+        GROUP BY ALL
+    """
+
+
+def _sketch_spec(grain: str) -> dict:
+    return {
+        "key": "period",
+        "sql": f"""
+            {hll_registers_sql(f"DATE_TRUNC('{grain}', order_date)", "{key_filter}")}
+            ORDER BY period, bucket
+        """,
+        "key_filter": f"WHERE DATE_TRUNC('{grain}', order_date) IN (SELECT * FROM affected_keys)",
+        "affected": f"SELECT DISTINCT DATE_TRUNC('{grain}', order_date) FROM orders WHERE order_id > ?",
+    }
+
+
+SUMMARY_TABLES.update({sketch_table(grain): _sketch_spec(grain) for grain in SKETCH_GRAINS})
+
+
+def summary_sql(name: str, incremental: bool = False) -> str:
+    """SELECT statement defining a summary table, optionally restricted to ``affected_keys``."""
+    spec = SUMMARY_TABLES[name]
+    return spec["sql"].format(key_filter=spec["key_filter"] if incremental else "")
+
+
+def summary_source(conn: duckdb.DuckDBPyConnection, name: str) -> str:
+    """FROM clause source for a summary: the table if it exists, else its defining query over the raw tables."""
+    return name if _object_type(conn, name) is not None else f"({summary_sql(name)})"
+
+
+def _ensure_metadata_table(conn: duckdb.DuckDBPyConnection):
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (
+            table_name VARCHAR PRIMARY KEY,
+            built_at TIMESTAMP,
+            refresh_mode VARCHAR,
+            order_watermark BIGINT,
+            row_count BIGINT,
+            build_seconds DOUBLE
+        )
+    """
+    )
+
+
+def _object_type(conn: duckdb.DuckDBPyConnection, name: str) -> Optional[str]:
+    """Return 'table', 'view' or None for an object in the main schema."""
+    row = conn.execute(
+        """
+        SELECT table_type FROM information_schema.tables
+        WHERE table_schema = 'main' AND table_name = ?
+    """,
+        [name],
+    ).fetchone()
+    if row is None:
+        return None
+    return "view" if row[0] == "VIEW" else "table"
+
+
+def get_watermark(conn: duckdb.DuckDBPyConnection, name: str) -> Optional[int]:
+    """Highest order_id covered by the last refresh of ``name``."""
+    if _object_type(conn, METADATA_TABLE) is None:
+        return None
+    row = conn.execute(f"SELECT order_watermark FROM {METADATA_TABLE} WHERE table_name = ?", [name]).fetchone()
+    return row[0] if row else None
+
+
+def _record_build(conn, name: str, mode: str, watermark: int, seconds: float):
+    row_count = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    conn.execute(
+        f"INSERT OR REPLACE INTO {METADATA_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+        [name, datetime.now(), mode, watermark, row_count, seconds],
+    )
+    return {"mode": mode, "rows": row_count, "order_watermark": watermark, "seconds": round(seconds, 3)}
+
+
+def _refresh_full(conn: duckdb.DuckDBPyConnection, name: str):
+    if _object_type(conn, name) == "view":
+        conn.execute(f"DROP VIEW {name}")
+    if "prepare" in SUMMARY_TABLES[name]:
+        SUMMARY_TABLES[name]["prepare"](conn)
+    conn.execute(f"CREATE OR REPLACE TABLE {name} AS {summary_sql(name)}")
+
+
+def _refresh_incremental(conn: duckdb.DuckDBPyConnection, name: str, watermark: int) -> int:
+    """Recompute only the keys affected since ``watermark``; returns the number of keys."""
+    spec = SUMMARY_TABLES[name]
+    key = spec["key"]
+    if "prepare_incremental" in spec:
+        spec["prepare_incremental"](conn)
+    conn.execute(f"CREATE OR REPLACE TEMP TABLE affected_keys AS {spec['affected']}", [watermark])
+    conn.execute(f"DELETE FROM {name} WHERE {key} IN (SELECT * FROM affected_keys)")
+    conn.execute(f"INSERT INTO {name} {summary_sql(name, incremental=True)}")
+    affected = conn.execute("SELECT COUNT(*) FROM affected_keys").fetchone()[0]
+    conn.execute("DROP TABLE affected_keys")
+    return affected
+
+
+def refresh_summaries(
+    conn: duckdb.DuckDBPyConnection, mode: str = "full", tables: Optional[Iterable[str]] = None
+) -> Dict[str, dict]:
+    """Rebuild (``full``) or update (``incremental``) the summary tables.
+
+    An incremental refresh of a table that has never been materialized falls
+    back to a full build. Returns per-table build statistics.
+    """
+    if mode not in ("full", "incremental"):
+        raise ValueError(f"Unknown refresh mode: {mode}")
+
+    names = list(tables) if tables else list(SUMMARY_TABLES)
+    unknown = set(names) - set(SUMMARY_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown summary tables: {', '.join(sorted(unknown))}")
+
+    _ensure_metadata_table(conn)
+    current_watermark = conn.execute("SELECT COALESCE(MAX(order_id), 0) FROM orders").fetchone()[0]
+
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        watermark = get_watermark(conn, name)
+
+        if mode == "incremental" and watermark is not None and _object_type(conn, name) == "table":
+            affected = _refresh_incremental(conn, name, watermark)
+            results[name] = _record_build(conn, name, "incremental", current_watermark, time.perf_counter() - started)
+            results[name]["affected_keys"] = affected
+        else:
+            _refresh_full(conn, name)
+            results[name] = _record_build(conn, name, "full", current_watermark, time.perf_counter() - started)
+
+    return results
@@ -5,6 +5,16 @@ API Tests
 pytest test cases for the E-commerce Analytics API.
 """
 
+import asyncio
+import csv
+import duckdb
+import importlib
+import io
+import json
+import shutil
+import threading
+import time
+from datetime import datetime
 import pytest
 from fastapi.testclient import TestClient
 import sys
@@ -13,7 +23,14 @@ import os
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from api.main import app
+from api.main import app, db_manager, get_db, result_cache, rfm_segments_as_of, RFM_SNAPSHOT_QUERY, RFM_SEGMENT_FIELDS
+from api.database import DatabaseManager, PoolTimeoutError
+from api.executor import QueryExecutor, QueryTimeoutError
+from api.instrumentation import Histogram, Instrumentation, SlowQueryLog, fingerprint
+from api.serialization import fetch_records
+from api.cache import ResultCache, MemoryCacheBackend, RedisCacheBackend
+from api.query_builder import Conditions, ParseCache
+from api.export import export_query, stream_export
 
 client = TestClient(app)
 
@@ -81,6 +98,11 @@ class TestAnalyticsEndpoints:
         if "top_products" in data:
             assert isinstance(data["top_products"], list)
 
+    def test_product_limit_bounds(self):
+        """Test that out-of-range product limits are rejected."""
+        assert client.get("/api/v1/analytics/products?limit=-1").status_code == 422
+        assert client.get("/api/v1/analytics/products?limit=1001").status_code == 422
+
 
 class TestReportsEndpoints:
     """Test reports API endpoints."""
@@ -110,6 +132,224 @@ class TestReportsEndpoints:
         assert len(data["recent_orders"]) <= 5
 
 
+class TestOrderPagination:
+    """Test keyset pagination of the order listing."""
+
+    def fetch_all(self, limit, **filters):
+        orders, cursor = [], None
+        while True:
+            params = {"limit": limit, **filters, **({"cursor": cursor} if cursor else {})}
+            data = client.get("/api/v1/reports/recent-orders", params=params).json()
+            orders += data["recent_orders"]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return orders
+
+    def test_pages_cover_all_orders_once(self):
+        """Test that following next_cursor yields every order exactly once, newest first."""
+        with db_manager.cursor() as cursor:
+            expected = [
+                str(row[0])
+                for row in cursor.execute(
+                    "SELECT order_id FROM orders ORDER BY order_date DESC, order_id DESC"
+                ).fetchall()
+            ]
+
+        orders = self.fetch_all(limit=7)
+        assert [order["order_id"] for order in orders] == expected
+
+    def test_filters(self):
+        """Test status, payment method and customer filters across pages."""
+        with db_manager.cursor() as cursor:
+            status, payment_method, customer_id, count = cursor.execute(
+                """
+                SELECT status, payment_method, customer_id, COUNT(*) FROM orders
+                GROUP BY ALL ORDER BY COUNT(*) DESC, customer_id LIMIT 1
+            """
+            ).fetchone()
+
+        orders = self.fetch_all(limit=1, status=status, payment_method=payment_method, customer_id=customer_id)
+        assert len(orders) == count
+        assert all(
+            (order["status"], order["payment_method"], order["customer_id"])
+            == (status, payment_method, str(customer_id))
+            for order in orders
+        )
+        assert self.fetch_all(limit=5, customer_id=-1) == []
+
+    def test_sub_second_timestamps(self):
+        """Test that orders placed within the same second are paged exactly once, in key order."""
+        conn = duckdb.connect()
+        conn.execute(
+            """
+            CREATE TABLE orders AS
+            SELECT i AS order_id, i AS customer_id,
+                   TIMESTAMP '2024-06-01 12:00:00' + INTERVAL ((i * 7919) % 1000) MILLISECOND AS order_date,
+                   'Completed' AS status, 'Credit Card' AS payment_method, 10.0 AS total_amount
+            FROM range(1, 21) t(i)
+        """
+        )
+        expected = [
+            str(row[0])
+            for row in conn.execute("SELECT order_id FROM orders ORDER BY order_date DESC, order_id DESC").fetchall()
+        ]
+        app.dependency_overrides[get_db] = lambda: conn
+        try:
+            orders = self.fetch_all(limit=3)
+        finally:
+            app.dependency_overrides.pop(get_db)
+            conn.close()
+        assert [order["order_id"] for order in orders] == expected
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        response = client.get("/api/v1/reports/recent-orders?cursor=not-a-cursor")
+        assert response.status_code == 422
+
+
+class TestRfmAsOf:
+    """Test RFM segments as of a reference date."""
+
+    def test_default_is_latest_order_date(self):
+        """Test that the current build is scored as of the latest order date."""
+        data = client.get("/api/v1/analytics/customers").json()
+        cursor = db_manager.acquire()
+        try:
+            latest = cursor.execute("SELECT CAST(MAX(order_date) AS DATE) FROM orders").fetchone()[0]
+        finally:
+            db_manager.release(cursor)
+        assert data["rfm_as_of"] == latest.isoformat()
+        assert sum(segment["customers"] for segment in data["rfm_segments"]) > 0
+
+    async def test_default_follows_appended_orders(self, tmp_path, monkeypatch):
+        """Test that ``01_data_generation.py --append`` moves the default reference date to the new orders."""
+        db_manager.initialize()
+        shutil.copy(db_manager.db_path, tmp_path / "ecommerce.duckdb")
+        generation = importlib.import_module("01_data_generation")
+        argv = ["01_data_generation.py", "--append", "--orders", "50", "--workers", "1", "--attributes", "fast"]
+        monkeypatch.setattr(sys, "argv", argv)
+        generation.append_data(generation.parse_args(), tmp_path, tmp_path / "ecommerce.duckdb")
+
+        manager = DatabaseManager(db_path=str(tmp_path / "ecommerce.duckdb"), pool_size=1)
+        try:
+            with manager.cursor() as cursor:
+                latest = cursor.execute("SELECT CAST(MAX(order_date) AS DATE) FROM orders").fetchone()[0]
+                rfm = await rfm_segments_as_of(cursor, None)
+        finally:
+            manager.close()
+        assert rfm["rfm_as_of"] == latest.isoformat()
+        assert rfm["rfm_segments"]
+
+    def test_raw_tables_fallback(self, tmp_path, monkeypatch):
+        """Test that a database without summary tables scores RFM and LTV live with the same results."""
+        db_manager.initialize()
+        conn = duckdb.connect(str(tmp_path / "raw.duckdb"))
+        conn.execute(f"ATTACH '{db_manager.db_path}' AS built (READ_ONLY)")
+        for table in ("customers", "products", "orders", "order_items", "web_sessions"):
+            conn.execute(f"CREATE TABLE {table} AS SELECT * FROM built.{table}")
+        conn.execute("DETACH built")
+
+        monkeypatch.setattr(result_cache, "enabled", False)
+        expected = {
+            path: client.get(path).json()
+            for path in ("/api/v1/analytics/customers", "/api/v1/analytics/customers/rfm-history")
+        }
+        app.dependency_overrides[get_db] = lambda: conn
+        try:
+            for path, built in expected.items():
+                response = client.get(path)
+                assert response.status_code == 200, path
+                assert response.json() == built, path
+        finally:
+            app.dependency_overrides.pop(get_db)
+            conn.close()
+
+    def test_month_end_snapshot_matches_on_demand_scoring(self):
+        """Test that stored month-end snapshots equal scoring that date on demand."""
+        snapshots = client.get("/api/v1/analytics/customers/rfm-history").json()["snapshots"]
+        assert snapshots
+        as_of = snapshots[-1]["as_of"]
+        stored = [{k: v for k, v in row.items() if k != "as_of"} for row in snapshots if row["as_of"] == as_of]
+
+        cursor = db_manager.acquire()
+        try:
+            on_demand = fetch_records(cursor.execute(RFM_SNAPSHOT_QUERY, [as_of]), RFM_SEGMENT_FIELDS)
+        finally:
+            db_manager.release(cursor)
+        assert stored == on_demand
+        assert client.get(f"/api/v1/analytics/customers?as_of={as_of}").json()["rfm_segments"] == stored
+
+    def test_invalid_as_of(self):
+        """Test that malformed reference dates are rejected."""
+        response = client.get("/api/v1/analytics/customers?as_of=2024-13-01")
+        assert response.status_code == 422
+
+
+class TestApproximateOverview:
+    """Test the sketch-backed overview."""
+
+    @pytest.mark.parametrize("date_from,date_to", [(None, None), ("2024-11-01", "2024-12-15")])
+    def test_matches_exact_within_error(self, date_from, date_to):
+        """Test that approx totals equal the exact ones and customers fall within the error bound."""
+        params = {key: value for key, value in {"date_from": date_from, "date_to": date_to}.items() if value}
+        exact = client.get("/api/v1/analytics/overview", params=params).json()
+        approx = client.get("/api/v1/analytics/overview", params={**params, "approx": "true"}).json()
+
+        assert approx["approximate"] is True and exact["approximate"] is False
+        assert exact["total_customers_error"] is None
+        for key in ("total_orders", "total_revenue", "avg_order_value", "conversion_rate", "revenue_growth"):
+            assert approx[key] == pytest.approx(exact[key]), key
+        assert abs(approx["total_customers"] - exact["total_customers"]) <= max(approx["total_customers_error"], 1)
+
+    def test_batch_accepts_boolean_approx(self):
+        """Test that batched overview requests pass a JSON boolean approx through."""
+        response = client.post(
+            "/api/v1/analytics/batch", json={"metrics": [{"metric": "overview", "params": {"approx": True}}]}
+        )
+        assert response.status_code == 200
+        assert response.json()["results"]["overview"]["approximate"] is True
+
+    def test_batch_rejects_non_boolean_approx(self):
+        """Test that batched overview requests validate approx."""
+        response = client.post(
+            "/api/v1/analytics/batch", json={"metrics": [{"metric": "overview", "params": {"approx": "yes"}}]}
+        )
+        assert response.status_code == 422
+
+
+class TestCohorts:
+    """Test the cohort retention matrix."""
+
+    @pytest.mark.parametrize("granularity", ["week", "month"])
+    def test_dense_matrix(self, granularity):
+        """Test that every cohort has one value per period and starts fully retained."""
+        response = client.get(f"/api/v1/analytics/cohorts?granularity={granularity}&horizon=5")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cohorts"]
+
+        for cohort in data["cohorts"]:
+            assert len(cohort["customers"]) == len(cohort["retention"]) == len(cohort["revenue"]) == 6
+            assert cohort["retention"][0] == 1.0
+            assert cohort["customers"][0] == cohort["size"] > 0
+            # Unobserved periods only trail observed ones
+            observed = [value is not None for value in cohort["customers"]]
+            assert observed == sorted(observed, reverse=True)
+        assert sum(cohort["size"] for cohort in data["cohorts"]) > 0
+
+    def test_cohort_range_and_validation(self):
+        """Test the cohort date filter and parameter validation."""
+        cohorts = client.get("/api/v1/analytics/cohorts?date_from=2024-12-01").json()["cohorts"]
+        assert all(cohort["cohort"] >= "2024-12-01" for cohort in cohorts)
+
+        assert client.get("/api/v1/analytics/cohorts?granularity=day").status_code == 422
+        assert client.get("/api/v1/analytics/cohorts?horizon=0").status_code == 422
+        response = client.post(
+            "/api/v1/analytics/batch", json={"metrics": [{"metric": "cohorts", "params": {"horizon": 500}}]}
+        )
+        assert response.status_code == 422
+
+
 class TestParameterValidation:
     """Test API parameter validation."""
     
@@ -132,6 +372,507 @@ class TestParameterValidation:
         assert response.status_code in [200, 422]
 
 
+class TestDatabasePool:
+    """Test the pooled cursor database manager."""
+
+    def test_pool_status_endpoint(self):
+        """Test that pool metrics are exposed."""
+        client.get("/api/v1/analytics/overview")
+        response = client.get("/api/v1/system/pool")
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["pool_size"] == db_manager.pool_size
+        assert data["in_use"] == 0
+        assert data["acquired"] >= 1
+        assert "wait_ms_avg" in data
+
+    def test_acquire_timeout(self):
+        """Test that an exhausted pool raises after the acquire timeout."""
+        manager = DatabaseManager(db_path=db_manager.db_path, pool_size=1, acquire_timeout=0.05)
+        try:
+            with manager.cursor() as cursor:
+                assert cursor.execute("SELECT 1").fetchone()[0] == 1
+                with pytest.raises(PoolTimeoutError):
+                    manager.acquire()
+
+            assert manager.pool_status()["timeouts"] == 1
+            assert manager.pool_status()["available"] == 1
+        finally:
+            manager.close()
+
+
+class TestQueryExecutor:
+    """Test running DuckDB queries off the event loop."""
+
+    SLOW_QUERY = "SELECT SUM(i * i) FROM range(100000000000) t(i)"
+
+    async def test_run_returns_result(self):
+        """Test that work runs on the pool and its result is awaited."""
+        executor = QueryExecutor(max_workers=2, default_timeout=5)
+        try:
+            with db_manager.cursor() as cursor:
+                result = await executor.run(cursor, lambda cur: cur.execute("SELECT COUNT(*) FROM orders").fetchone())
+            assert result[0] > 0
+        finally:
+            executor.shutdown()
+
+    async def test_timeout_interrupts_query(self):
+        """Test that a query over its timeout is interrupted and the cursor is reusable."""
+        executor = QueryExecutor(max_workers=2, default_timeout=5)
+        try:
+            with db_manager.cursor() as cursor:
+                started = time.perf_counter()
+                with pytest.raises(QueryTimeoutError):
+                    await executor.run(cursor, lambda cur: cur.execute(self.SLOW_QUERY).fetchone(), timeout=0.2)
+                assert time.perf_counter() - started < 5
+
+                result = await executor.run(cursor, lambda cur: cur.execute("SELECT 42").fetchone())
+                assert result[0] == 42
+        finally:
+            executor.shutdown()
+
+    async def test_event_loop_not_blocked(self):
+        """Test that the event loop keeps serving while a query runs."""
+        executor = QueryExecutor(max_workers=2, default_timeout=5)
+        try:
+            with db_manager.cursor() as cursor:
+                query = asyncio.ensure_future(
+                    executor.run(cursor, lambda cur: cur.execute(self.SLOW_QUERY).fetchone(), timeout=0.5)
+                )
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                assert time.perf_counter() - started < 0.2
+                with pytest.raises(QueryTimeoutError):
+                    await query
+        finally:
+            executor.shutdown()
+
+
+class TestSerialization:
+    """Test columnar record serialization."""
+
+    def test_fetch_records_casts_and_fills_nulls(self):
+        """Test that NULL/NaN become 0 for numbers and None for strings."""
+        with db_manager.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT * FROM (VALUES
+                    (1, 2.5, 'a', TIMESTAMP '2024-01-02 03:04:05'),
+                    (NULL, 'NaN'::DOUBLE, NULL, NULL)
+                ) t(id, amount, label, ts)
+                """
+            )
+            records = fetch_records(
+                cursor,
+                {
+                    "id": ("id", "str"),
+                    "count": ("id", "int"),
+                    "amount": ("amount", "float"),
+                    "label": ("label", "str"),
+                    "ts": ("ts", "timestamp"),
+                },
+            )
+
+        assert records[0] == {"id": "1", "count": 1, "amount": 2.5, "label": "a", "ts": "2024-01-02 03:04:05"}
+        assert records[1] == {"id": None, "count": 0, "amount": 0.0, "label": None, "ts": None}
+
+    def test_recent_orders_serialization(self):
+        """Test that recent orders keep their string ids and timestamp format."""
+        response = client.get("/api/v1/reports/recent-orders?limit=3")
+        assert response.headers["content-type"] == "application/json"
+        order = response.json()["recent_orders"][0]
+        assert isinstance(order["order_id"], str)
+        assert isinstance(order["total_amount"], float)
+        assert len(order["order_date"]) == len("2024-01-01 00:00:00")
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis client API used by the cache."""
+
+    def __init__(self):
+        self.store = {}
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        return [key for key in list(self.store) if key.startswith(prefix)]
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class FailingRedis(FakeRedis):
+    """Redis stand-in whose every call fails like an unreachable server."""
+
+    def get(self, key):
+        raise ConnectionError("Connection refused")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("Connection refused")
+
+    def scan_iter(self, match="*"):
+        raise ConnectionError("Connection refused")
+
+
+class TestResultCache:
+    """Test the analytics result cache."""
+
+    def test_endpoint_served_from_cache(self):
+        """Test that a repeated request is a cache hit with an identical body."""
+        first = client.get("/api/v1/analytics/marketing")
+        second = client.get("/api/v1/analytics/marketing")
+        assert second.headers["X-Cache"] == "HIT"
+        assert first.json() == second.json()
+
+        stats = client.get("/api/v1/system/cache").json()
+        assert stats["hits"] >= 1
+        assert 0 < stats["hit_rate"] <= 1
+
+    def test_params_normalized(self):
+        """Test that parameter order and unset parameters do not change the key."""
+        cache = ResultCache()
+        assert cache.make_key("revenue", {"a": 1, "b": None, "c": "x"}) == cache.make_key(
+            "revenue", {"c": "x", "a": 1}
+        )
+
+    def test_memory_backend_lru_and_ttl(self):
+        """Test LRU eviction and expiry of the in-process backend."""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", b"1", ttl=60)
+        backend.set("b", b"2", ttl=60)
+        backend.get("a")
+        backend.set("c", b"3", ttl=60)
+        assert backend.get("b") is None
+        assert backend.get("a") == b"1"
+
+        backend.set("d", b"4", ttl=-1)
+        assert backend.get("d") is None
+
+    async def test_version_change_invalidates(self):
+        """Test that a new database file version forces recomputation."""
+        version = {"value": (1, 1, 1)}
+        calls = []
+        cache = ResultCache(ttl=60, version=lambda: version["value"], enabled=True)
+
+        async def compute():
+            calls.append(1)
+            return {"calls": len(calls)}
+
+        assert (await cache.get_or_compute("overview", {}, compute))[1] is False
+        assert (await cache.get_or_compute("overview", {}, compute))[1] is True
+        version["value"] = (1, 2, 1)
+        body, hit = await cache.get_or_compute("overview", {}, compute)
+        assert hit is False
+        assert body == b'{"calls":2}'
+        assert cache.stats()["invalidations"] == 1
+
+    async def test_redis_backend(self):
+        """Test the pluggable Redis backend against a local stand-in."""
+        fake = FakeRedis()
+        cache = ResultCache(backend=RedisCacheBackend(fake), ttl=60, enabled=True)
+
+        async def compute():
+            return {"value": 1}
+
+        await cache.get_or_compute("products", {"limit": 5}, compute)
+        body, hit = await cache.get_or_compute("products", {"limit": 5}, compute)
+        assert hit is True
+        assert body == b'{"value":1}'
+        assert len(fake.store) == 1
+        assert cache.stats()["saved_query_ms"] >= 0
+        assert threading.get_ident() not in fake.threads
+
+    async def test_redis_errors_fall_back_to_compute(self):
+        """Test that an unreachable Redis is logged and counted while responses are still computed."""
+        cache = ResultCache(backend=RedisCacheBackend(FailingRedis()), ttl=60, enabled=True)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"value": 1}
+
+        for _ in range(2):
+            assert await cache.get_or_compute("products", {"limit": 5}, compute) == (b'{"value":1}', False)
+        stats = cache.stats()
+        assert len(calls) == 2
+        assert stats["backend_errors"] == 4 and stats["entries"] is None
+
+
+class TestInstrumentation:
+    """Test request and query instrumentation."""
+
+    def test_fingerprint_ignores_literals(self):
+        """Test that queries differing only in literals and whitespace share a fingerprint."""
+        query_id, normalized = fingerprint("SELECT * FROM orders WHERE status = 'Completed' AND id IN (1, 2) LIMIT 9")
+        repeated = fingerprint("SELECT *\n  FROM orders WHERE status = 'Returned' AND id IN (7, 8, 9) LIMIT 5")
+        assert repeated[0] == query_id
+        assert normalized == "SELECT * FROM orders WHERE status = ? AND id IN (?, ...) LIMIT ?"
+        assert fingerprint("SELECT * FROM customers LIMIT 10")[0] != query_id
+
+    def test_histogram_exposition(self):
+        """Test that buckets are rendered cumulatively with sum and count."""
+        histogram = Histogram("test_seconds", "Test.", ("endpoint",), (0.1, 1.0))
+        for value in (0.05, 0.5, 2.0):
+            histogram.observe(value, "/x")
+
+        lines = histogram.render()
+        assert lines[:2] == ["# HELP test_seconds Test.", "# TYPE test_seconds histogram"]
+        assert lines[2:] == [
+            'test_seconds_bucket{endpoint="/x",le="0.1"} 1',
+            'test_seconds_bucket{endpoint="/x",le="1"} 2',
+            'test_seconds_bucket{endpoint="/x",le="+Inf"} 3',
+            'test_seconds_sum{endpoint="/x"} 2.550000',
+            'test_seconds_count{endpoint="/x"} 3',
+        ]
+
+    def test_metrics_endpoint(self):
+        """Test that a request is recorded by route with its pool wait, DuckDB and query metrics."""
+        result_cache.clear()
+        assert client.get("/api/v1/analytics/products?limit=3").status_code == 200
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        endpoint = 'endpoint="/api/v1/analytics/products"'
+        for metric in (
+            "api_request_duration_seconds_count",
+            "api_request_pool_wait_seconds_count",
+            "api_request_db_seconds_count",
+            "api_request_serialization_seconds_count",
+            "api_query_duration_seconds_count",
+            "api_query_rows_count",
+        ):
+            assert f"{metric}{{{endpoint}" in response.text, metric
+
+        queries = client.get("/api/v1/system/queries", params={"limit": 500}).json()["queries"]
+        products = [entry for entry in queries if "/api/v1/analytics/products" in entry["endpoints"]]
+        assert products and all(entry["sql"] and entry["calls"] >= 1 for entry in products)
+
+    async def test_slow_query_log(self, tmp_path):
+        """Test that slow queries are logged with one plan per fingerprint and interval."""
+        path = tmp_path / "slow.jsonl"
+        slow_queries = SlowQueryLog(
+            threshold_ms=0.001, path=str(path), connect=lambda: db_manager.get_connection().cursor()
+        )
+        executor = QueryExecutor(max_workers=1, instrumentation=Instrumentation(slow_queries))
+        query = "SELECT COUNT(*) FROM orders WHERE status = ?"
+        try:
+            with db_manager.cursor() as cursor:
+                for _ in range(2):
+                    await executor.run(cursor, lambda cur: cur.execute(query, ["Completed"]).fetchone())
+                with pytest.raises(Exception):
+                    await executor.run(cursor, lambda cur: cur.execute("SELECT * FROM missing_table").fetchall())
+        finally:
+            executor.shutdown()
+            slow_queries.shutdown(wait=True)
+
+        entries = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(entries) == 3
+        explained = [entry for entry in entries if entry["plan"] is not None]
+        assert len(explained) == 1 and "Total Time" in explained[0]["plan"]
+
+        logged = [entry for entry in entries if entry["sql"] == query]
+        assert len(logged) == 2
+        assert all(entry["rows"] == 1 and entry["params"] == ["Completed"] for entry in logged)
+        assert all(entry["endpoint"] == "none" and entry["error"] is None for entry in logged)
+        failed = next(entry for entry in entries if entry["sql"] != query)
+        assert failed["error"] and failed["plan"] is None and failed["rows"] is None
+
+
+class TestQueryBuilder:
+    """Test parameterized filters and parsed statement reuse."""
+
+    def test_conditions_bind_typed_dates(self):
+        """Test that filters render as placeholders with typed, whole-day date bounds."""
+        conditions = Conditions("times_ordered > 0").equals("category", "Books").equals("brand", None)
+        conditions.date_range("order_date", "2024-01-01", "2024-01-31")
+        assert conditions.sql() == (
+            "WHERE times_ordered > 0 AND category = ? AND order_date >= ? AND order_date < ?"
+        )
+        assert conditions.params == ["Books", datetime(2024, 1, 1), datetime(2024, 2, 1)]
+        assert Conditions().sql("AND") == ""
+
+        with pytest.raises(ValueError):
+            Conditions().date_range("order_date", "2024-01-01' OR 1=1 --", None)
+
+    def test_date_filter_keeps_left_join(self):
+        """Test that a date range outside the data still reports every customer segment."""
+        response = client.get("/api/v1/analytics/revenue?date_from=2020-01-01&date_to=2020-01-31")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["time_series"] == []
+
+        with db_manager.cursor() as cursor:
+            segments = cursor.execute("SELECT COUNT(DISTINCT customer_segment) FROM customers").fetchone()[0]
+        assert len(data["by_segment"]) == segments
+        assert all(row["revenue"] == 0 and row["customers"] > 0 for row in data["by_segment"])
+
+    def test_filter_values_are_bound(self):
+        """Test that filter values are never interpolated into SQL."""
+        response = client.get("/api/v1/analytics/products", params={"category": "x' OR '1'='1"})
+        assert response.status_code == 200
+        assert response.json()["top_products"] == []
+
+        response = client.get("/api/v1/analytics/customers", params={"segment": "Premium"})
+        assert response.status_code == 200
+
+    def test_overview_date_filter(self):
+        """Test that the overview filters sessions by their own date column."""
+        response = client.get("/api/v1/analytics/overview?date_from=2024-09-01&date_to=2024-12-31")
+        assert response.status_code == 200
+        assert response.json()["conversion_rate"] > 0
+
+    def test_parse_cache_reuse(self):
+        """Test that a query text is parsed once and re-executed with new parameters."""
+        cache = ParseCache(max_entries=1)
+        query = "SELECT COUNT(*) FROM orders WHERE order_date >= ?"
+        with db_manager.cursor() as cursor:
+            everything = cache.execute(cursor, query, [datetime(2000, 1, 1)]).fetchone()[0]
+            nothing = cache.execute(cursor, query, [datetime(2100, 1, 1)]).fetchone()[0]
+            cache.execute(cursor, "SELECT 1").fetchone()
+
+        assert everything > 0 and nothing == 0
+        assert cache.stats() == {"statements": 1, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+class TestBatchEndpoint:
+    """Test the batched multi-metric endpoint."""
+
+    def test_batch_matches_single_endpoints(self):
+        """Test that each batched result equals the corresponding endpoint response."""
+        response = client.post(
+            "/api/v1/analytics/batch",
+            json={
+                "date_from": "2024-09-01",
+                "date_to": "2024-12-31",
+                "metrics": [
+                    {"metric": "overview"},
+                    {"metric": "revenue", "params": {"group_by": "week"}},
+                    {"metric": "products", "id": "top_books", "params": {"category": "Books", "limit": 3}},
+                ],
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["errors"] == {}
+        assert set(data["results"]) == {"overview", "revenue", "top_books"}
+
+        overview = client.get("/api/v1/analytics/overview?date_from=2024-09-01&date_to=2024-12-31")
+        assert overview.headers["X-Cache"] == "HIT"
+        assert data["results"]["overview"] == overview.json()
+        assert data["results"]["top_books"] == client.get("/api/v1/analytics/products?category=Books&limit=3").json()
+
+    def test_identical_metrics_computed_once(self):
+        """Test that repeated metric requests share one computation and failures stay per metric."""
+        before = client.get("/api/v1/system/cache").json()
+        response = client.post(
+            "/api/v1/analytics/batch",
+            json={
+                "metrics": [
+                    {"metric": "customers", "id": "a", "params": {"segment": "Budget"}},
+                    {"metric": "customers", "id": "b", "params": {"segment": "Budget"}},
+                    {"metric": "overview", "params": {"date_from": "not-a-date"}},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["results"]["a"] == data["results"]["b"]
+        assert data["errors"]["overview"]["status"] == 422
+
+        after = client.get("/api/v1/system/cache").json()
+        assert (after["hits"] + after["misses"]) - (before["hits"] + before["misses"]) == 1
+        assert client.get("/api/v1/system/pool").json()["in_use"] == 0
+
+    def test_invalid_batch(self):
+        """Test that unknown metrics, parameters and duplicate ids reject the batch."""
+        for metrics in [
+            [{"metric": "unknown"}],
+            [{"metric": "marketing", "params": {"segment": "Budget"}}],
+            [{"metric": "recent_orders", "params": {"limit": 5000}}],
+            [{"metric": "recent_orders", "params": {"limit": True}}],
+            [{"metric": "recent_orders", "params": {"customer_id": False}}],
+            [{"metric": "cohorts", "params": {"horizon": True}}],
+            [{"metric": "revenue", "params": {"group_by": 5}}],
+            [{"metric": "customers", "params": {"as_of": 123}}],
+            [{"metric": "overview", "params": {"date_from": 20240101}}],
+            [{"metric": "overview"}, {"metric": "overview"}],
+            [],
+        ]:
+            response = client.post("/api/v1/analytics/batch", json={"metrics": metrics})
+            assert response.status_code == 422
+
+
+class TestExport:
+    """Test the streaming table export."""
+
+    def test_ndjson_and_csv_extracts(self):
+        """Test that both text formats contain exactly the rows in the date range."""
+        with db_manager.cursor() as cursor:
+            expected = cursor.execute(
+                "SELECT COUNT(*) FROM orders WHERE order_date >= '2024-10-01' AND order_date < '2024-11-01'"
+            ).fetchone()[0]
+        url = "/api/v1/reports/export/orders?date_from=2024-10-01&date_to=2024-10-31"
+
+        response = client.get(url + "&format=ndjson")
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == expected
+        assert all(row["order_date"].startswith("2024-10") for row in rows)
+
+        response = client.get(url + "&format=csv")
+        assert response.headers["content-disposition"] == 'attachment; filename="orders.csv"'
+        records = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(records) == expected
+        assert records[0]["order_id"] == str(rows[0]["order_id"])
+
+    def test_parquet_extract(self, tmp_path):
+        """Test that the Parquet extract is a complete, readable file."""
+        response = client.get("/api/v1/reports/export/web_sessions?format=parquet")
+        assert response.status_code == 200
+        path = tmp_path / "sessions.parquet"
+        path.write_bytes(response.content)
+
+        with db_manager.cursor() as cursor:
+            exported = cursor.execute(f"SELECT COUNT(*) FROM read_parquet('{path}')").fetchone()[0]
+            assert exported == cursor.execute("SELECT COUNT(*) FROM web_sessions").fetchone()[0]
+
+    def test_invalid_export(self):
+        """Test unknown tables, formats and malformed dates."""
+        assert client.get("/api/v1/reports/export/customers").status_code == 404
+        assert client.get("/api/v1/reports/export/orders?format=xlsx").status_code == 422
+        assert client.get("/api/v1/reports/export/orders?date_from=yesterday").status_code == 422
+
+    async def test_cursor_released_when_client_stops_reading(self):
+        """Test that a stream holds a cursor only once started and returns it when abandoned mid-way."""
+        executor = QueryExecutor(max_workers=1, default_timeout=5)
+        manager = DatabaseManager(db_path=db_manager.db_path, pool_size=1)
+        try:
+            query, params = export_query("web_sessions", None, None)
+            manager.initialize()
+            unstarted = stream_export(manager.acquire, executor, manager.release, query, params, "ndjson")
+            await unstarted.aclose()
+            assert manager.pool_status()["available"] == 1
+
+            stream = stream_export(manager.acquire, executor, manager.release, query, params, "ndjson", batch_rows=1)
+            assert (await stream.__anext__()).endswith(b"}\n")
+            assert manager.pool_status()["available"] == 0
+
+            await stream.aclose()
+            assert manager.pool_status()["available"] == 1
+        finally:
+            executor.shutdown()
+            manager.close()
+
+
 class TestErrorHandling:
     """Test error handling."""
     
@@ -0,0 +1,337 @@
+"""
+Data Generator Tests
+====================
+
+pytest test cases for the synthetic e-commerce data generator.
+"""
+
+import importlib
+import pytest
+import duckdb
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.data_generator import EcommerceDataGenerator, _sample_distinct
+from utils.storage import (
+    CsvTableWriter,
+    DuckDBTableWriter,
+    ParquetTableWriter,
+    cluster_by_time,
+    load_parquet_tables,
+    write_batches,
+)
+from utils.summary_tables import SUMMARY_TABLES, refresh_summaries, summary_sql
+
+
+def _catalog(generator, num_customers=200, num_products=50):
+    customers = pd.DataFrame(
+        {
+            "customer_id": np.arange(1, num_customers + 1),
+            "customer_segment": np.resize(generator.customer_segments, num_customers),
+        }
+    )
+    products = pd.DataFrame(
+        {
+            "product_id": np.arange(1, num_products + 1),
+            "price": np.linspace(5, 500, num_products),
+        }
+    )
+    return customers, products
+
+
+class TestGenerateOrders:
+    """Test the batched order generation."""
+
+    def test_orders_are_consistent(self):
+        """Test that items, totals and ids line up with the generated orders."""
+        generator = EcommerceDataGenerator(num_orders=2000, seed=7)
+        customers, products = _catalog(generator)
+        orders, items = generator.generate_orders(customers, products)
+
+        # Seasonality rejection drops some orders but never reuses an id
+        assert 0 < len(orders) < 2000
+        assert orders["order_id"].is_unique and orders["order_id"].is_monotonic_increasing
+        assert orders["order_date"].between(generator.start_date, generator.end_date).all()
+        assert set(orders["status"]) <= {"Completed", "Pending", "Cancelled", "Returned"}
+        assert orders["customer_id"].isin(customers["customer_id"]).all()
+
+        assert set(items["order_id"]) == set(orders["order_id"])
+        assert not items.duplicated(["order_id", "product_id"]).any()
+        assert (items["quantity"] >= 1).all()
+
+        item_totals = items.groupby("order_id")["total_price"].sum()
+        subtotal = item_totals.loc[orders["order_id"]].to_numpy() - orders["discount_amount"].to_numpy()
+        expected = subtotal + orders["tax_amount"].to_numpy() + orders["shipping_cost"].to_numpy()
+        assert np.allclose(orders["total_amount"], expected, atol=0.05)
+
+    def test_basket_size_follows_segment(self):
+        """Test that higher segments buy more items per order."""
+        generator = EcommerceDataGenerator(num_orders=5000, seed=7)
+        customers, products = _catalog(generator)
+        orders, items = generator.generate_orders(customers, products)
+
+        segment_of = customers.set_index("customer_id")["customer_segment"]
+        basket = items.groupby("order_id").size().rename("items").to_frame()
+        basket["segment"] = segment_of.loc[orders.set_index("order_id").loc[basket.index, "customer_id"]].to_numpy()
+        sizes = basket.groupby("segment")["items"].mean()
+        assert sizes["Budget"] < sizes["Standard"] < sizes["Premium"] < sizes["Enterprise"]
+
+    def test_seed_is_reproducible(self):
+        """Test that the same seed yields identical orders."""
+        first = EcommerceDataGenerator(num_orders=500, seed=3)
+        second = EcommerceDataGenerator(num_orders=500, seed=3)
+        orders_a, items_a = first.generate_orders(*_catalog(first))
+        orders_b, items_b = second.generate_orders(*_catalog(second))
+        pd.testing.assert_frame_equal(orders_a, orders_b)
+        pd.testing.assert_frame_equal(items_a, items_b)
+
+    @pytest.mark.parametrize("counts", [[10, 9, 1], [3, 3, 3, 3]])
+    def test_sample_distinct_small_population(self, counts):
+        """Test that per-order product picks stay distinct even for a tiny catalog."""
+        groups, picks = _sample_distinct(np.random.default_rng(1), np.array(counts), 10)
+        for group, count in enumerate(counts):
+            assert sorted(set(picks[groups == group])) == sorted(picks[groups == group])
+            assert (groups == group).sum() == count
+
+
+class TestGenerateWebAnalytics:
+    """Test the batched web session generation."""
+
+    def test_sessions_follow_orders(self):
+        """Test that the first sessions convert with their order's revenue."""
+        generator = EcommerceDataGenerator(num_orders=1000, seed=11)
+        customers, products = _catalog(generator)
+        orders, _ = generator.generate_orders(customers, products)
+        sessions = generator.generate_web_analytics(customers, orders)
+
+        assert len(sessions) == len(orders) * 5
+        assert sessions["session_id"].tolist() == list(range(1, len(sessions) + 1))
+
+        converted = sessions[sessions["converted"]]
+        assert len(converted) == len(orders)
+        assert converted["revenue"].tolist() == orders["total_amount"].tolist()
+        assert (sessions.loc[~sessions["converted"], "revenue"] == 0).all()
+
+        known = sessions["customer_id"].dropna()
+        assert known.isin(customers["customer_id"]).all()
+        assert 0.5 < len(known) / len(sessions) < 0.7
+        assert (sessions["session_duration_seconds"] >= 30).all()
+        assert (sessions["bounced"] == (sessions["page_views"] == 1)).all()
+
+    def test_seed_is_reproducible(self):
+        """Test that the same seed yields identical sessions."""
+        frames = []
+        for _ in range(2):
+            generator = EcommerceDataGenerator(num_orders=300, seed=5)
+            customers, products = _catalog(generator)
+            orders, _ = generator.generate_orders(customers, products)
+            frames.append(generator.generate_web_analytics(customers, orders))
+        pd.testing.assert_frame_equal(*frames)
+
+
+class TestShardedGeneration:
+    """Test sharded generation on a process pool."""
+
+    def test_output_independent_of_workers(self):
+        """Test that every table is identical for one and several workers."""
+        config = dict(num_customers=40, num_products=15, num_orders=300, seed=9, chunk_size=25)
+        serial = EcommerceDataGenerator(workers=1, **config).generate_all_data()
+        parallel = EcommerceDataGenerator(workers=3, **config).generate_all_data()
+
+        for name, df in serial.items():
+            pd.testing.assert_frame_equal(df, parallel[name])
+            assert df.to_csv(index=False) == parallel[name].to_csv(index=False)
+
+        assert serial["customers"]["customer_id"].tolist() == list(range(1, 41))
+        assert serial["products"]["product_id"].tolist() == list(range(1, 16))
+
+    def test_shards_cover_range(self):
+        """Test that shards split the id range into contiguous chunks."""
+        generator = EcommerceDataGenerator(chunk_size=4)
+        assert generator.shards(10) == [(0, 0, 4), (1, 4, 8), (2, 8, 10)]
+        assert generator.shards(0) == []
+
+
+class TestStreamingGeneration:
+    """Test streaming batches into DuckDB and CSV."""
+
+    CONFIG = dict(num_customers=40, num_products=15, num_orders=300, seed=9, chunk_size=25)
+
+    def test_batches_match_in_memory_generation(self):
+        """Test that concatenated batches equal generate_all_data() for any worker count."""
+        expected = EcommerceDataGenerator(**self.CONFIG).generate_all_data()
+        for workers in (1, 2):
+            batches = {}
+            for table, batch in EcommerceDataGenerator(workers=workers, **self.CONFIG).iter_batches():
+                assert len(batch) <= self.CONFIG["chunk_size"] or table == "order_items"
+                batches.setdefault(table, []).append(batch)
+
+            assert set(batches) == set(expected)
+            for table, frames in batches.items():
+                pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), expected[table])
+
+    def test_writers_persist_every_batch(self, tmp_path):
+        """Test that the DuckDB and CSV writers hold the full tables."""
+        expected = EcommerceDataGenerator(**self.CONFIG).generate_all_data()
+        with duckdb.connect(str(tmp_path / "stream.duckdb")) as conn:
+            csv_writer = CsvTableWriter(tmp_path)
+            rows = write_batches(
+                EcommerceDataGenerator(**self.CONFIG).iter_batches(), [csv_writer, DuckDBTableWriter(conn)]
+            )
+
+            for table, df in expected.items():
+                assert rows[table] == len(df)
+                assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == len(df)
+                assert csv_writer.path(table).read_text() == df.to_csv(index=False)
+
+            revenue = conn.execute("SELECT SUM(total_amount) FROM orders").fetchone()[0]
+            assert revenue == pytest.approx(expected["orders"]["total_amount"].sum())
+
+    def test_parquet_round_trip(self, tmp_path):
+        """Test that tables loaded from partitioned Parquet equal a direct load."""
+        expected = EcommerceDataGenerator(**self.CONFIG).generate_all_data()
+        write_batches(EcommerceDataGenerator(**self.CONFIG).iter_batches(), [ParquetTableWriter(tmp_path)])
+
+        months = {path.name for path in (tmp_path / "orders").iterdir()}
+        assert months == {f"month={month}" for month in expected["orders"]["order_date"].dt.strftime("%Y-%m")}
+
+        with duckdb.connect() as from_parquet, duckdb.connect() as direct:
+            load_parquet_tables(from_parquet, tmp_path, expected)
+            for table, df in expected.items():
+                direct.execute(f"CREATE TABLE {table} AS SELECT * FROM df")
+                for query in (f"DESCRIBE {table}", f"SELECT * FROM {table}"):
+                    assert from_parquet.execute(query).fetchall() == direct.execute(query).fetchall()
+
+    def test_cluster_by_time(self):
+        """Test that fact tables are rewritten in (timestamp, id) order without losing rows."""
+        with duckdb.connect() as conn:
+            write_batches(EcommerceDataGenerator(**self.CONFIG).iter_batches(), [DuckDBTableWriter(conn)])
+            before = conn.execute("SELECT * FROM orders ORDER BY order_id").fetchall()
+            cluster_by_time(conn)
+
+            assert conn.execute("SELECT * FROM orders ORDER BY order_id").fetchall() == before
+            for table, key in [("orders", "order_date, order_id"), ("web_sessions", "session_date, session_id")]:
+                stored = conn.execute(f"SELECT {key} FROM {table}").fetchall()
+                assert stored == sorted(stored)
+
+
+class TestAppendGeneration:
+    """Test appending a new date range to an existing database."""
+
+    CONFIG = dict(num_customers=40, num_products=15, num_orders=300, seed=9, chunk_size=25, end_date="2024-12-31")
+
+    def test_append_continues_ids_and_refreshes_summaries(self, tmp_path):
+        """Test that appended rows extend the id sequences and the incremental refresh stays exact."""
+        with duckdb.connect(str(tmp_path / "append.duckdb")) as conn:
+            write_batches(EcommerceDataGenerator(**self.CONFIG).iter_batches(), [DuckDBTableWriter(conn)])
+            refresh_summaries(conn, mode="full")
+            max_order_id = conn.execute("SELECT MAX(order_id) FROM orders").fetchone()[0]
+            max_session_id = conn.execute("SELECT MAX(session_id) FROM web_sessions").fetchone()[0]
+
+            generator = EcommerceDataGenerator(
+                num_orders=100, seed=9, chunk_size=25, start_date="2025-01-01", end_date="2025-01-31",
+                order_id_offset=max_order_id, session_id_offset=max_session_id,
+            )
+            customers = conn.execute("SELECT customer_id, customer_segment FROM customers").df()
+            products = conn.execute("SELECT product_id, price FROM products").df()
+            csv_writer = CsvTableWriter(tmp_path, append=True)
+            rows = write_batches(
+                generator.iter_batches(customers, products), [DuckDBTableWriter(conn, append=True), csv_writer]
+            )
+            refreshed = refresh_summaries(conn, mode="incremental")
+
+            assert set(rows) == {"orders", "order_items", "web_sessions"}
+            new_orders = conn.execute("SELECT * FROM orders WHERE order_id > ?", [max_order_id]).df()
+            assert len(new_orders) == rows["orders"]
+            assert new_orders["order_date"].between("2025-01-01", "2025-01-31").all()
+            new_sessions = conn.execute("SELECT * FROM web_sessions WHERE session_id > ?", [max_session_id]).df()
+            expected_ids = list(range(max_session_id + 1, max_session_id + 1 + len(new_sessions)))
+            assert new_sessions["session_id"].tolist() == expected_ids
+            assert new_sessions["session_date"].between("2025-01-01", "2025-01-31").all()
+            assert csv_writer.path("orders").read_text().count("\n") == rows["orders"] + 1
+
+            assert {build["mode"] for build in refreshed.values()} == {"incremental"}
+            for name in SUMMARY_TABLES:
+                expected = conn.execute(f"SELECT * FROM ({summary_sql(name)}) ORDER BY ALL").fetchall()
+                assert conn.execute(f"SELECT * FROM {name} ORDER BY ALL").fetchall() == pytest.approx(expected)
+
+
+class TestAppendScript:
+    """Test ``01_data_generation.py --append`` against an existing dataset."""
+
+    CONFIG = dict(num_customers=40, num_products=15, num_orders=300, seed=9, chunk_size=25, end_date="2024-12-31")
+    ARGV = ["01_data_generation.py", "--append", "--orders", "50", "--workers", "1", "--chunk-size", "25"]
+
+    @pytest.fixture
+    def generation(self, monkeypatch):
+        monkeypatch.setattr(sys, "argv", self.ARGV + ["--attributes", "fast"])
+        return importlib.import_module("01_data_generation")
+
+    def _build(self, tmp_path, file_writer):
+        with duckdb.connect(str(tmp_path / "ecommerce.duckdb")) as conn:
+            write_batches(EcommerceDataGenerator(**self.CONFIG).iter_batches(), [file_writer, DuckDBTableWriter(conn)])
+            refresh_summaries(conn, mode="full")
+
+    def test_appends_to_existing_format(self, tmp_path, generation):
+        """Test that a Parquet dataset is extended in Parquet and no CSV files appear."""
+        self._build(tmp_path, ParquetTableWriter(tmp_path / "parquet"))
+        generation.append_data(generation.parse_args(), tmp_path, tmp_path / "ecommerce.duckdb")
+
+        assert not list(tmp_path.glob("*.csv"))
+        with duckdb.connect(str(tmp_path / "ecommerce.duckdb")) as conn:
+            for table in ("orders", "order_items", "web_sessions"):
+                files = conn.execute(f"SELECT COUNT(*) FROM '{tmp_path}/parquet/{table}/**/*.parquet'").fetchone()[0]
+                assert files == conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0], table
+
+    def test_failed_append_leaves_files_untouched(self, tmp_path, generation, monkeypatch):
+        """Test that files are only written after the database transaction commits."""
+        self._build(tmp_path, CsvTableWriter(tmp_path))
+        before = {path.name: path.read_bytes() for path in tmp_path.glob("*.csv")}
+
+        def fail(conn, mode):
+            raise RuntimeError("refresh failed")
+
+        monkeypatch.setattr(generation, "refresh_summaries", fail)
+        with pytest.raises(RuntimeError):
+            generation.append_data(generation.parse_args(), tmp_path, tmp_path / "ecommerce.duckdb")
+        assert {path.name: path.read_bytes() for path in tmp_path.glob("*.csv")} == before
+
+        monkeypatch.undo()
+        monkeypatch.setattr(sys, "argv", self.ARGV)
+        generation.append_data(generation.parse_args(), tmp_path, tmp_path / "ecommerce.duckdb")
+        with duckdb.connect(str(tmp_path / "ecommerce.duckdb")) as conn:
+            for table in ("orders", "order_items", "web_sessions"):
+                rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                assert (tmp_path / f"{table}.csv").read_text().count("\n") == rows + 1, table
+
+
+class TestAttributeModes:
+    """Test the Faker-free fast attribute mode."""
+
+    def test_fast_mode_keeps_schema(self):
+        """Test that both attribute modes produce the same columns and types."""
+        tables = {}
+        for mode in ("faker", "fast"):
+            generator = EcommerceDataGenerator(num_customers=30, num_products=20, seed=4, attributes=mode)
+            tables[mode] = {"customers": generator.generate_customers(), "products": generator.generate_products()}
+
+        for name in ("customers", "products"):
+            faker_df, fast_df = tables["faker"][name], tables["fast"][name]
+            schemas = [duckdb.sql("DESCRIBE SELECT * FROM df").fetchall() for df in (faker_df, fast_df)]
+            assert schemas[0] == schemas[1]
+            assert fast_df.notna().all().all()
+
+        customers = tables["fast"]["customers"]
+        assert customers["email"].is_unique
+        assert customers["email"].str.contains("@").all()
+        assert set(customers["gender"]) <= {"M", "F"}
+
+    def test_unknown_mode_rejected(self):
+        """Test that unknown attribute modes are rejected."""
+        with pytest.raises(ValueError):
+            EcommerceDataGenerator(attributes="slow")
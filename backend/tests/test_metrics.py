@@ -0,0 +1,83 @@
+"""
+Metric Tests
+============
+
+pytest test cases for the metric definitions shared by the API and the dashboard.
+"""
+
+import pytest
+import duckdb
+import sys
+import os
+from datetime import date
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.metrics import (
+    DAILY_REVENUE_FROM_ORDERS,
+    DAILY_REVENUE_ROLLUP,
+    daily_revenue_source,
+    growth_windows,
+    revenue_growth,
+)
+from utils.summary_tables import refresh_summaries
+
+
+@pytest.fixture
+def conn():
+    """One Completed order of 100 per day in March and of 150 per day in April 2024."""
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE customers AS SELECT 1 AS customer_id, 'Budget' AS customer_segment")
+    conn.execute(
+        """
+        CREATE TABLE orders AS
+        SELECT i AS order_id, 1 AS customer_id,
+               TIMESTAMP '2024-03-01' + INTERVAL (i - 1) DAY AS order_date,
+               'Completed' AS status, 'PayPal' AS payment_method,
+               CASE WHEN i <= 31 THEN 100.0 ELSE 150.0 END AS total_amount
+        FROM range(1, 62) t(i)
+    """
+    )
+    refresh_summaries(conn, mode="full", tables=["revenue_rollup_day"])
+    yield conn
+    conn.close()
+
+
+class TestRevenueGrowth:
+    """Test the period-over-period revenue growth metric."""
+
+    def test_previous_equivalent_window(self, conn):
+        """Test that a range is compared with the equally long range before it."""
+        assert growth_windows(conn, "2024-04-01", "2024-04-10") == (
+            date(2024, 3, 22),
+            date(2024, 4, 1),
+            date(2024, 4, 11),
+        )
+        assert revenue_growth(conn, "2024-04-01", "2024-04-10") == pytest.approx(50.0)
+        assert revenue_growth(conn, "2024-03-10", "2024-03-15") == pytest.approx(0.0)
+
+    def test_defaults_to_trailing_window(self, conn):
+        """Test that without dates the last 30 days are compared with the 30 before."""
+        previous_start, current_start, current_end = growth_windows(conn)
+        assert (current_start, current_end) == (date(2024, 4, 1), date(2024, 5, 1))
+        assert previous_start == date(2024, 3, 2)
+        assert revenue_growth(conn) == pytest.approx(50.0)
+
+    def test_rollup_matches_raw_orders(self, conn):
+        """Test that the rollup and raw orders give the same growth."""
+        for date_from, date_to in [(None, None), ("2024-03-20", "2024-04-05"), ("2024-04-01", None)]:
+            assert revenue_growth(conn, date_from, date_to) == pytest.approx(
+                revenue_growth(conn, date_from, date_to, source=DAILY_REVENUE_FROM_ORDERS)
+            )
+
+    def test_falls_back_to_raw_orders(self, conn):
+        """Test that the default source is raw orders once the rollup is missing."""
+        assert daily_revenue_source(conn) == DAILY_REVENUE_ROLLUP
+        conn.execute("DROP TABLE revenue_rollup_day")
+        assert daily_revenue_source(conn) == DAILY_REVENUE_FROM_ORDERS
+        assert revenue_growth(conn, "2024-04-01", "2024-04-10") == pytest.approx(50.0)
+
+    def test_no_baseline(self, conn):
+        """Test that growth is zero when the previous window has no revenue."""
+        assert revenue_growth(conn, "2024-03-01", "2024-03-31") == 0.0
@@ -0,0 +1,385 @@
+"""
+Summary Table Tests
+===================
+
+pytest test cases for the materialized summary tables.
+"""
+
+import pytest
+import duckdb
+import sys
+import os
+from datetime import date
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.summary_tables import (
+    RFM_BOUNDARIES_TABLE,
+    SUMMARY_TABLES,
+    refresh_summaries,
+    rfm_segments_sql,
+    summary_sql,
+)
+from api.query_builder import Conditions
+from api.rollups import (
+    GROUP_BY_GRAINS,
+    HLL_RELATIVE_ERROR,
+    decompose,
+    hll_estimate,
+    plan_distinct_customers,
+    plan_revenue_series,
+    plan_segment_totals,
+    plan_session_totals,
+)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Small writable database with the generator's base schema."""
+    conn = duckdb.connect(str(tmp_path / "summary.duckdb"))
+    conn.execute("SELECT setseed(0.1)")
+    conn.execute(
+        """
+        CREATE TABLE customers AS
+        SELECT i AS customer_id,
+               (['Budget', 'Standard', 'Premium'])[1 + i % 3] AS customer_segment,
+               (['Direct', 'Referral'])[1 + i % 2] AS acquisition_channel,
+               TIMESTAMP '2024-01-01' AS registration_date
+        FROM range(1, 21) t(i)
+    """
+    )
+    conn.execute(
+        """
+        CREATE TABLE products AS
+        SELECT i AS product_id, 'Product ' || i AS product_name,
+               (['Books', 'Toys'])[1 + i % 2] AS category,
+               10.0 + i AS price, 5.0 + i AS cost
+        FROM range(1, 11) t(i)
+    """
+    )
+    _add_orders(conn, 1, 100, "2024-01-01")
+    yield conn
+    conn.close()
+
+
+def _add_orders(conn, first_id: int, last_id: int, start: str):
+    conn.execute(
+        f"""
+        {"INSERT INTO orders" if first_id > 1 else "CREATE TABLE orders AS"}
+        SELECT i AS order_id,
+               1 + i % 20 AS customer_id,
+               TIMESTAMP '{start}' + INTERVAL (i % 90) DAY AS order_date,
+               CASE WHEN i % 7 = 0 THEN 'Cancelled' ELSE 'Completed' END AS status,
+               'Credit Card' AS payment_method,
+               ROUND(20 + random() * 200, 2) AS total_amount
+        FROM range({first_id}, {last_id} + 1) t(i)
+    """
+    )
+    conn.execute(
+        f"""
+        {"INSERT INTO order_items" if first_id > 1 else "CREATE TABLE order_items AS"}
+        SELECT i AS order_id, 1 + i % 10 AS product_id, 2 AS quantity,
+               11.0 AS unit_price, 22.0 AS total_price
+        FROM range({first_id}, {last_id} + 1) t(i)
+    """
+    )
+    conn.execute(
+        f"""
+        {"INSERT INTO web_sessions" if first_id > 1 else "CREATE TABLE web_sessions AS"}
+        SELECT i AS session_id,
+               CASE WHEN i % 3 > 0 THEN 1 + i % 20 END AS customer_id,
+               TIMESTAMP '{start}' + INTERVAL (i % 90) DAY AS session_date,
+               (['direct', 'email'])[1 + i % 2] AS traffic_source,
+               (['mobile', 'desktop'])[1 + i % 2] AS device_type,
+               60 AS session_duration_seconds, 1 + i % 4 AS page_views,
+               CAST(i % 4 = 0 AS BIGINT) AS bounced, i % 5 = 0 AS converted,
+               CASE WHEN i % 5 = 0 THEN 30.0 ELSE 0 END AS revenue
+        FROM range({first_id}, {last_id} + 1) t(i)
+    """
+    )
+
+
+def _snapshot(conn, name):
+    return conn.execute(f"SELECT * FROM {name} ORDER BY ALL").fetchall()
+
+
+class TestSummaryTables:
+    """Test full and incremental summary refreshes."""
+
+    def test_full_refresh_replaces_views(self, conn):
+        """Test that a full refresh creates physical tables with build metadata."""
+        conn.execute(f"CREATE VIEW customer_ltv AS {summary_sql('customer_ltv')}")
+        results = refresh_summaries(conn, mode="full")
+
+        assert set(results) == set(SUMMARY_TABLES)
+        table_types = dict(
+            conn.execute("SELECT table_name, table_type FROM information_schema.tables").fetchall()
+        )
+        for name in SUMMARY_TABLES:
+            assert table_types[name] == "BASE TABLE"
+
+        metadata = conn.execute("SELECT table_name, order_watermark, built_at FROM summary_metadata").fetchall()
+        assert {row[0] for row in metadata} == set(SUMMARY_TABLES)
+        assert all(row[1] == 100 and row[2] is not None for row in metadata)
+
+    def test_incremental_matches_full(self, conn):
+        """Test that an incremental refresh after appending orders equals a full rebuild."""
+        refresh_summaries(conn, mode="full")
+        conn.execute("INSERT INTO customers VALUES (21, 'Premium', 'Direct', TIMESTAMP '2024-05-01')")
+        _add_orders(conn, 101, 130, "2024-04-15")
+
+        results = refresh_summaries(conn, mode="incremental")
+        assert results["customer_ltv"]["mode"] == "incremental"
+        assert 0 < results["customer_ltv"]["affected_keys"] <= 21
+        # customer_rfm keeps its cutoffs until a full build (TestCustomerRfm)
+        exact = [name for name in SUMMARY_TABLES if name != "customer_rfm"]
+        incremental = {name: _snapshot(conn, name) for name in exact}
+
+        refresh_summaries(conn, mode="full")
+        for name in exact:
+            assert _snapshot(conn, name) == pytest.approx(incremental[name])
+
+    def test_incremental_without_previous_build(self, conn):
+        """Test that incremental mode falls back to a full build."""
+        results = refresh_summaries(conn, mode="incremental", tables=["monthly_revenue"])
+        assert results["monthly_revenue"]["mode"] == "full"
+
+    def test_unknown_table_rejected(self, conn):
+        """Test that unknown table names are rejected."""
+        with pytest.raises(ValueError):
+            refresh_summaries(conn, tables=["not_a_summary"])
+
+
+class TestCustomerRfm:
+    """Test the precomputed RFM scores."""
+
+    def test_scores_follow_cutoffs(self, conn):
+        """Test that scores count the quintile cutoffs below each value."""
+        refresh_summaries(conn, mode="full", tables=["customer_rfm"])
+        cutoffs = conn.execute(f"SELECT recency_cutoffs, monetary_cutoffs FROM {RFM_BOUNDARIES_TABLE}").fetchone()
+        rows = conn.execute("SELECT recency, monetary, r_score, m_score, reference_date FROM customer_rfm").fetchall()
+
+        assert len(rows) == 20
+        assert {row[4] for row in rows} == {date(2024, 3, 30)}
+        for recency, monetary, r_score, m_score, _ in rows:
+            assert r_score == 5 - sum(cutoff < recency for cutoff in cutoffs[0])
+            assert m_score == 1 + sum(cutoff < monetary for cutoff in cutoffs[1])
+        assert {row[3] for row in rows} == {1, 2, 3, 4, 5}
+
+    def test_incremental_rescores_with_cached_cutoffs(self, conn):
+        """Test that appended orders advance the reference date and rescore against the cached cutoffs."""
+        refresh_summaries(conn, mode="full", tables=["customer_rfm"])
+        rows = conn.execute("SELECT customer_id, recency, frequency FROM customer_rfm").fetchall()
+        before = {customer_id: (recency, frequency) for customer_id, recency, frequency in rows}
+        cutoffs = conn.execute(f"SELECT recency_cutoffs, frequency_cutoffs FROM {RFM_BOUNDARIES_TABLE}").fetchone()
+        # Orders 101-110 fall on 2024-05-01..2024-05-10 for customers 2-11 (customer c on April 29 + c days)
+        _add_orders(conn, 101, 110, "2024-04-20")
+
+        results = refresh_summaries(conn, mode="incremental", tables=["customer_rfm"])
+        assert results["customer_rfm"]["affected_keys"] == 10
+        boundaries = conn.execute(
+            f"SELECT build_version, reference_date, recency_cutoffs, frequency_cutoffs FROM {RFM_BOUNDARIES_TABLE}"
+        ).fetchone()
+        assert boundaries == (1, date(2024, 5, 10), *cutoffs)
+
+        after = conn.execute(
+            "SELECT customer_id, recency, frequency, r_score, reference_date FROM customer_rfm ORDER BY customer_id"
+        ).fetchall()
+        shift = (date(2024, 5, 10) - date(2024, 3, 30)).days
+        for customer_id, recency, frequency, r_score, reference_date in after:
+            old_recency, old_frequency = before[customer_id]
+            assert reference_date == date(2024, 5, 10)
+            assert r_score == 5 - sum(cutoff < recency for cutoff in cutoffs[0])
+            if 2 <= customer_id <= 11:
+                assert frequency == old_frequency + 1
+                assert recency == 11 - customer_id
+            else:
+                assert (recency, frequency) == (old_recency + shift, old_frequency)
+        assert _snapshot(conn, "customer_rfm") == pytest.approx(
+            conn.execute(f"SELECT * FROM ({summary_sql('customer_rfm')}) ORDER BY ALL").fetchall()
+        )
+
+        refresh_summaries(conn, mode="full", tables=["customer_rfm"])
+        version, reference_date = conn.execute(
+            f"SELECT build_version, reference_date FROM {RFM_BOUNDARIES_TABLE}"
+        ).fetchone()
+        assert version == 2 and reference_date == date(2024, 5, 10)
+
+    def test_incremental_adds_newly_tenured_customers(self, conn):
+        """Test that customers passing the tenure minimum at the advanced reference date are scored."""
+        conn.execute("INSERT INTO customers VALUES (21, 'Budget', 'Direct', TIMESTAMP '2024-03-15')")
+        conn.execute("INSERT INTO orders VALUES (101, 21, TIMESTAMP '2024-03-20', 'Completed', 'Credit Card', 50.0)")
+        refresh_summaries(conn, mode="full", tables=["customer_rfm"])
+        assert conn.execute("SELECT COUNT(*) FROM customer_rfm WHERE customer_id = 21").fetchone()[0] == 0
+
+        _add_orders(conn, 102, 111, "2024-04-19")
+        refresh_summaries(conn, mode="incremental", tables=["customer_rfm"])
+        assert conn.execute("SELECT recency, frequency FROM customer_rfm WHERE customer_id = 21").fetchone() == (51, 1)
+        assert _snapshot(conn, "customer_rfm") == pytest.approx(
+            conn.execute(f"SELECT * FROM ({summary_sql('customer_rfm')}) ORDER BY ALL").fetchall()
+        )
+
+    def test_snapshot_matches_current_build(self, conn):
+        """Test that a snapshot at the reference date segments customers like customer_rfm."""
+        refresh_summaries(conn, mode="full", tables=["customer_rfm"])
+        current = conn.execute(
+            """
+            SELECT rfm_segment, COUNT(*), ROUND(AVG(recency), 1), ROUND(AVG(frequency), 1), ROUND(AVG(monetary), 2)
+            FROM customer_rfm GROUP BY ALL ORDER BY ALL
+        """
+        ).fetchall()
+        snapshot = conn.execute(
+            f"SELECT * EXCLUDE (as_of) FROM ({rfm_segments_sql('SELECT CAST(? AS DATE) as as_of')}) ORDER BY ALL",
+            ["2024-03-30"],
+        ).fetchall()
+        assert snapshot == current
+
+    def test_history_counts_orders_up_to_each_month_end(self, conn):
+        """Test that month-end snapshots only see the orders placed by then."""
+        refresh_summaries(conn, mode="full", tables=["customer_rfm_history"])
+        history = dict(conn.execute("SELECT as_of, SUM(customers) FROM customer_rfm_history GROUP BY as_of").fetchall())
+        assert sorted(history) == [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)]
+
+        for as_of, customers in history.items():
+            purchasing = conn.execute(
+                """
+                SELECT COUNT(DISTINCT customer_id) FROM orders
+                WHERE status = 'Completed' AND order_date < ? + INTERVAL 1 DAY
+            """,
+                [as_of],
+            ).fetchone()[0]
+            assert customers == purchasing
+
+
+class TestCohortActivity:
+    """Test the cohort fact tables."""
+
+    @pytest.mark.parametrize("grain", ["week", "month"])
+    def test_cells_match_raw_orders(self, conn, grain):
+        """Test that each cell counts the cohort's customers active in that period."""
+        refresh_summaries(conn, mode="full", tables=["customer_cohorts", f"cohort_activity_{grain}"])
+        raw = conn.execute(
+            f"""
+            WITH completed AS (
+                SELECT customer_id, order_date, total_amount FROM orders WHERE status = 'Completed'
+            ),
+            firsts AS (SELECT customer_id, MIN(order_date) as first_order FROM completed GROUP BY customer_id)
+            SELECT DATE_TRUNC('{grain}', f.first_order), DATE_TRUNC('{grain}', c.order_date),
+                   COUNT(DISTINCT c.customer_id), COUNT(*), ROUND(SUM(c.total_amount), 2)
+            FROM completed c JOIN firsts f USING (customer_id)
+            GROUP BY ALL ORDER BY ALL
+        """
+        ).fetchall()
+        assert _snapshot(conn, f"cohort_activity_{grain}") == pytest.approx(raw)
+
+        # Everyone is active in their cohort's first period
+        sizes = conn.execute(f"SELECT SUM(customers) FROM cohort_activity_{grain} WHERE cohort = period").fetchone()[0]
+        assert sizes == conn.execute("SELECT COUNT(*) FROM customer_cohorts").fetchone()[0]
+
+
+class TestRevenueRollups:
+    """Test answering the revenue time series from the rollup tables."""
+
+    RANGES = [
+        (None, None),
+        ("2024-01-15", "2024-03-20"),
+        ("2024-02-01", None),
+        (None, "2024-02-29"),
+        ("2024-01-10T12:00:00", "2024-03-05 08:30:00"),
+        ("2024-02-03T06:00:00", "2024-02-03T20:00:00"),
+    ]
+
+    def test_decompose_uses_coarsest_grain(self):
+        """Test that a range is covered by whole quarters, then months, then days."""
+        pieces = decompose(date(2024, 1, 15), date(2024, 10, 1), ("quarter", "month", "day"))
+        assert pieces == [
+            ("day", date(2024, 1, 15), date(2024, 2, 1)),
+            ("month", date(2024, 2, 1), date(2024, 4, 1)),
+            ("quarter", date(2024, 4, 1), date(2024, 10, 1)),
+        ]
+        assert decompose(None, None, ("week", "day")) == [("week", None, None)]
+
+    @pytest.mark.parametrize("group_by", GROUP_BY_GRAINS)
+    def test_rollups_match_raw_orders(self, conn, group_by):
+        """Test that the rollup plan equals aggregating raw orders, including partial edge days."""
+        conn.execute(
+            """
+            INSERT INTO orders
+            SELECT 200 + i, 1 + i % 20, TIMESTAMP '2024-01-10' + INTERVAL (i * 7) HOUR,
+                   CASE WHEN i % 5 = 0 THEN 'Pending' ELSE 'Completed' END, 'PayPal', 10.0 * i
+            FROM range(1, 200) t(i)
+        """
+        )
+        refresh_summaries(conn, mode="full")
+
+        for date_from, date_to in self.RANGES:
+            results = []
+            for use_rollups in (True, False):
+                query, params = plan_revenue_series(group_by, date_from, date_to, use_rollups=use_rollups)
+                results.append(conn.execute(query, params).fetchall())
+            rollup, raw = (
+                [(period, round(revenue, 2), orders) for period, revenue, orders in rows] for rows in results
+            )
+            assert rollup == raw and rollup, (date_from, date_to)
+
+    def test_range_totals_match_raw(self, conn):
+        """Test that segment and session totals over rollups equal scanning the fact tables."""
+        refresh_summaries(conn, mode="full")
+
+        for date_from, date_to in self.RANGES:
+            orders = Conditions().date_range("o.order_date", date_from, date_to)
+            raw = conn.execute(
+                f"""
+                SELECT c.customer_segment, o.status, ROUND(SUM(o.total_amount), 2), COUNT(*)
+                FROM orders o LEFT JOIN customers c ON o.customer_id = c.customer_id
+                {orders.sql()} GROUP BY ALL ORDER BY ALL
+            """,
+                orders.params,
+            ).fetchall()
+            query, params = plan_segment_totals(date_from, date_to)
+            planned = conn.execute(
+                f"SELECT * REPLACE (ROUND(revenue, 2) AS revenue) FROM ({query}) ORDER BY ALL", params
+            )
+            assert planned.fetchall() == raw, (date_from, date_to)
+
+            sessions = Conditions().date_range("session_date", date_from, date_to)
+            raw_sessions = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(CAST(converted AS INTEGER)), 0) FROM web_sessions {sessions.sql()}",
+                sessions.params,
+            ).fetchone()
+            assert conn.execute(*plan_session_totals(date_from, date_to)).fetchone() == raw_sessions
+
+
+class TestCustomerSketches:
+    """Test distinct-customer estimates from the HyperLogLog sketches."""
+
+    def test_estimate_within_error_bound(self, tmp_path):
+        """Test that merged sketches estimate distinct customers of any range within the error bound."""
+        conn = duckdb.connect(str(tmp_path / "sketch.duckdb"))
+        conn.execute(
+            """
+            CREATE TABLE orders AS
+            SELECT i AS order_id, i % 150000 AS customer_id,
+                   TIMESTAMP '2024-01-01' + INTERVAL (i * 37 % (90 * 24)) HOUR AS order_date
+            FROM range(1, 400001) t(i)
+        """
+        )
+        refresh_summaries(conn, mode="full", tables=["customer_sketch_day", "customer_sketch_month"])
+
+        for date_from, date_to in TestRevenueRollups.RANGES:
+            where = Conditions().date_range("order_date", date_from, date_to)
+            exact = conn.execute(f"SELECT COUNT(DISTINCT customer_id) FROM orders {where.sql()}", where.params)
+            exact = exact.fetchone()[0]
+            estimate = hll_estimate(*conn.execute(*plan_distinct_customers(date_from, date_to)).fetchone())
+            assert abs(estimate - exact) <= 3 * HLL_RELATIVE_ERROR * exact, (date_from, date_to)
+        conn.close()
+
+    def test_small_counts_are_near_exact(self, conn):
+        """Test that linear counting makes small estimates practically exact."""
+        refresh_summaries(conn, mode="full")
+        estimate = hll_estimate(*conn.execute(*plan_distinct_customers("2024-01-01", "2024-01-05")).fetchone())
+        exact = conn.execute(
+            "SELECT COUNT(DISTINCT customer_id) FROM orders WHERE order_date < DATE '2024-01-06'"
+        ).fetchone()[0]
+        assert round(estimate) == exact
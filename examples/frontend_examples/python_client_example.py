@@ -21,13 +21,15 @@ class EcommerceAnalyticsClient:
         self.base_url = base_url
         self.session = requests.Session()
     
-    def get_overview_kpis(self, date_from=None, date_to=None):
-        """Get overview KPI metrics."""
+    def get_overview_kpis(self, date_from=None, date_to=None, approx=False):
+        """Get overview KPI metrics (with an estimated customer count if approx)."""
         params = {}
         if date_from:
             params['date_from'] = date_from
         if date_to:
             params['date_to'] = date_to
+        if approx:
+            params['approx'] = 'true'
             
         response = self.session.get(f"{self.base_url}/api/v1/analytics/overview", params=params)
         response.raise_for_status()
@@ -45,16 +47,42 @@ class EcommerceAnalyticsClient:
         response.raise_for_status()
         return response.json()
     
-    def get_customer_analytics(self, segment=None):
-        """Get customer analytics including RFM segmentation."""
+    def get_customer_analytics(self, segment=None, as_of=None):
+        """Get customer analytics including RFM segmentation (as of the latest order date by default)."""
         params = {}
         if segment:
             params['segment'] = segment
+        if as_of:
+            params['as_of'] = as_of
             
         response = self.session.get(f"{self.base_url}/api/v1/analytics/customers", params=params)
         response.raise_for_status()
         return response.json()
+
+    def get_rfm_history(self, date_from=None, date_to=None):
+        """Get RFM segment sizes as of every month end in a date range."""
+        params = {}
+        if date_from:
+            params['date_from'] = date_from
+        if date_to:
+            params['date_to'] = date_to
+
+        response = self.session.get(f"{self.base_url}/api/v1/analytics/customers/rfm-history", params=params)
+        response.raise_for_status()
+        return response.json()
     
+    def get_cohorts(self, granularity="month", horizon=12, date_from=None, date_to=None):
+        """Get the cohort retention matrix (one value per period, None for periods not yet reached)."""
+        params = {"granularity": granularity, "horizon": horizon}
+        if date_from:
+            params['date_from'] = date_from
+        if date_to:
+            params['date_to'] = date_to
+
+        response = self.session.get(f"{self.base_url}/api/v1/analytics/cohorts", params=params)
+        response.raise_for_status()
+        return response.json()
+
     def get_product_analytics(self, category=None, limit=20):
         """Get product performance analytics."""
         params = {"limit": limit}
@@ -71,12 +99,61 @@ class EcommerceAnalyticsClient:
         response.raise_for_status()
         return response.json()
     
-    def get_recent_orders(self, limit=50):
-        """Get recent orders."""
-        response = self.session.get(f"{self.base_url}/api/v1/reports/recent-orders", 
-                                   params={"limit": limit})
+    def get_recent_orders(self, limit=50, cursor=None, status=None, payment_method=None, customer_id=None):
+        """Get one page of recent orders; pass the returned ``next_cursor`` back for the next page."""
+        params = {"limit": limit}
+        for name, value in [("cursor", cursor), ("status", status),
+                            ("payment_method", payment_method), ("customer_id", customer_id)]:
+            if value is not None:
+                params[name] = value
+            
+        response = self.session.get(f"{self.base_url}/api/v1/reports/recent-orders", params=params)
         response.raise_for_status()
         return response.json()
+    
+    def iter_orders(self, page_size=500, **filters):
+        """Iterate over all matching orders, newest first, page by page."""
+        cursor = None
+        while True:
+            page = self.get_recent_orders(limit=page_size, cursor=cursor, **filters)
+            yield from page['recent_orders']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+    
+    def export_table(self, table, path, fmt="parquet", date_from=None, date_to=None):
+        """Stream a full orders or web_sessions extract to a file without holding it in memory."""
+        params = {"format": fmt}
+        if date_from:
+            params['date_from'] = date_from
+        if date_to:
+            params['date_to'] = date_to
+            
+        with self.session.get(f"{self.base_url}/api/v1/reports/export/{table}", params=params, stream=True) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+        return path
+    
+    def get_batch(self, metrics, date_from=None, date_to=None):
+        """Get several metrics in one request.
+        
+        ``metrics`` maps a result name to a metric request, e.g.
+        ``{"top_products": {"metric": "products", "params": {"limit": 5}}}``.
+        """
+        payload = {"metrics": [{"id": name, **request} for name, request in metrics.items()]}
+        if date_from:
+            payload['date_from'] = date_from
+        if date_to:
+            payload['date_to'] = date_to
+            
+        response = self.session.post(f"{self.base_url}/api/v1/analytics/batch", json=payload)
+        response.raise_for_status()
+        data = response.json()
+        if data['errors']:
+            raise RuntimeError(f"Batch metrics failed: {data['errors']}")
+        return data['results']
 
 def generate_executive_report(client):
     """Generate an executive summary report."""
@@ -86,8 +163,16 @@ def generate_executive_report(client):
     print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
     
+    # All report sections in a single round trip
+    report = client.get_batch({
+        "overview": {"metric": "overview"},
+        "customers": {"metric": "customers"},
+        "products": {"metric": "products", "params": {"limit": 5}},
+        "marketing": {"metric": "marketing"},
+    })
+    
     # Get overview metrics
-    kpis = client.get_overview_kpis()
+    kpis = report['overview']
     
     print("🎯 KEY PERFORMANCE INDICATORS")
     print("-" * 40)
@@ -100,7 +185,7 @@ def generate_executive_report(client):
     print()
     
     # Customer analytics
-    customers = client.get_customer_analytics()
+    customers = report['customers']
     
     print("👥 CUSTOMER INSIGHTS")
     print("-" * 40)
@@ -114,7 +199,7 @@ def generate_executive_report(client):
     print()
     
     # Product analytics
-    products = client.get_product_analytics(limit=5)
+    products = report['products']
     
     print("📦 PRODUCT PERFORMANCE")
     print("-" * 40)
@@ -129,7 +214,7 @@ def generate_executive_report(client):
     print()
     
     # Marketing analytics
-    marketing = client.get_marketing_analytics()
+    marketing = report['marketing']
     
     print("🎯 MARKETING PERFORMANCE")
     print("-" * 40)
@@ -232,6 +317,12 @@ def export_data_to_excel(client):
         traffic_df.to_excel(writer, sheet_name='Marketing_Traffic', index=False)
     
     print(f"📁 Data exported to: {excel_file}")
+    
+    # Raw order rows are streamed straight to disk instead of going through Excel
+    orders_file = client.export_table(
+        "orders", excel_file.replace('analytics_export.xlsx', 'orders_export.parquet'), fmt="parquet"
+    )
+    print(f"📁 Orders extract exported to: {orders_file}")
 
 def main():
     """Main demo function."""
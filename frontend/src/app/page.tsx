@@ -146,12 +146,15 @@ export default function Dashboard() {
       setError(null);
       console.log(`🔄 Fetching API data for ${selectedTimeRange}...`);
 
-      // Fetch real API data first
-      const [apiOverview, apiRevenue, apiCustomers] = await Promise.all([
-        AnalyticsService.getOverview(),
-        AnalyticsService.getRevenue({ group_by: 'month' }),
-        AnalyticsService.getCustomers({ segment: selectedSegmentType })
-      ]);
+      // Fetch real API data first, in a single batched request
+      const {
+        overview: apiOverview,
+        revenue: apiRevenue,
+        customers: apiCustomers,
+      } = await AnalyticsService.getDashboard({
+        group_by: 'month',
+        segment: selectedSegmentType,
+      });
 
       console.log('📊 API Overview Data:', apiOverview);
       console.log('📈 API Revenue Data:', apiRevenue);
@@ -3,6 +3,10 @@ import type {
   OverviewMetrics,
   RevenueData,
   CustomerData,
+  RfmHistory,
+  CohortData,
+  BatchRequest,
+  BatchResponse,
 } from '../types/analytics';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
@@ -27,10 +31,15 @@ apiClient.interceptors.response.use(
 );
 
 export class AnalyticsService {
-  static async getOverview(): Promise<OverviewMetrics> {
+  static async getOverview(params?: {
+    date_from?: string;
+    date_to?: string;
+    approx?: boolean;
+  }): Promise<OverviewMetrics> {
     console.log('🚀 Making API call to /api/v1/analytics/overview');
     const response = await apiClient.get<OverviewMetrics>(
-      '/api/v1/analytics/overview'
+      '/api/v1/analytics/overview',
+      { params }
     );
     console.log('📡 Raw API response:', response);
     console.log('📄 Response data:', response.data);
@@ -57,6 +66,7 @@ export class AnalyticsService {
 
   static async getCustomers(params?: {
     segment?: string;
+    as_of?: string;
   }): Promise<CustomerData> {
     console.log('🚀 Making API call to customers endpoint');
     const response = await apiClient.get<CustomerData>(
@@ -68,6 +78,68 @@ export class AnalyticsService {
     return response.data;
   }
 
+  static async getRfmHistory(params?: {
+    date_from?: string;
+    date_to?: string;
+  }): Promise<RfmHistory> {
+    const response = await apiClient.get<RfmHistory>(
+      '/api/v1/analytics/customers/rfm-history',
+      { params }
+    );
+    return response.data;
+  }
+
+  static async getCohorts(params?: {
+    granularity?: 'week' | 'month';
+    horizon?: number;
+    date_from?: string;
+    date_to?: string;
+  }): Promise<CohortData> {
+    const response = await apiClient.get<CohortData>('/api/v1/analytics/cohorts', { params });
+    return response.data;
+  }
+
+  // Several metrics in one round trip; per-metric failures are reported in `errors`
+  static async getBatch(request: BatchRequest): Promise<BatchResponse> {
+    const response = await apiClient.post<BatchResponse>(
+      '/api/v1/analytics/batch',
+      request
+    );
+    return response.data;
+  }
+
+  static async getDashboard(params: {
+    segment?: string;
+    group_by?: 'day' | 'week' | 'month' | 'quarter';
+    date_from?: string;
+    date_to?: string;
+  } = {}): Promise<{
+    overview: OverviewMetrics;
+    revenue: RevenueData;
+    customers: CustomerData;
+  }> {
+    const { results, errors } = await AnalyticsService.getBatch({
+      date_from: params.date_from,
+      date_to: params.date_to,
+      metrics: [
+        { metric: 'overview' },
+        { metric: 'revenue', params: { group_by: params.group_by ?? 'month' } },
+        { metric: 'customers', params: { segment: params.segment ?? null } },
+      ],
+    });
+
+    const failed = Object.keys(errors);
+    if (failed.length > 0) {
+      throw new Error(`Batch metrics failed: ${failed.join(', ')}`);
+    }
+
+    return {
+      overview: results.overview as OverviewMetrics,
+      revenue: results.revenue as RevenueData,
+      customers: results.customers as CustomerData,
+    };
+  }
+
   static async healthCheck(): Promise<{ status: string; timestamp: string }> {
     const response = await apiClient.get('/');
     return response.data;
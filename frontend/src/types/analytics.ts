@@ -13,6 +13,8 @@ export interface OverviewMetrics {
   revenue_growth: number;
   order_growth?: number;
   customer_growth?: number;
+  approximate?: boolean;
+  total_customers_error?: number | null;
 }
 
 export interface RevenueData {
@@ -37,18 +39,67 @@ export interface CustomerSegment {
   percentage: number;
 }
 
+export interface RfmSegment {
+  segment: string;
+  customers: number;
+  avg_recency_days: number;
+  avg_frequency: number;
+  avg_monetary: number;
+}
+
 export interface CustomerData {
-  rfm_segments: Array<{
-    segment: string;
-    customers: number;
-    avg_recency_days: number;
-    avg_frequency: number;
-    avg_monetary: number;
-  }>;
+  rfm_as_of: string | null;
+  rfm_segments: RfmSegment[];
   acquisition_channels: Array<{
     channel: string;
     customers: number;
     avg_ltv: number;
     avg_orders: number;
   }>;
-}
\ No newline at end of file
+}
+
+export interface RfmHistory {
+  snapshots: Array<RfmSegment & { as_of: string }>;
+}
+
+// One value per period 0..horizon; null for periods that have not happened yet
+export interface CohortRow {
+  cohort: string;
+  size: number;
+  customers: Array<number | null>;
+  retention: Array<number | null>;
+  orders: Array<number | null>;
+  revenue: Array<number | null>;
+}
+
+export interface CohortData {
+  granularity: 'week' | 'month';
+  horizon: number;
+  cohorts: CohortRow[];
+}
+export type BatchMetric =
+  | 'overview'
+  | 'revenue'
+  | 'customers'
+  | 'rfm_history'
+  | 'cohorts'
+  | 'products'
+  | 'marketing'
+  | 'recent_orders';
+
+export interface BatchMetricRequest {
+  metric: BatchMetric;
+  id?: string;
+  params?: Record<string, string | number | null>;
+}
+
+export interface BatchRequest {
+  metrics: BatchMetricRequest[];
+  date_from?: string;
+  date_to?: string;
+}
+
+export interface BatchResponse {
+  results: Record<string, unknown>;
+  errors: Record<string, { status: number; detail: unknown }>;
+}